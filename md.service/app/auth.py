@@ -4,12 +4,18 @@ Header-based auth: X-User-Id header'ından kullanıcı bilgisi alınır.
 AUTH_MODE env ile prod/dev modu kontrol edilir.
 """
 import os
+import threading
+import time
 from typing import Optional, List
 from fastapi import Header, HTTPException, Depends
-from .data_loader import load_json
+from .data_loader import get_record, on_write
 
 # Ortam değişkeni: "prod" veya "dev" (varsayılan: "prod")
 AUTH_MODE = os.getenv("AUTH_MODE", "prod").lower()
+# Çözümlenmiş kullanıcıların cache süresi (sn). Servis üzerinden yapılan
+# personnel/roles yazımları cache'i hemen temizler; süre sadece dosyaların
+# dışarıdan değiştirilmesine karşı bir üst sınırdır. 0 cache'i kapatır.
+AUTH_CACHE_TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "60"))
 
 
 class UserContext:
@@ -22,22 +28,32 @@ class UserContext:
     
     # Rol izinlerini resolve et
     if role:
-      self.permissions = role.get("permissions", [])
+      self.permissions = role.get("permissions") or []
       # Admin ise "*" permission'ı tüm izinler demek
       if "*" in self.permissions:
         self.permissions = ["*"]
+    
+    # İzin kontrolleri için derlenmiş küme; "tasks.*" gibi joker izinler
+    # önek olarak eşleşir (tasks.* -> tasks.update, tasks.assign.team, ...)
+    self._granted = frozenset(self.permissions)
+    self._all = "*" in self._granted
   
   def has_permission(self, permission: str) -> bool:
     """Kullanıcının belirtilen izne sahip olup olmadığını kontrol et"""
-    if "*" in self.permissions:
+    granted = self._granted
+    if self._all or permission in granted:
       return True
-    return permission in self.permissions
+    # "a.b.c" için "a.b.*" ve "a.*" kontrol edilir
+    prefix = permission
+    while (dot := prefix.rfind(".")) > 0:
+      prefix = prefix[:dot]
+      if prefix + ".*" in granted:
+        return True
+    return False
   
   def has_any_permission(self, permissions: List[str]) -> bool:
     """Kullanıcının listedeki herhangi bir izne sahip olup olmadığını kontrol et"""
-    if "*" in self.permissions:
-      return True
-    return any(perm in self.permissions for perm in permissions)
+    return self._all or any(self.has_permission(perm) for perm in permissions)
   
   def can_manage_task(self, task: dict) -> bool:
     """Kullanıcının bu görevi yönetip yönetemeyeceğini kontrol et (own task kontrolü)"""
@@ -56,6 +72,44 @@ class UserContext:
     return False
 
 
+# X-User-Id -> (son kullanma zamanı, UserContext)
+_user_cache: dict[str, tuple[float, UserContext]] = {}
+_user_cache_lock = threading.Lock()
+# Her temizlemede artar; çözümleme sırasında yazım olduysa sonuç cache'e konmaz
+_user_cache_generation = 0
+
+
+@on_write
+def _invalidate_user_cache(filename: str, version: int, ops: Optional[list]) -> None:
+  global _user_cache_generation
+  if filename in ("personnel.json", "roles.json"):
+    with _user_cache_lock:
+      _user_cache.clear()
+      _user_cache_generation += 1
+
+
+def _resolve_user(user_id: str) -> UserContext:
+  """Personel + rol kaydından UserContext oluştur (cache'siz)"""
+  personnel = get_record("personnel.json", user_id)
+  
+  if not personnel or personnel.get("deleted"):
+    raise HTTPException(status_code=401, detail="Kullanıcı bulunamadı veya geçersiz kullanıcı ID")
+  
+  # Kullanıcı aktif mi kontrol et
+  if not personnel.get("aktifMi", True):
+    raise HTTPException(status_code=403, detail="Kullanıcı hesabı pasif durumda")
+  
+  # Rolü resolve et
+  role = None
+  role_id = personnel.get("rolId")
+  if role_id:
+    role = get_record("roles.json", role_id)
+    if role and role.get("deleted"):
+      role = None
+  
+  return UserContext(user_id=user_id, personnel=personnel, role=role)
+
+
 def get_current_user(x_user_id: Optional[str] = Header(None, alias="X-User-Id")) -> Optional[UserContext]:
   """
   Header'dan kullanıcı bilgisini al ve UserContext döndür.
@@ -69,31 +123,18 @@ def get_current_user(x_user_id: Optional[str] = Header(None, alias="X-User-Id"))
     # Dev modu: header yoksa None döner (okuma işlemleri için)
     return None
   
-  personnel_list = load_json("personnel.json")
-  personnel = None
-  for p in personnel_list:
-    if p.get("id") == x_user_id and not p.get("deleted"):
-      personnel = p
-      break
-  
-  if not personnel:
-    raise HTTPException(status_code=401, detail="Kullanıcı bulunamadı veya geçersiz kullanıcı ID")
-  
-  # Kullanıcı aktif mi kontrol et
-  if not personnel.get("aktifMi", True):
-    raise HTTPException(status_code=403, detail="Kullanıcı hesabı pasif durumda")
-  
-  # Rolü resolve et
-  role = None
-  role_id = personnel.get("rolId")
-  if role_id:
-    roles_list = load_json("roles.json")
-    for r in roles_list:
-      if r.get("id") == role_id and not r.get("deleted"):
-        role = r
-        break
+  now = time.monotonic()
+  cached = _user_cache.get(x_user_id)
+  if cached is not None and cached[0] > now:
+    return cached[1]
   
-  return UserContext(user_id=x_user_id, personnel=personnel, role=role)
+  generation = _user_cache_generation
+  user = _resolve_user(x_user_id)
+  if AUTH_CACHE_TTL_S > 0:
+    with _user_cache_lock:
+      if generation == _user_cache_generation:
+        _user_cache[x_user_id] = (now + AUTH_CACHE_TTL_S, user)
+  return user
 
 
 def require_permission(permission: str):
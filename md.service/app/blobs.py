@@ -0,0 +1,87 @@
+"""
+md.docs dosyaları ile documents.json kayıtlarının eşgüdümü.
+
+İçerik adresli bir blob'u birden fazla kayıt gösterebilir; dosya son referansla
+birlikte silinir. Dosya işlemleri (var mı / taşı / sil) kısa bir kilit altında
+yapılır, kayıt yazımı (group commit penceresi + disk) kilit dışında. Yazılmakta
+olan kayıtlar o süre boyunca bekleyen referans sayılır: bu arada gelen bir
+silme veya yetim dosya temizliği dosyayı silmez.
+
+Yollar md.docs'a göredir (kayıtların path alanı, ör. "documents/blobs/ab/<sha256>").
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+
+from .data_loader import declare_index, find_records
+
+declare_index("documents.json", "path")
+
+_lock = threading.Lock()
+# relpath -> yazılmakta olan kayıt sayısı
+_pending: dict[str, int] = {}
+
+
+def _has_size(path: Path, size: int) -> bool:
+  try:
+    return path.stat().st_size == size
+  except OSError:
+    return False
+
+
+def is_referenced(relpath: str) -> bool:
+  """Bir kayıt (veya yazılmakta olan bir kayıt) bu dosyayı gösteriyor mu"""
+  return _pending.get(relpath, 0) > 0 or bool(find_records("documents.json", "path", relpath, readonly=True))
+
+
+@contextmanager
+def locked() -> Iterator[None]:
+  """Dosya ekleme/silme ile aynı kilit; blok içinde referanslar değişmez"""
+  with _lock:
+    yield
+
+
+@contextmanager
+def referencing(temp_path: Optional[Path], target: Path, relpath: str, size: int) -> Iterator[bool]:
+  """
+  target dosyasını bir kaydın yazımı için ayırır. Dosya yoksa temp_path oraya
+  taşınır, varsa (aynı içerik) temp_path silinir; temp_path None ise dosyanın
+  var olması gerekir (409). Blok süresince dosya silinmez. Yeni dosya yazıldıysa True.
+  """
+  with _lock:
+    if _has_size(target, size):
+      created = False
+      if temp_path is not None:
+        temp_path.unlink(missing_ok=True)
+    elif temp_path is None:
+      raise HTTPException(status_code=409, detail="İçerik bulunamadı, dosya yüklenmeli")
+    else:
+      target.parent.mkdir(parents=True, exist_ok=True)
+      os.replace(temp_path, target)
+      created = True
+    _pending[relpath] = _pending.get(relpath, 0) + 1
+  try:
+    yield created
+  finally:
+    with _lock:
+      remaining = _pending[relpath] - 1
+      if remaining:
+        _pending[relpath] = remaining
+      else:
+        del _pending[relpath]
+
+
+def remove_if_unreferenced(path: Path, relpath: str) -> bool:
+  """Dosyayı hiçbir kayıt göstermiyorsa sil; silindiyse True"""
+  with _lock:
+    if is_referenced(relpath):
+      return False
+    try:
+      path.unlink()
+    except FileNotFoundError:
+      return False
+  return True
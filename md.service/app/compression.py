@@ -0,0 +1,163 @@
+"""
+Yanıt sıkıştırma middleware'i (gzip; brotli paketi kuruluysa br).
+
+Eşikten (COMPRESS_MIN_BYTES) küçük gövdeler, sıkıştırılamayan içerik türleri
+(dosya indirmeleri, resimler) ve event stream'ler olduğu gibi geçer.
+ETag'li yanıtların sıkıştırılmış hâli (ETag, kodlama) anahtarıyla bellekte
+tutulur: aynı içerik tekrar istendiğinde yeniden sıkıştırılmaz.
+Sıkıştırılmış temsilin ETag'ine kodlama eklenir ("...-gzip"); koşullu GET'ler
+(http_cache) bu son eki yok sayarak karşılaştırır.
+"""
+import gzip
+import os
+from collections import OrderedDict
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .http_cache import encoded_etag
+
+try:
+  import brotli  # opsiyonel
+except ImportError:  # pragma: no cover - kurulu değilse sadece gzip
+  brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Bundan büyük gövdeler event loop'u bloklamasın diye thread'de sıkıştırılır
+THREAD_MIN_BYTES = 64 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+# Akış yanıtları tamponlanmaz
+STREAMING_TYPES = ("text/event-stream",)
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+  """Accept-Encoding'den desteklenen en iyi kodlama (q=0 olanlar hariç)"""
+  accepted = set()
+  for part in accept_encoding.split(","):
+    name, _, params = part.strip().partition(";")
+    q = 1.0
+    if params.strip().startswith("q="):
+      try:
+        q = float(params.strip()[2:])
+      except ValueError:
+        q = 0.0
+    if q > 0:
+      accepted.add(name.strip().lower())
+  for encoding in ENCODINGS:
+    if encoding in accepted or "*" in accepted:
+      return encoding
+  return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+  if encoding == "br":
+    return brotli.compress(body)
+  return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+class _CompressedCache:
+  """(ETag, kodlama) -> sıkıştırılmış gövde; toplam boyutla sınırlı LRU"""
+
+  def __init__(self, max_bytes: int):
+    self.max_bytes = max_bytes
+    self.size = 0
+    self.entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+  def get(self, key: tuple[str, str]) -> Optional[bytes]:
+    body = self.entries.get(key)
+    if body is not None:
+      self.entries.move_to_end(key)
+    return body
+
+  def put(self, key: tuple[str, str], body: bytes) -> None:
+    if len(body) > self.max_bytes:
+      return
+    old = self.entries.pop(key, None)
+    if old is not None:
+      self.size -= len(old)
+    self.entries[key] = body
+    self.size += len(body)
+    while self.size > self.max_bytes:
+      _, evicted = self.entries.popitem(last=False)
+      self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+  def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES, cache_bytes: int = COMPRESS_CACHE_BYTES):
+    self.app = app
+    self.minimum_size = minimum_size
+    self.cache = _CompressedCache(cache_bytes)
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+    if encoding is None:
+      await self.app(scope, receive, send)
+      return
+
+    start: Optional[Message] = None
+    chunks: list[bytes] = []
+    passthrough = False
+
+    async def send_wrapper(message: Message) -> None:
+      nonlocal start, passthrough
+      if passthrough:
+        await send(message)
+        return
+      if message["type"] == "http.response.start":
+        headers = Headers(raw=message["headers"])
+        content_type = headers.get("content-type", "")
+        if (
+          message["status"] != 200
+          or "content-encoding" in headers
+          or "content-disposition" in headers  # dosya indirmeleri
+          or not content_type.startswith(COMPRESSIBLE_TYPES)
+          or content_type.startswith(STREAMING_TYPES)
+        ):
+          passthrough = True
+          await send(message)
+        else:
+          start = message
+        return
+      if message["type"] != "http.response.body":
+        await send(message)
+        return
+      chunks.append(message.get("body", b""))
+      if message.get("more_body", False):
+        return
+      await self._finish(start, b"".join(chunks), encoding, send)
+
+    await self.app(scope, receive, send_wrapper)
+
+  async def _finish(self, start: Message, body: bytes, encoding: str, send: Send) -> None:
+    headers = MutableHeaders(raw=list(start["headers"]))
+    if len(body) < self.minimum_size:
+      await send(start)
+      await send({"type": "http.response.body", "body": body})
+      return
+
+    etag = headers.get("etag")
+    key = (etag, encoding) if etag else None
+    compressed = self.cache.get(key) if key else None
+    if compressed is None:
+      if len(body) >= THREAD_MIN_BYTES:
+        compressed = await anyio.to_thread.run_sync(_compress, body, encoding)
+      else:
+        compressed = _compress(body, encoding)
+      if key:
+        self.cache.put(key, compressed)
+
+    headers["content-encoding"] = encoding
+    headers["content-length"] = str(len(compressed))
+    headers.add_vary_header("Accept-Encoding")
+    if etag:
+      headers["etag"] = encoded_etag(etag, encoding)
+    await send({**start, "headers": headers.raw})
+    await send({"type": "http.response.body", "body": compressed})
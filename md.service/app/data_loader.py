@@ -1,8 +1,15 @@
-import json
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, NamedTuple
+
+from .storage import Change, JsonFileBackend, StorageBackend
+from .storage.records import IndexKey, RecordIndex, diff_records, field_key
 
 
 @lru_cache(maxsize=None)
@@ -14,37 +21,697 @@ def get_data_dir() -> Path:
   return Path(__file__).resolve().parent.parent.parent / "md.data"
 
 
-def load_json(filename: str) -> Any:
-  data_dir = get_data_dir()
-  path = data_dir / filename
-  if not path.exists():
-    raise FileNotFoundError(f"Data file not found: {path}")
-  
-  # Try different encodings
-  for encoding in ["utf-8", "utf-8-sig", "utf-16", "latin-1"]:
+def get_sqlite_path() -> Path:
+  env_path = os.getenv("DATA_SQLITE_PATH")
+  if env_path:
+    return Path(env_path).resolve()
+  return get_data_dir() / "md.sqlite3"
+
+
+@lru_cache(maxsize=None)
+def get_backend() -> StorageBackend:
+  """DATA_BACKEND ortam değişkenine göre depolama backend'i (json | sqlite | journal)"""
+  kind = os.getenv("DATA_BACKEND", "json").lower()
+  if kind == "json":
+    return JsonFileBackend(get_data_dir())
+  if kind == "sqlite":
+    from .storage.sqlite_backend import SqliteBackend
+    return SqliteBackend(get_sqlite_path())
+  if kind == "journal":
+    from .storage.journal_backend import JournalBackend
+    return JournalBackend(get_data_dir(), compact_interval=float(os.getenv("DATA_COMPACT_INTERVAL_S", "30")))
+  raise ValueError(f"Unknown DATA_BACKEND: {kind}")
+
+
+# Process-wide parsed-object cache: filename -> (signature, data).
+# The backend signature ((st_mtime_ns, st_size) for JSON files) is checked on
+# every read, so edits made outside the process are picked up on the next request.
+_cache: dict[str, tuple[Any, Any]] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+# Per-collection write locks; every write through this module holds them
+_locks: dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+# Collections whose lock the current thread holds
+_held_local = threading.local()
+# filename -> id index of the cached list; valid only while index.data is the cached object
+_indexes: dict[str, RecordIndex] = {}
+# filename -> secondary index name -> key function (see declare_index)
+_index_keys: dict[str, dict[Any, IndexKey]] = {}
+# filename -> fields with a sorted prefix index (see declare_sorted_index)
+_sorted_fields: dict[str, tuple[str, ...]] = {}
+# filename -> text index name -> searched fields (see declare_text_index)
+_text_fields: dict[str, dict[str, tuple[str, ...]]] = {}
+# Called as fn(filename, version, ops) after every committed write (see on_write)
+WriteListener = Callable[[str, int, "list[tuple] | None"], None]
+_write_listeners: list[WriteListener] = []
+# Per-collection versions (see collection_version). Every run starts from the
+# current time in microseconds, so versions keep increasing across restarts.
+_version_base = time.time_ns() // 1000
+_versions: dict[str, int] = {}
+# Per-collection change log of (version, "upsert" | "delete", record id), bounded
+# to CHANGELOG_SIZE entries. It is complete for versions after _log_floor; older
+# versions (evicted, previous run, non record-level writes) need a full resync.
+CHANGELOG_SIZE = int(os.getenv("DATA_CHANGELOG_SIZE", "10000"))
+_change_log: dict[str, deque] = {}
+_log_floor: dict[str, int] = {}
+# filename -> data of the commit in progress (writes to a collection hold its
+# lock, so there is at most one) and the number of commits started. A reader
+# whose signature check overlaps a commit sees a signature that differs from
+# the cache without any outside edit; see load_json.
+_committing: dict[str, Any] = {}
+_commit_counts: dict[str, int] = {}
+
+
+def _clone(value: Any) -> Any:
+  """JSON ağacının bağımsız kopyası (copy.deepcopy'den ~2x hızlı)."""
+  if isinstance(value, dict):
+    return {k: _clone(v) for k, v in value.items()}
+  if isinstance(value, list):
+    return [_clone(v) for v in value]
+  return value
+
+
+def _cached(filename: str, sig: Any) -> Any:
+  with _cache_lock:
+    entry = _cache.get(filename)
+    if entry is not None and entry[0] == sig:
+      return entry[1]
+  return None
+
+
+def _put(filename: str, sig: Any, data: Any) -> None:
+  with _cache_lock:
+    _cache[filename] = (sig, data)
+
+
+def _drop(filename: str) -> None:
+  with _cache_lock:
+    _cache.pop(filename, None)
+
+
+def _current(filename: str) -> Any:
+  """Cache'teki içerik hâlâ güncelse onu, değilse None döndür."""
+  try:
+    return _cached(filename, get_backend().signature(filename))
+  except FileNotFoundError:
+    return None
+
+
+def load_json(filename: str, readonly: bool = False) -> Any:
+  """
+  Dosyayı cache üzerinden oku.
+  Varsayılan olarak çağırana ait bir kopya döner; router sonucu değiştirse de
+  cache bozulmaz. readonly=True paylaşılan nesneyi kopyalamadan döndürür ve
+  sadece sonucu değiştirmeyen okuma endpoint'lerinde kullanılmalıdır.
+  """
+  backend = get_backend()
+  with _cache_lock:
+    # Bu andan imza okunana kadar başlamış (veya sürmekte olan) commit'ler sayılır
+    commits = _commit_counts.get(filename, 0) - (filename in _committing)
+  sig = backend.signature(filename)
+
+  with _cache_lock:
+    entry = _cache.get(filename)
+    if filename in _committing:
+      # Süren bir commit imzayı değiştirmiş olabilir; dışarıdan değişiklik değil.
+      # Backend yazmadıysa önceki hâl, yazdıysa commit edilen veri geçerlidir.
+      data = entry[1] if entry is not None and entry[0] == sig else _committing[filename]
+    elif entry is not None and (entry[0] == sig or _commit_counts.get(filename, 0) != commits):
+      # İmza okunurken bir commit yayınlandıysa imza eski, cache günceldir
+      data = entry[1]
+    else:
+      data = None
+    _cache_stats["hits" if data is not None else "misses"] += 1
+  if data is None:
+    data = backend.read(filename)
+    with _cache_lock:
+      # Cache'te eski bir hâli varsa dosya servis dışından değiştirilmiştir
+      stale = filename in _cache
+    _put(filename, sig, data)
+    _indexes.pop(filename, None)
+    if stale:
+      _notify(filename, _bump(filename, None), None)
+
+  return data if readonly else _clone(data)
+
+
+def _bump(filename: str, ops: list[tuple] | None) -> int:
+  """Sürümü ilerlet ve değişiklik günlüğüne yaz; ops=None günlüğü sıfırlar (tam senkron gerekir)."""
+  with _cache_lock:
+    version = _versions[filename] = _versions.get(filename, _version_base) + 1
+    log = _change_log.get(filename)
+    if log is None:
+      log = _change_log[filename] = deque(maxlen=CHANGELOG_SIZE)
+    if ops is None:
+      log.clear()
+      _log_floor[filename] = version
+      return version
+    for op in ops:
+      if len(log) == log.maxlen:
+        # Taşan kayıtla birlikte o sürümün günlüğü eksik kalır
+        _log_floor[filename] = log[0][0]
+      if op[0] == "delete":
+        log.append((version, "delete", op[1]))
+      else:
+        log.append((version, "upsert", op[1]["id"]))
+  return version
+
+
+def changes_since(filename: str, since: int) -> tuple[int, list[tuple[int, str, str]] | None]:
+  """
+  (güncel sürüm, since'ten sonraki (sürüm, işlem, id) kayıtları). Günlük since'i
+  kapsamıyorsa (çok eski, önceki çalışmadan veya kayıt seviyesinde olmayan bir
+  yazım var) kayıtlar yerine None döner; istemci koleksiyonu baştan almalıdır.
+  """
+  collection_version(filename)
+  with _cache_lock:
+    version = _versions.get(filename, _version_base)
+    if since > version or since < _log_floor.get(filename, _version_base):
+      return version, None
+    return version, [entry for entry in _change_log.get(filename, ()) if entry[0] > since]
+
+
+def collection_version(filename: str) -> int:
+  """
+  Koleksiyonun sürümü: her yazımda (ve dosya dışarıdan değiştiğinde) artar.
+  Sürüm değişmediyse içerik de değişmemiştir; koşullu GET'ler (ETag) buna dayanır.
+  Maliyeti bir imza kontrolüdür, dosya okunmaz (değişmişse bir kez yüklenir).
+  """
+  try:
+    if _current(filename) is None:
+      load_json(filename, readonly=True)
+  except FileNotFoundError:
+    pass
+  return _versions.get(filename, _version_base)
+
+
+def _index(filename: str, data: list) -> RecordIndex:
+  """data listesinin id indeksi; yoksa veya başka bir nesneye aitse yeniden kurulur."""
+  index = _indexes.get(filename)
+  if index is None or index.data is not data:
+    index = _indexes[filename] = RecordIndex(
+      data, _index_keys.get(filename), _sorted_fields.get(filename, ()), _text_fields.get(filename)
+    )
+  return index
+
+
+def declare_index(filename: str, *fields: str | tuple[str, ...], keys: dict[str, IndexKey] | None = None) -> None:
+  """
+  Koleksiyon için ikincil indeks tanımla. Router'lar modül seviyesinde çağırır;
+  indeksler id indeksiyle birlikte kurulur ve yazımlarla güncel tutulur.
+
+    declare_index("documents.json", "jobId")
+    declare_index("stockItems.json", ("productCode", "colorCode"))   # bileşik
+    declare_index("purchaseOrders.json", keys={"lineCode": fn})       # fn(kayıt) -> değerler
+
+  find_records aynı ad (alan, alan tuple'ı veya keys anahtarı) ile sorgular.
+  """
+  specs = {field: field_key(field) for field in fields}
+  specs.update(keys or {})
+  with _locks_guard:
+    current = _index_keys.get(filename, {})
+    new = {name: key for name, key in specs.items() if name not in current}
+    if new:
+      _index_keys[filename] = {**current, **new}
+      _indexes.pop(filename, None)
+
+
+def declare_sorted_index(filename: str, *fields: str) -> None:
+  """
+  Önek sorguları için sıralı indeks tanımla (ör. stok kodu autocomplete).
+  Sorgu: prefix_records(dosya, alan, önek, limit).
+  """
+  with _locks_guard:
+    current = _sorted_fields.get(filename, ())
+    merged = current + tuple(f for f in fields if f not in current)
+    if merged != current:
+      _sorted_fields[filename] = merged
+      _indexes.pop(filename, None)
+
+
+def declare_text_index(filename: str, name: str, *fields: str) -> None:
+  """
+  Metin araması için trigram indeksi tanımla (Türkçe harf duyarsız, aksansız).
+  Sorgu: search_records(dosya, ad, sorgu, limit).
+  """
+  with _locks_guard:
+    current = _text_fields.get(filename, {})
+    if current.get(name) != tuple(fields):
+      _text_fields[filename] = {**current, name: tuple(fields)}
+      _indexes.pop(filename, None)
+
+
+def search_records(
+  filename: str, name: str, query: str, limit: int | None = None, readonly: bool = False
+) -> list[dict]:
+  """
+  Sorgudaki her kelimeyi indekslenmiş alanlardan birinde içeren kayıtlar,
+  en iyi eşleşme önce. İndeks önceden declare_text_index ile tanımlanmış olmalıdır.
+  """
+  if name not in _text_fields.get(filename, {}):
+    raise ValueError(f"{filename}: '{name}' için metin indeksi tanımlı değil")
+  data = load_json(filename, readonly=True)
+  if not isinstance(data, list):
+    return []
+  records = _index(filename, data).search(name, query, limit)
+  return records if readonly else [_clone(r) for r in records]
+
+
+def prefix_records(
+  filename: str, field: str, prefix: str, limit: int | None = None, readonly: bool = False
+) -> list[dict]:
+  """
+  field değeri prefix ile başlayan kayıtlar, değere göre sıralı; O(log n + k).
+  Alan önceden declare_sorted_index ile tanımlanmış olmalıdır.
+  """
+  if field not in _sorted_fields.get(filename, ()):
+    raise ValueError(f"{filename}: '{field}' için sıralı indeks tanımlı değil")
+  data = load_json(filename, readonly=True)
+  if not isinstance(data, list):
+    return []
+  records = _index(filename, data).prefix(field, prefix, limit)
+  return records if readonly else [_clone(r) for r in records]
+
+
+def find_records(filename: str, field: str | tuple[str, ...], value: Any, readonly: bool = False) -> list[dict]:
+  """
+  İndeks değeri value olan kayıtlar, koleksiyondaki sırayla. Maliyet eşleşme
+  sayısıyla orantılıdır; indeks önceden declare_index ile tanımlanmış olmalıdır.
+  Bileşik indekslerde value alanların tuple'ıdır.
+  """
+  if field not in _index_keys.get(filename, {}):
+    raise ValueError(f"{filename}: '{field}' için indeks tanımlı değil")
+  data = load_json(filename, readonly=True)
+  if not isinstance(data, list):
+    return []
+  records = _index(filename, data).find(field, value)
+  return records if readonly else [_clone(r) for r in records]
+
+
+def _advance_index(filename: str, old: Any, new: Any, ops: list[tuple] | None) -> None:
+  """Yazımdan sonra indeksi yeni listeye taşı; mümkün değilse bırak (ilk okumada kurulur)."""
+  index = _indexes.get(filename)
+  if index is None:
+    return
+  if ops is None or index.data is not old or not isinstance(new, list) or not index.advance(new, ops):
+    _indexes.pop(filename, None)
+
+
+def get_record(filename: str, record_id: str, readonly: bool = False) -> dict | None:
+  """
+  Kaydı id'sine göre O(1) bul; yoksa None. Koleksiyonun id indeksi ilk aramada
+  kurulur ve yazımlarla birlikte güncel tutulur. readonly load_json'daki gibidir.
+  """
+  data = load_json(filename, readonly=True)
+  if not isinstance(data, list):
+    return None
+  record = _index(filename, data).get(record_id)
+  if record is None or readonly:
+    return record
+  return _clone(record)
+
+
+def _commit(changes: dict[str, Change], durable: bool = False) -> None:
+  """Değişiklikleri backend'e yaz ve cache'i güncelle; Change.data artık cache'e aittir."""
+  backend = get_backend()
+  with _cache_lock:
+    for filename, change in changes.items():
+      _committing[filename] = change.data
+      _commit_counts[filename] = _commit_counts.get(filename, 0) + 1
+  try:
     try:
-      with path.open(encoding=encoding) as f:
-        return json.load(f)
-    except (UnicodeDecodeError, json.JSONDecodeError):
-      continue
-  
-  # If all encodings fail, raise error
-  raise ValueError(f"Cannot decode JSON file: {path}")
+      backend.commit(changes, durable=durable)
+    except Exception:
+      for filename in changes:
+        _drop(filename)
+      raise
+    for filename, change in changes.items():
+      _put(filename, backend.signature(filename), change.data)
+  finally:
+    with _cache_lock:
+      for filename in changes:
+        del _committing[filename]
+  versions = {}
+  for filename, change in changes.items():
+    versions[filename] = _bump(filename, change.ops)
+  for filename, change in changes.items():
+    _notify(filename, versions[filename], change.ops)
 
 
-def save_json(filename: str, data: Any) -> None:
-  data_dir = get_data_dir()
-  data_dir.mkdir(parents=True, exist_ok=True)
-  path = data_dir / filename
-  # Atomic write: temp file + rename to prevent corruption
-  temp_path = path.with_suffix(path.suffix + '.tmp')
+def _notify(filename: str, version: int, ops: list[tuple] | None) -> None:
+  for listener in _write_listeners:
+    listener(filename, version, ops)
+
+
+def on_write(listener: WriteListener) -> WriteListener:
+  """
+  Her başarılı yazımdan sonra listener(dosya, sürüm, işlemler) çağrılır; işlemler
+  kayıt seviyesinde değilse (veya dosya servis dışından değiştiyse) None'dır.
+  Türetilmiş cache'leri temizlemek (ör. auth kullanıcı cache'i) ve değişiklik
+  bildirimleri için kullanılır. Listener hızlı olmalı ve hata fırlatmamalıdır.
+  Dekoratör olarak da kullanılabilir.
+  """
+  _write_listeners.append(listener)
+  return listener
+
+
+def _held() -> set:
+  held = getattr(_held_local, "names", None)
+  if held is None:
+    held = _held_local.names = set()
+  return held
+
+
+@contextmanager
+def _locked(*filenames: str):
+  """Koleksiyon kilitlerini sabit sırada al (deadlock olmaması için)."""
+  names = sorted(set(filenames))
+  with _locks_guard:
+    locks = [_locks.setdefault(name, threading.RLock()) for name in names]
+  for lock in locks:
+    lock.acquire()
+  held = _held()
+  newly_held = [name for name in names if name not in held]
+  held.update(newly_held)
   try:
-    with temp_path.open("w", encoding="utf-8") as f:
-      json.dump(data, f, ensure_ascii=False, indent=2)
-    temp_path.replace(path)  # Atomic rename
-  except Exception:
-    if temp_path.exists():
-      temp_path.unlink()
-    raise
+    yield
+  finally:
+    held.difference_update(newly_held)
+    for lock in reversed(locks):
+      lock.release()
+
+
+# ---- Group commit ----
+# DATA_FLUSH_WINDOW_MS > 0 ise bir koleksiyona gelen yazımlar o koleksiyonun tek
+# yazıcı thread'inde sıraya alınır, geliş sırasıyla bellekteki hâle uygulanır ve
+# pencere başına tek bir (fsync'li) commit'te birleştirilir. Çağıran, yazım
+# diske indikten sonra döner. 0 ise her yazım çağıran thread'de hemen yapılır.
+FLUSH_WINDOW_MS = float(os.getenv("DATA_FLUSH_WINDOW_MS", "5"))
+
+_committers: dict[str, "_Committer"] = {}
+_committers_guard = threading.Lock()
+_write_stats = {"mutations": 0, "flushes": 0}
+
+
+class _Mutation(NamedTuple):
+  # fn(data) -> (yeni_data, çağırana dönecek sonuç, kayıt işlemleri | None)
+  # İşlemler biliniyorsa koleksiyon diff'lenmeden backend'e kayıt seviyesinde yazılır
+  fn: Callable[[Any], tuple[Any, Any, list[tuple] | None]]
+  # True: fn veriyi yerinde değiştirir, önce özel bir kopya gerekir
+  inplace: bool = False
+
+
+def _apply_batch(filename: str, batch: list[tuple[_Mutation, Future]], durable: bool) -> None:
+  with _locked(filename):
+    try:
+      base = load_json(filename, readonly=True)
+    except FileNotFoundError:
+      base = None
+    data, owned = base, False
+    # Yalnızca mevcut bir listeye uygulanan ve işlemlerini bildiren mutasyonlar için
+    ops = [] if isinstance(base, list) else None
+    done = []
+    for mutation, future in batch:
+      if mutation.inplace and not owned:
+        data, owned = _clone(data), True
+      before = data
+      try:
+        data, result, mutation_ops = mutation.fn(data)
+      except Exception as e:
+        future.set_exception(e)
+        continue
+      if data is not before or mutation_ops is None:
+        _advance_index(filename, before, data, mutation_ops)
+      owned = owned and mutation.inplace
+      ops = None if ops is None or mutation_ops is None else ops + mutation_ops
+      done.append((future, result))
+
+    if data is not base:
+      try:
+        if ops is None:
+          ops = diff_records(base, data)
+        _commit({filename: Change(data, ops)}, durable=durable)
+      except Exception as e:
+        for future, _ in done:
+          future.set_exception(e)
+        return
+    with _cache_lock:
+      _write_stats["mutations"] += len(batch)
+      _write_stats["flushes"] += 1
+    for future, result in done:
+      future.set_result(result)
+
+
+class _Committer:
+  """Tek koleksiyonun yazıcı thread'i"""
+
+  def __init__(self, filename: str):
+    self.filename = filename
+    self._pending: list[tuple[_Mutation, Future]] = []
+    self._cond = threading.Condition()
+    self._thread = threading.Thread(target=self._run, name=f"committer:{filename}", daemon=True)
+    self._thread.start()
+
+  def submit(self, mutation: _Mutation) -> Future:
+    future = Future()
+    with self._cond:
+      self._pending.append((mutation, future))
+      self._cond.notify()
+    return future
+
+  def _run(self) -> None:
+    while True:
+      with self._cond:
+        while not self._pending:
+          self._cond.wait()
+      # Pencere boyunca gelen yazımları topla
+      time.sleep(FLUSH_WINDOW_MS / 1000)
+      with self._cond:
+        batch, self._pending = self._pending, []
+      _apply_batch(self.filename, batch, durable=True)
+
+
+def _submit(filename: str, mutation: _Mutation) -> Any:
+  # Koleksiyon kilidi bu thread'deyse (ör. transaction içinden) sıraya girmek kilitlenir
+  if FLUSH_WINDOW_MS <= 0 or filename in _held():
+    future = Future()
+    _apply_batch(filename, [(mutation, future)], durable=False)
+    return future.result()
+
+  with _committers_guard:
+    committer = _committers.get(filename)
+    if committer is None:
+      committer = _committers[filename] = _Committer(filename)
+  return committer.submit(mutation).result()
+
+
+def save_json(filename: str, data: Any) -> None:
+  # The caller keeps its own object; the cache gets a private copy.
+  data = _clone(data)
+  _submit(filename, _Mutation(lambda _: (data, None, None)))
+
+
+def update_json(filename: str, fn: Callable[[Any], Any]) -> Any:
+  """
+  fn(data) koleksiyonu yazıcı sırasında, güncel hâl üzerinde yerinde değiştirir;
+  fn'in dönüş değeri yazım kalıcı olduktan sonra çağırana döner. Yükle-değiştir-kaydet
+  yerine kullanıldığında eşzamanlı istekler birbirinin değişikliğini ezmez.
+  fn hata fırlatacaksa veriyi değiştirmeden önce fırlatmalıdır.
+  """
+  return _submit(filename, _Mutation(lambda data: (data, fn(data), None), inplace=True))
+
+
+def _replace_record(filename: str, data: list, record: dict, prepend: bool) -> tuple[list, tuple]:
+  """
+  Kaydı id'sine göre değiştir/ekle; yeni liste (eski liste okuyuculara ait) ve
+  karşılık gelen kayıt işlemi döner.
+  """
+  idx = _index(filename, data).position(record["id"])
+  data = list(data)
+  if idx is not None:
+    data[idx] = record
+    return data, ("update", record)
+  if prepend:
+    data.insert(0, record)
+  else:
+    data.append(record)
+  return data, ("insert", record, prepend)
+
+
+def upsert_record(filename: str, record: dict, prepend: bool = False) -> None:
+  """
+  Tek kaydı id'sine göre ekle veya güncelle.
+  prepend=True yeni kaydı listenin başına ekler (insert(0, ...) karşılığı).
+  Kayıt seviyesinde yazabilen backend'lerde (sqlite) koleksiyonun tamamı yazılmaz.
+  """
+  record = _clone(record)
+  def apply(data):
+    data, op = _replace_record(filename, data or [], record, prepend)
+    return data, None, [op]
+
+  _submit(filename, _Mutation(apply))
+
+
+def delete_record(filename: str, record_id: str) -> bool:
+  """Tek kaydı id'sine göre sil; kayıt yoksa False döner."""
+  def apply(data):
+    idx = _index(filename, data).position(record_id) if isinstance(data, list) else None
+    if idx is None:
+      return data, False, []
+    return data[:idx] + data[idx + 1:], True, [("delete", record_id)]
+
+  return _submit(filename, _Mutation(apply))
+
+
+def update_record(filename: str, record_id: str, fn: Callable[[dict], Any]) -> dict | None:
+  """
+  Kaydı yazıcı sırasında güncelle: fn(record) kaydın güncel hâlinin özel bir
+  kopyasını yerinde değiştirir. Güncellenmiş kaydın kopyası döner; kayıt yoksa None.
+  fn hata fırlatırsa kayıt değişmez.
+  """
+  def apply(data):
+    idx = _index(filename, data).position(record_id) if isinstance(data, list) else None
+    if idx is None:
+      return data, None, []
+    record = _clone(data[idx])
+    fn(record)
+    data = list(data)
+    data[idx] = record
+    return data, _clone(record), [("update", record)]
+
+  return _submit(filename, _Mutation(apply))
+
+
+class Transaction:
+  """
+  Birden fazla koleksiyon üzerinde iş birimi.
+  tx[dosya] çağırana ait bir kopya döner; yerinde değiştirilebilir veya
+  tx[dosya] = yeni_liste ile tamamen değiştirilebilir.
+  """
+
+  def __init__(self, filenames: tuple[str, ...]):
+    self.filenames = filenames
+    self._original: dict[str, Any] = {}
+    self._data: dict[str, Any] = {}
+    self._positions: dict[str, dict] = {}
+
+  def _load(self) -> None:
+    for filename in self.filenames:
+      self._original[filename] = load_json(filename, readonly=True)
+      self._data[filename] = _clone(self._original[filename])
+
+  def __getitem__(self, filename: str) -> Any:
+    return self._data[filename]
+
+  def __setitem__(self, filename: str, data: Any) -> None:
+    if filename not in self._data:
+      raise KeyError(f"{filename} bu transaction'a dahil değil")
+    self._data[filename] = data
+
+  def _working(self, filename: str, found: list[dict]) -> list[dict]:
+    """Orijinal listedeki kayıtların bu transaction'daki (değiştirilebilir) karşılıkları"""
+    index = _index(filename, self._original[filename])
+    data = self._data[filename]
+
+    def at(pos, record_id):
+      return pos is not None and pos < len(data) and isinstance(data[pos], dict) and data[pos].get("id") == record_id
+
+    result = []
+    for record in found:
+      record_id = record["id"]
+      pos = index.position(record_id)
+      if not at(pos, record_id):
+        # Liste blok içinde kaydırılmış (ör. başa ekleme): konumları yeniden hesapla
+        pos = self._positions.get(filename, {}).get(record_id)
+        if not at(pos, record_id):
+          positions = self._positions[filename] = {}
+          for i, r in enumerate(data):
+            if isinstance(r, dict):
+              positions.setdefault(r.get("id"), i)
+          pos = positions.get(record_id)
+          if not at(pos, record_id):
+            continue
+      result.append(data[pos])
+    return result
+
+  def get(self, filename: str, record_id: str) -> dict | None:
+    """
+    Kaydı id ile indeks üzerinden bul; dönen nesne tx[dosya] listesindeki kayıttır.
+    get/find transaction başındaki hâle bakar: blok içinde eklenen kayıtları görmez.
+    """
+    original = self._original[filename]
+    if not isinstance(original, list):
+      return None
+    record = _index(filename, original).get(record_id)
+    found = self._working(filename, [record]) if record is not None else []
+    return found[0] if found else None
+
+  def find(self, filename: str, field: str | tuple[str, ...], value: Any) -> list[dict]:
+    """find_records karşılığı; dönen nesneler tx[dosya] listesindeki kayıtlardır."""
+    if field not in _index_keys.get(filename, {}):
+      raise ValueError(f"{filename}: '{field}' için indeks tanımlı değil")
+    original = self._original[filename]
+    if not isinstance(original, list):
+      return []
+    return self._working(filename, _index(filename, original).find(field, value))
+
+  def commit(self) -> None:
+    changes = {}
+    for filename, data in self._data.items():
+      original = self._original[filename]
+      if data == original:
+        continue  # Değişiklik yok
+      data = _clone(data)
+      changes[filename] = Change(data, diff_records(original, data))
+    if changes:
+      # İndeks commit'ten önce yeni veriye taşınır: commit sürerken gelen okuyucular
+      # yeni veriyi görür (bkz. load_json); commit başarısız olursa cache düşer, indeks yeniden kurulur
+      for filename, change in changes.items():
+        _advance_index(filename, self._original[filename], change.data, change.ops)
+      # Tek koleksiyon değişse de iş birimi kalıcıdır (tek fsync)
+      _commit(changes, durable=True)
+
+
+@contextmanager
+def transaction(*filenames: str):
+  """
+  Koleksiyonları tek kilit altında yükle ve birlikte commit et.
+
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+      items = tx["stockItems.json"]
+      ...
+
+  Blok hatasız biterse tüm değişiklikler tek seferde (JSON backend'inde tek
+  journal fsync'i, SQLite'ta tek transaction) yazılır; blokta hata (ör.
+  HTTPException) olursa hiçbir şey yazılmaz. Kilitler süreç içidir.
+  """
+  with _locked(*filenames):
+    tx = Transaction(filenames)
+    tx._load()
+    yield tx
+    tx.commit()
+
+
+def cache_stats() -> dict:
+  """Cache hit/miss sayaçları."""
+  with _cache_lock:
+    return {
+      **_cache_stats,
+      "entries": len(_cache),
+      "backend": get_backend().name,
+      "writes": dict(_write_stats),
+    }
 
 
+def clear_cache() -> None:
+  with _cache_lock:
+    # Yeniden okunan içerik farklı olabilir: sürümleri de ilerlet
+    for filename in _cache:
+      version = _versions[filename] = _versions.get(filename, _version_base) + 1
+      _change_log.pop(filename, None)
+      _log_floor[filename] = version
+    _cache.clear()
+    _indexes.clear()
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
@@ -0,0 +1,276 @@
+"""
+md.docs tutarlılık taraması: diskteki dosyalar ile documents.json kayıtlarını karşılaştırır.
+
+  - orphan: hiçbir kaydın göstermediği dosya (silinemeyen blob'lar, yarım kalmış
+    yüklemeler, sahibi olmayan önizlemeler)
+  - missing: dosyası diskte olmayan kayıt (dangling metadata)
+
+Klasörler thread havuzunda paralel taranır (blobs/xx alt klasörleri ayrı iş);
+her dosya documents.json'un path indeksiyle eşleştirilir. reclaim=True yetim
+dosyaları siler; yeni yazılmış dosyalara (min_age_s) dokunulmaz. Silmeden hemen
+önce dosya, yüklemelerle aynı kilit altında (app.blobs) yeniden sınıflandırılır:
+tarama sırasında aynı içeriği gösteren yeni bir kayıt geldiyse dosya silinmez.
+
+  cd md.service
+  python -m app.docs_scan [--reclaim] [--prune-missing] [--json]
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .blobs import is_referenced, locked
+from .data_loader import delete_record, load_json
+from .uploads import UPLOAD_SESSION_TTL_S
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DOCS_ROOT = BASE_DIR / "md.docs"
+# Kayıtların path alanı md.docs'a göredir ("documents/olcu/..."); sadece bu ağaç taranır
+SCAN_PREFIX = "documents"
+SCAN_WORKERS = int(os.getenv("DOCS_SCAN_WORKERS", "8"))
+# Bundan yeni yetim dosyalar silinmez (süren yükleme olabilir)
+MIN_ORPHAN_AGE_S = 3600.0
+
+_THUMBNAIL = re.compile(r"^(?P<original>.+)\.thumb-\d+\.jpg$")
+
+
+class ScanReport:
+  def __init__(self):
+    self.files = 0
+    self.bytes = 0
+    self.referenced = {"count": 0, "bytes": 0}
+    self.derived = {"count": 0, "bytes": 0}  # önizlemeler
+    self.pending = {"count": 0, "bytes": 0}  # süren devam ettirilebilir yüklemeler
+    self.orphans: list[dict] = []
+    self.missing: list[dict] = []
+    self.reclaimed = {"count": 0, "bytes": 0}
+    self.pruned = 0
+    self.elapsed_s = 0.0
+
+  @property
+  def orphan_bytes(self) -> int:
+    return sum(o["size"] for o in self.orphans)
+
+  def _add(self, bucket: dict, size: int) -> None:
+    bucket["count"] += 1
+    bucket["bytes"] += size
+
+  def to_dict(self) -> dict:
+    return {
+      "files": self.files,
+      "bytes": self.bytes,
+      "referenced": self.referenced,
+      "derived": self.derived,
+      "pending": self.pending,
+      "orphans": {"count": len(self.orphans), "bytes": self.orphan_bytes, "items": self.orphans},
+      "missing": {"count": len(self.missing), "items": self.missing},
+      "reclaimed": self.reclaimed,
+      "pruned": self.pruned,
+      "elapsedS": round(self.elapsed_s, 3),
+    }
+
+
+def _walk(directory: str, root: str) -> list[tuple[str, int, float]]:
+  """directory altındaki dosyalar: (root'a göre yol, boyut, mtime)"""
+  found = []
+  stack = [directory]
+  while stack:
+    current = stack.pop()
+    try:
+      entries = os.scandir(current)
+    except OSError:
+      continue
+    with entries:
+      for entry in entries:
+        try:
+          if entry.is_dir(follow_symlinks=False):
+            stack.append(entry.path)
+          elif entry.is_file(follow_symlinks=False):
+            st = entry.stat(follow_symlinks=False)
+            found.append((os.path.relpath(entry.path, root).replace(os.sep, "/"), st.st_size, st.st_mtime))
+        except OSError:
+          continue
+  return found
+
+
+def _scandir(directory: str) -> list[os.DirEntry]:
+  """Klasör girdileri; klasör tarama sırasında silinmişse veya okunamıyorsa boş"""
+  try:
+    with os.scandir(directory) as entries:
+      return list(entries)
+  except OSError:
+    return []
+
+
+def _walk_files_only(directory: str, root: str) -> list[tuple[str, int, float]]:
+  found = []
+  for entry in _scandir(directory):
+    try:
+      if entry.is_file(follow_symlinks=False):
+        st = entry.stat(follow_symlinks=False)
+        found.append((os.path.relpath(entry.path, root).replace(os.sep, "/"), st.st_size, st.st_mtime))
+    except OSError:
+      continue
+  return found
+
+
+def _list_files(root: Path, workers: int) -> list[tuple[str, int, float]]:
+  """Ağacı paralel tara: her üst klasör (ve blobs altındaki her klasör) ayrı iş"""
+  top = root / SCAN_PREFIX
+  if not top.is_dir():
+    return []
+  dirs = []
+  files = _walk_files_only(str(top), str(root))
+  for entry in _scandir(str(top)):
+    try:
+      if not entry.is_dir(follow_symlinks=False):
+        continue
+      if entry.name == "blobs":
+        dirs.extend(e.path for e in _scandir(entry.path) if e.is_dir(follow_symlinks=False))
+        files.extend(_walk_files_only(entry.path, str(root)))
+      else:
+        dirs.append(entry.path)
+    except OSError:
+      continue
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    for found in pool.map(lambda d: _walk(d, str(root)), dirs):
+      files.extend(found)
+  return files
+
+
+def _classify(root: Path, path: str, now: float) -> tuple[str, Optional[str]]:
+  """(kategori, yetimse sebep): referenced | derived | pending | orphan"""
+  name = path.rsplit("/", 1)[-1]
+  if path.startswith(f"{SCAN_PREFIX}/.tmp/"):
+    if path.startswith(f"{SCAN_PREFIX}/.tmp/sessions/"):
+      # Oturum: {id}.json durum + {id}.part veri; TTL içinde güncellenmişse sürüyor
+      session_id = name.split(".", 1)[0]
+      state = root / SCAN_PREFIX / ".tmp" / "sessions" / f"{session_id}.json"
+      try:
+        if now - state.stat().st_mtime < UPLOAD_SESSION_TTL_S:
+          return "pending", None
+      except OSError:
+        pass
+      return "orphan", "süresi dolmuş yükleme oturumu"
+    return "orphan", "yarım kalmış yükleme"
+  if is_referenced(path):
+    return "referenced", None
+  match = _THUMBNAIL.match(path)
+  if match:
+    if is_referenced(match.group("original")):
+      return "derived", None
+    return "orphan", "sahibi olmayan önizleme"
+  return "orphan", "kayıt yok"
+
+
+def scan(
+  root: Path = DOCS_ROOT,
+  reclaim: bool = False,
+  prune_missing: bool = False,
+  min_age_s: float = MIN_ORPHAN_AGE_S,
+  workers: int = SCAN_WORKERS,
+) -> ScanReport:
+  """
+  Tarama raporu üretir. reclaim: min_age_s'den eski yetim dosyaları siler.
+  prune_missing: dosyası olmayan kayıtları documents.json'dan siler.
+  """
+  started = time.perf_counter()
+  now = time.time()
+  report = ScanReport()
+  on_disk = set()
+  for path, size, mtime in _list_files(root, workers):
+    on_disk.add(path)
+    report.files += 1
+    report.bytes += size
+    kind, reason = _classify(root, path, now)
+    if kind == "orphan":
+      report.orphans.append({"path": path, "size": size, "mtime": mtime, "reason": reason})
+    else:
+      report._add(getattr(report, kind), size)
+
+  records = load_json("documents.json", readonly=True)
+  for record in records if isinstance(records, list) else []:
+    path = record.get("path")
+    if path and path.startswith(f"{SCAN_PREFIX}/") and path not in on_disk:
+      report.missing.append({"id": record.get("id"), "jobId": record.get("jobId"), "path": path})
+
+  if reclaim:
+    old = [o for o in report.orphans if now - o["mtime"] >= min_age_s]
+
+    def _remove(orphan: dict) -> int:
+      path = root / orphan["path"]
+      # Rapordaki sınıflandırma eski olabilir: silmeden hemen önce, yüklemelerle
+      # aynı kilit altında yeniden kontrol et
+      with locked():
+        try:
+          st = path.stat()
+        except OSError:
+          return -1
+        if time.time() - st.st_mtime < min_age_s or _classify(root, orphan["path"], time.time())[0] != "orphan":
+          return -1
+        try:
+          path.unlink()
+        except OSError:
+          return -1
+      return st.st_size
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+      for freed in pool.map(_remove, old):
+        if freed >= 0:
+          report._add(report.reclaimed, freed)
+
+  if prune_missing:
+    for item in report.missing:
+      if item["id"] and delete_record("documents.json", item["id"]):
+        report.pruned += 1
+
+  report.elapsed_s = time.perf_counter() - started
+  return report
+
+
+def _format_bytes(n: int) -> str:
+  for unit in ("B", "KB", "MB", "GB"):
+    if n < 1024 or unit == "GB":
+      return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+    n /= 1024
+  return f"{n} B"
+
+
+def main() -> None:
+  import argparse
+
+  parser = argparse.ArgumentParser(description="md.docs yetim dosya / eksik dosya taraması")
+  parser.add_argument("--root", type=Path, default=DOCS_ROOT, help="md.docs klasörü")
+  parser.add_argument("--reclaim", action="store_true", help="Yetim dosyaları sil")
+  parser.add_argument("--prune-missing", action="store_true", help="Dosyası olmayan kayıtları documents.json'dan sil")
+  parser.add_argument("--min-age", type=float, default=MIN_ORPHAN_AGE_S, help="Bundan yeni (sn) yetimler silinmez")
+  parser.add_argument("--json", action="store_true", help="Raporu JSON olarak yaz")
+  args = parser.parse_args()
+
+  report = scan(args.root, reclaim=args.reclaim, prune_missing=args.prune_missing, min_age_s=args.min_age)
+  if args.json:
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    return
+  print(f"Dosya: {report.files} ({_format_bytes(report.bytes)}), {report.elapsed_s:.2f} sn")
+  print(f"  kayıtlı: {report.referenced['count']} ({_format_bytes(report.referenced['bytes'])})")
+  print(f"  önizleme: {report.derived['count']} ({_format_bytes(report.derived['bytes'])})")
+  print(f"  süren yükleme: {report.pending['count']} ({_format_bytes(report.pending['bytes'])})")
+  print(f"  yetim: {len(report.orphans)} ({_format_bytes(report.orphan_bytes)})")
+  for orphan in report.orphans[:20]:
+    print(f"    {orphan['path']}  {_format_bytes(orphan['size'])}  [{orphan['reason']}]")
+  if len(report.orphans) > 20:
+    print(f"    ... {len(report.orphans) - 20} tane daha (--json ile tamamı)")
+  print(f"Dosyası olmayan kayıt: {len(report.missing)}")
+  for item in report.missing[:20]:
+    print(f"    {item['id']} ({item['jobId']}): {item['path']}")
+  if args.reclaim:
+    print(f"Silinen: {report.reclaimed['count']} dosya, {_format_bytes(report.reclaimed['bytes'])}")
+  if args.prune_missing:
+    print(f"documents.json'dan silinen kayıt: {report.pruned}")
+
+
+if __name__ == "__main__":
+  main()
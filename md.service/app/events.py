@@ -0,0 +1,88 @@
+"""
+Değişiklik bildirimleri için süreç içi yayın merkezi.
+
+data_loader'daki her yazım (on_write) kısa olaylara çevrilir ve abonelere
+iletilir: {"collection": "jobs", "id": "JOB-1", "op": "update", "version": 42}.
+Yazımlar thread'lerde olur; olaylar abonenin event loop'una thread-safe aktarılır.
+Kayıt seviyesinde olmayan yazımlar ve çok kayıtlı toplu yazımlar tek bir
+"reset" olayıyla bildirilir: istemci koleksiyonu yeniden çekmelidir.
+"""
+import asyncio
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .data_loader import on_write
+
+# Bundan fazla kayıt değiştiren yazım tek "reset" olayı olarak bildirilir
+MAX_EVENTS_PER_WRITE = 50
+# Abone kuyruğu dolarsa birikmiş olaylar atılır, yerine tek "overflow" olayı konur
+QUEUE_SIZE = 1000
+
+
+class Subscription:
+  """Tek istemcinin olay kuyruğu; collections=None tüm koleksiyonlar demek"""
+
+  def __init__(self, collections: Optional[set[str]] = None):
+    self.collections = collections
+    self.loop = asyncio.get_running_loop()
+    self.queue: asyncio.Queue = asyncio.Queue()
+
+  def wants(self, collection: str) -> bool:
+    return self.collections is None or collection in self.collections
+
+  def _offer(self, events: list[dict]) -> None:
+    # Event loop thread'inde çalışır
+    if self.queue.qsize() + len(events) > QUEUE_SIZE:
+      while not self.queue.empty():
+        self.queue.get_nowait()
+      events = [{"op": "overflow"}]
+    for event in events:
+      self.queue.put_nowait(event)
+
+
+_subscribers: set[Subscription] = set()
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(collections: Optional[set[str]] = None) -> Subscription:
+  """Event loop içinden çağrılmalıdır; iş bitince unsubscribe edilmelidir"""
+  subscription = Subscription(collections)
+  with _subscribers_lock:
+    _subscribers.add(subscription)
+  return subscription
+
+
+def unsubscribe(subscription: Subscription) -> None:
+  with _subscribers_lock:
+    _subscribers.discard(subscription)
+
+
+def _events(collection: str, version: int, ops: Optional[list[tuple]]) -> list[dict]:
+  if ops is None or len(ops) > MAX_EVENTS_PER_WRITE:
+    return [{"collection": collection, "op": "reset", "version": version}]
+  return [
+    {
+      "collection": collection,
+      "id": op[1] if op[0] == "delete" else op[1].get("id"),
+      "op": op[0],
+      "version": version,
+    }
+    for op in ops
+  ]
+
+
+@on_write
+def _publish(filename: str, version: int, ops: Optional[list[tuple]]) -> None:
+  collection = Path(filename).stem
+  with _subscribers_lock:
+    targets = [s for s in _subscribers if s.wants(collection)]
+  if not targets:
+    return
+  events = _events(collection, version, ops)
+  for subscription in targets:
+    try:
+      subscription.loop.call_soon_threadsafe(subscription._offer, events)
+    except RuntimeError:
+      # Loop kapanmış: abone zaten gitmiş
+      unsubscribe(subscription)
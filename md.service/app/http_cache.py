@@ -0,0 +1,134 @@
+"""
+Koşullu GET desteği (ETag / If-None-Match).
+
+Endpoint'ler okudukları koleksiyonları bildirir; ETag bu koleksiyonların
+sürümlerinden, istek yolundan ve sorgu parametrelerinden türetilir. İstemcinin
+gönderdiği ETag eşleşirse endpoint hiç çalışmaz, 304 döner.
+
+  @router.get("/", dependencies=[Depends(conditional("jobs.json"))])
+
+Dosya indirmeleri için CachedFileResponse: sabit ETag, If-None-Match /
+If-Modified-Since ile 304, If-Range ile uyumlu byte aralıkları (206).
+"""
+import hashlib
+import os
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import anyio
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from .data_loader import collection_version
+
+
+def compute_etag(request: Request, collections: tuple[str, ...], extra: str = "") -> str:
+  versions = ",".join(f"{name}:{collection_version(name)}" for name in collections)
+  raw = f"{request.url.path}?{request.url.query}|{versions}|{extra}"
+  return '"' + hashlib.blake2s(raw.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+# Sıkıştırma middleware'inin ETag'e eklediği kodlama son ekleri
+ENCODING_SUFFIXES = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+  """Sıkıştırılmış temsilin ETag'i: '"abc"' -> '"abc-gzip"'"""
+  return etag[:-1] + f'-{encoding}"'
+
+
+def _strip_encoding(etag: str) -> str:
+  for encoding in ENCODING_SUFFIXES:
+    suffix = f'-{encoding}"'
+    if etag.endswith(suffix):
+      return etag[: -len(suffix)] + '"'
+  return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+  if not if_none_match:
+    return False
+  if if_none_match.strip() == "*":
+    return True
+  # Zayıf karşılaştırma (RFC 9110): W/ öneki ve sıkıştırma son eki yok sayılır
+  candidates = {_strip_encoding(tag.strip().removeprefix("W/")) for tag in if_none_match.split(",")}
+  return etag in candidates
+
+
+def conditional(*collections: str, vary: Optional[Callable[[], str]] = None):
+  """
+  Dependency factory. Yanıta ETag ekler; If-None-Match eşleşirse 304 döndürür.
+  vary: içerik koleksiyonlar dışında bir şeye de bağlıysa (ör. bugünün tarihi)
+  ETag'e katılacak değeri üreten fonksiyon.
+  """
+  def dependency(request: Request, response: Response) -> None:
+    # Sürümler veriden önce okunur: arada yazım olursa ETag eski kalır, sonraki istek 200 alır
+    etag = compute_etag(request, collections, vary() if vary else "")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+      raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+  return dependency
+
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+  if_none_match = headers.get("if-none-match")
+  if if_none_match is not None:
+    return etag_matches(if_none_match, etag)
+  if_modified_since = headers.get("if-modified-since")
+  if if_modified_since:
+    try:
+      return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+      return False
+  return False
+
+
+class CachedFileResponse(FileResponse):
+  """
+  FileResponse + koşullu istekler. etag verilirse (ör. içerik hash'i) mtime tabanlı
+  ETag yerine o kullanılır; immutable=True içerik adresli dosyalar içindir.
+  Sunucu ASGI "http.response.pathsend" eklentisini destekliyorsa tam dosya
+  gövdesi sunucuya bırakılır (sendfile); aksi hâlde büyük bloklarla okunur.
+  """
+  chunk_size = 1024 * 1024
+
+  def __init__(self, path, *, etag: Optional[str] = None, immutable: bool = False, **kwargs):
+    super().__init__(path, **kwargs)
+    if etag:
+      self.headers["etag"] = etag
+    self.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if immutable else "no-cache"
+
+  def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+    return http_if_range == self.headers.get("etag") or super()._should_use_range(http_if_range, stat_result)
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if self.stat_result is None:
+      self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+      self.set_stat_headers(self.stat_result)
+    headers = Headers(scope=scope)
+    if scope["method"] in ("GET", "HEAD") and _not_modified(headers, self.headers["etag"], self.stat_result.st_mtime):
+      keep = ("etag", "cache-control", "last-modified")
+      await send({
+        "type": "http.response.start",
+        "status": 304,
+        "headers": [(k, v) for k, v in self.raw_headers if k.decode("latin-1") in keep],
+      })
+      await send({"type": "http.response.body", "body": b""})
+      return
+    if "range" not in headers and "http.response.pathsend" in scope.get("extensions", {}):
+      await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+      if scope["method"] == "HEAD":
+        await send({"type": "http.response.body", "body": b""})
+      else:
+        await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+      if self.background is not None:
+        await self.background()
+      return
+    await super().__call__(scope, receive, send)
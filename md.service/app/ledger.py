@@ -0,0 +1,291 @@
+"""
+Stok defteri: kalem bakiyeleri (onHand, reserved) stockMovements.json'daki
+hareketlerden türetilir; stockItems.json'daki sayaçlar bunun önbelleğidir ve
+yalnızca Posting ile, hareket eklendikten sonra defter bakiyesinden yazılır.
+
+Her kalem için hareketler tarih sırasında tutulur (aynı gün içinde dosyadaki
+sıra) ve her SNAPSHOT_EVERY harekette bir bakiye görüntüsü (snapshot) alınır.
+Yeni hareketler on_write ile gelir ve bakiyeye artımlı eklenir; geriye tarihli
+bir hareket yerine yerleştirilir, ondan sonraki görüntüler yeniden hesaplanır.
+Geçmiş bir tarihteki bakiye o tarihten önceki en yakın görüntüden itibaren en
+fazla SNAPSHOT_EVERY hareket tekrar oynatılarak bulunur. Hareket silme/düzeltme
+veya dosyanın dışarıdan değişmesi defteri geçersiz kılar, ilk sorguda baştan kurulur.
+
+Hareket tipleri (change işaretli miktardır):
+  stockIn   onHand += change
+  stockOut  onHand += change (change < 0); rezerv eldeki stoku aşamaz
+  reserve   reserved += change
+  release   reserved += change (change < 0)
+  consume   onHand += change, reserved += change (change < 0)
+  adjust    onHand += change, reserved += reservedChange (elle düzeltme / açılış)
+"""
+import bisect
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from .data_loader import load_json, on_write
+
+SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "50"))
+MOVEMENTS_FILE = "stockMovements.json"
+
+
+def apply_movement(on_hand: float, reserved: float, movement: dict) -> tuple[float, float]:
+  """Tek hareketin bakiyeye etkisi; sayaçlar da yalnızca bu kurallarla değişir"""
+  kind = movement.get("type")
+  change = movement.get("change") or 0
+  if kind == "stockIn":
+    on_hand += change
+  elif kind == "stockOut":
+    on_hand = max(0, on_hand + change)
+    # Stoktan düşme başka işlerin rezervasyonunu azaltabilir (bulk_reserve consume)
+    reserved = min(reserved, on_hand)
+  elif kind == "reserve":
+    reserved += change
+  elif kind == "release":
+    reserved = max(0, reserved + change)
+  elif kind == "consume":
+    reserved = max(0, reserved + change)
+    on_hand = max(0, on_hand + change)
+  elif kind == "adjust":
+    on_hand += change
+    reserved += movement.get("reservedChange") or 0
+  return on_hand, reserved
+
+
+def _day(movement: dict) -> str:
+  return str(movement.get("date") or "")[:10]
+
+
+class _ItemLedger:
+  """Tek kalemin tarih sıralı hareketleri, güncel bakiyesi ve ara görüntüleri"""
+
+  def __init__(self, moves: Optional[list[dict]] = None):
+    # Sıralama kararlı: aynı gündeki hareketler geliş sırasını korur
+    self.moves: list[dict] = sorted(moves or [], key=_day)
+    self.days: list[str] = [_day(m) for m in self.moves]
+    self.on_hand = 0.0
+    self.reserved = 0.0
+    # snapshots[i]: ilk (i + 1) * SNAPSHOT_EVERY hareket uygulandıktan sonraki (onHand, reserved)
+    self.snapshots: list[tuple[float, float]] = []
+    self._replay()
+
+  def _replay(self) -> None:
+    """Son geçerli görüntüden itibaren güncel bakiyeyi ve sonraki görüntüleri hesapla"""
+    start = len(self.snapshots) * SNAPSHOT_EVERY
+    on_hand, reserved = self.snapshots[-1] if self.snapshots else (0.0, 0.0)
+    for count in range(start, len(self.moves)):
+      on_hand, reserved = apply_movement(on_hand, reserved, self.moves[count])
+      if (count + 1) % SNAPSHOT_EVERY == 0:
+        self.snapshots.append((on_hand, reserved))
+    self.on_hand, self.reserved = on_hand, reserved
+
+  def add(self, movement: dict) -> None:
+    """Hareketi tarih sırasındaki yerine ekle; aynı günün hareketlerinin sonuna"""
+    day = _day(movement)
+    pos = bisect.bisect_right(self.days, day)
+    self.moves.insert(pos, movement)
+    self.days.insert(pos, day)
+    if pos < len(self.moves) - 1:
+      # Geriye tarihli hareket: konumundan sonraki görüntüler geçersiz
+      del self.snapshots[pos // SNAPSHOT_EVERY:]
+      self._replay()
+      return
+    self.on_hand, self.reserved = apply_movement(self.on_hand, self.reserved, movement)
+    if len(self.moves) % SNAPSHOT_EVERY == 0:
+      self.snapshots.append((self.on_hand, self.reserved))
+
+  def projected(self, pending: list[dict]) -> tuple[float, float]:
+    """pending hareketler eklenince olacak güncel bakiye; defter değişmez"""
+    last = self.days[-1] if self.days else ""
+    days = [_day(m) for m in pending]
+    if all(day >= previous for previous, day in zip([last] + days, days)):
+      on_hand, reserved = self.on_hand, self.reserved
+      moves = pending
+    else:
+      on_hand, reserved = 0.0, 0.0
+      moves = sorted(self.moves + pending, key=_day)
+    for movement in moves:
+      on_hand, reserved = apply_movement(on_hand, reserved, movement)
+    return on_hand, reserved
+
+  def as_of(self, day: str) -> tuple[float, float, int, int]:
+    """day sonu bakiyesi: (onHand, reserved, uygulanan hareket, tekrar oynatılan hareket)"""
+    # day dahil o güne kadarki hareketler; önlerindeki son görüntüden tekrar oynatılır
+    count = bisect.bisect_right(self.days, day)
+    taken = min(count // SNAPSHOT_EVERY, len(self.snapshots))
+    on_hand, reserved = self.snapshots[taken - 1] if taken else (0.0, 0.0)
+    for movement in self.moves[taken * SNAPSHOT_EVERY:count]:
+      on_hand, reserved = apply_movement(on_hand, reserved, movement)
+    return on_hand, reserved, count, count - taken * SNAPSHOT_EVERY
+
+
+class StockLedger:
+  def __init__(self):
+    # Kurulum sırasında load_json dosyanın dışarıdan değiştiğini görüp listener'ı çağırabilir
+    self._lock = threading.RLock()
+    self._items: Optional[dict[str, _ItemLedger]] = None
+    self._seen: set[str] = set()
+
+  def _build(self) -> dict[str, _ItemLedger]:
+    moves: dict[str, list[dict]] = {}
+    seen: set[str] = set()
+    movements = load_json(MOVEMENTS_FILE, readonly=True)
+    # Dosyada en yeni hareket başta: geliş sırası için tersten
+    for movement in reversed(movements if isinstance(movements, list) else []):
+      item_id = movement.get("itemId")
+      if item_id is None:
+        continue
+      moves.setdefault(item_id, []).append(movement)
+      seen.add(movement.get("id"))
+    self._seen = seen
+    return {item_id: _ItemLedger(item_moves) for item_id, item_moves in moves.items()}
+
+  def _ensure(self) -> dict[str, _ItemLedger]:
+    if self._items is None:
+      self._items = self._build()
+    return self._items
+
+  def invalidate(self) -> None:
+    with self._lock:
+      self._items = None
+      self._seen = set()
+
+  def apply(self, ops: Optional[list[tuple]]) -> None:
+    """Yazım işlemlerini uygula: başa eklenen yeni hareketler artımlı, diğer her şey yeniden kurulum"""
+    with self._lock:
+      if self._items is None:
+        return
+      if ops is None:
+        self._items = None
+        return
+      for op in ops:
+        if op[0] == "insert" and op[2]:
+          movement = op[1]
+          if movement.get("id") in self._seen:
+            continue  # Kurulum bu hareketi zaten okudu
+          if movement.get("itemId") is not None:
+            self._items.setdefault(movement["itemId"], _ItemLedger()).add(movement)
+          self._seen.add(movement.get("id"))
+        else:
+          # Sona ekleme (dosya sırasında daha eski), düzeltme veya silme: geçmiş değişti
+          self._items = None
+          return
+
+  def balance(self, item_id: str, as_of: Optional[str] = None) -> dict:
+    """Kalemin güncel veya as_of (YYYY-MM-DD, gün sonu) bakiyesi"""
+    with self._lock:
+      item = self._ensure().get(item_id)
+      if item is None:
+        on_hand, reserved, count, replayed = 0.0, 0.0, 0, 0
+      elif as_of is None:
+        on_hand, reserved, count, replayed = item.on_hand, item.reserved, len(item.moves), 0
+      else:
+        on_hand, reserved, count, replayed = item.as_of(as_of)
+    return {
+      "itemId": item_id,
+      "asOf": as_of,
+      "onHand": on_hand,
+      "reserved": reserved,
+      "available": on_hand - reserved,
+      "movements": count,
+      "replayed": replayed,
+    }
+
+  def projected(self, item_id: str, pending: list[dict]) -> tuple[float, float]:
+    """Henüz commit edilmemiş pending hareketlerle birlikte (onHand, reserved)"""
+    with self._lock:
+      item = self._ensure().get(item_id)
+      return (item or _ItemLedger()).projected(pending)
+
+  def item_ids(self) -> list[str]:
+    with self._lock:
+      return list(self._ensure())
+
+
+ledger = StockLedger()
+
+
+@on_write
+def _on_movements_write(filename: str, version: int, ops: Optional[list[tuple]]) -> None:
+  if filename == MOVEMENTS_FILE:
+    ledger.apply(ops)
+
+
+def adjust_movement(item: dict, on_hand_change: float, reserved_change: float, reason: str) -> dict:
+  """Sayaçların elle değiştirilmesini defter hareketi olarak kaydet (bakiye hareketlerden türetilir)"""
+  return {
+    "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+    "date": datetime.utcnow().isoformat()[:10],
+    "item": item.get("name"),
+    "itemId": item.get("id"),
+    "productCode": item.get("productCode"),
+    "colorCode": item.get("colorCode"),
+    "change": on_hand_change,
+    "reservedChange": reserved_change,
+    "type": "adjust",
+    "reason": reason,
+    "operator": "Sistem",
+    "jobId": None,
+  }
+
+
+class Posting:
+  """
+  Bir transaction içinde deftere hareket yazımı. Her hareketten sonra kalemin
+  sayaçları defterden yazılır: commit edilmiş bakiye + bu transaction'da o kaleme
+  eklenen hareketler. Transaction stockMovements.json kilidini tuttuğu için
+  commit edilmiş bakiye bu sürede değişmez.
+  """
+
+  def __init__(self, tx, tolerance: float = 1e-9):
+    self._movements = tx[MOVEMENTS_FILE]
+    self._pending: dict[str, list[dict]] = {}
+    self._tolerance = tolerance
+
+  def balance(self, item: dict) -> tuple[float, float]:
+    """Kalemin bu transaction'daki (onHand, reserved) bakiyesi"""
+    return ledger.projected(item.get("id"), self._open(item))
+
+  def post(self, item: dict, movement: dict) -> dict:
+    """Hareketi deftere ekle ve kalemin sayaçlarını yeni defter bakiyesinden yaz"""
+    pending = self._open(item)
+    self._movements.insert(0, movement)
+    pending.append(movement)
+    item["onHand"], item["reserved"] = ledger.projected(item.get("id"), pending)
+    return movement
+
+  def _open(self, item: dict) -> list[dict]:
+    item_id = item.get("id")
+    pending = self._pending.get(item_id)
+    if pending is None:
+      pending = self._pending[item_id] = []
+      # Defter dışı sayaç farkı (hareketsiz açılış bakiyesi, elle düzenlenmiş dosya)
+      # kaybolmasın: önce düzeltme hareketi olarak deftere yazılır
+      on_hand, reserved = ledger.projected(item_id, [])
+      on_hand_change = (item.get("onHand") or 0) - on_hand
+      reserved_change = (item.get("reserved") or 0) - reserved
+      if abs(on_hand_change) > self._tolerance or abs(reserved_change) > self._tolerance:
+        self.post(item, adjust_movement(item, on_hand_change, reserved_change, "Defter mutabakatı"))
+    return pending
+
+
+def drift(items: list[dict], tolerance: float = 1e-9) -> list[dict]:
+  """stockItems sayaçları ile defter bakiyesi arasındaki farklar"""
+  result = []
+  for item in items:
+    balance = ledger.balance(item.get("id"))
+    on_hand = item.get("onHand") or 0
+    reserved = item.get("reserved") or 0
+    if abs(on_hand - balance["onHand"]) > tolerance or abs(reserved - balance["reserved"]) > tolerance:
+      result.append({
+        "itemId": item.get("id"),
+        "productCode": item.get("productCode"),
+        "colorCode": item.get("colorCode"),
+        "name": item.get("name"),
+        "counters": {"onHand": on_hand, "reserved": reserved},
+        "ledger": {"onHand": balance["onHand"], "reserved": balance["reserved"]},
+      })
+  return result
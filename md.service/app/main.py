@@ -1,12 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .compression import CompressionMiddleware
+from .data_loader import cache_stats
+
 from .routers import (
     archive,
     auth,
     customers,
     dashboard,
     documents,
+    events,
     finance,
     jobs,
     personnel,
@@ -18,6 +22,7 @@ from .routers import (
     settings,
     stock,
     suppliers,
+    sync,
     tasks,
     teams,
     colors,
@@ -35,7 +40,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# gzip/br; ETag'li yanıtların sıkıştırılmış hâli cache'lenir (app/compression.py)
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(auth.router)
 app.include_router(dashboard.router)
@@ -56,9 +64,15 @@ app.include_router(settings.router)
 app.include_router(colors.router)
 app.include_router(documents.router)
 app.include_router(production.router)
+app.include_router(sync.router)
+app.include_router(events.router)
 
 
 @app.get("/health", tags=["meta"])
 def health():
   return {"status": "ok"}
 
+
+@app.get("/health/cache", tags=["meta"])
+def health_cache():
+  return cache_stats()
@@ -0,0 +1,61 @@
+"""
+Liste endpoint'leri için cursor tabanlı (keyset) sayfalama.
+
+Cursor, son dönen kaydın sıralama anahtarını taşır; sonraki sayfa bu anahtardan
+sonra gelen kayıtlarla başlar. Sayfalar arasında kayıt eklense de anahtarı
+değişmeyen kayıtlar tekrar etmez ve atlanmaz. Sonraki sayfanın cursor'u
+X-Next-Cursor header'ında döner; gövde eskisi gibi düz liste kalır.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: Optional[str], key: tuple) -> str:
+  raw = json.dumps([sort, list(key)], ensure_ascii=False, separators=(",", ":"))
+  return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Optional[str]) -> tuple:
+  """Cursor'ı çöz; bozuksa veya başka bir sıralamaya aitse 400"""
+  try:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    cursor_sort, key = json.loads(raw)
+  except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+    raise HTTPException(status_code=400, detail="Geçersiz cursor")
+  if cursor_sort != sort or not isinstance(key, list):
+    raise HTTPException(status_code=400, detail="Cursor bu sıralamaya ait değil")
+  return tuple(key)
+
+
+def paginate(
+  items: list,
+  key: Callable[[Any], tuple],
+  limit: Optional[int] = None,
+  cursor: Optional[str] = None,
+  sort: Optional[str] = None,
+  reverse: bool = False,
+  response: Optional[Response] = None,
+) -> list:
+  """
+  items'ı key'e göre sırala ve cursor'dan sonraki en fazla limit kaydı döndür.
+  key kayıtları tekil olarak sıralamalıdır (son eleman olarak id önerilir).
+  Devamı varsa cursor response'un X-Next-Cursor header'ına yazılır.
+  """
+  keyed = sorted(((key(item), item) for item in items), key=lambda pair: pair[0], reverse=reverse)
+  if cursor:
+    after = decode_cursor(cursor, sort)
+    try:
+      keyed = [pair for pair in keyed if (pair[0] < after if reverse else pair[0] > after)]
+    except TypeError:
+      raise HTTPException(status_code=400, detail="Geçersiz cursor")
+  if limit is not None and len(keyed) > limit:
+    keyed = keyed[:limit]
+    if response is not None:
+      response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, keyed[-1][0])
+  return [item for _, item in keyed]
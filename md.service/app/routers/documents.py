@@ -1,16 +1,27 @@
 import os
+import re
+import threading
 import uuid
-import shutil
+import zipfile
 from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from .. import blobs, thumbnails
+from ..data_loader import declare_index, delete_record, find_records, get_record, load_json, upsert_record
+from ..http_cache import CachedFileResponse, conditional
+from ..uploads import (
+    MAX_CHUNK_BYTES, MIN_CHUNK_BYTES, UPLOAD_CHUNK_BYTES, UPLOAD_MAX_BYTES,
+    UploadSessionStore, hash_file, parse_upload, write_chunk,
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+declare_index("documents.json", "jobId")
+
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
 DOCS_DIR = BASE_DIR / "md.docs" / "documents"
@@ -19,6 +30,16 @@ DOCS_DIR = BASE_DIR / "md.docs" / "documents"
 DOCS_DIR.mkdir(parents=True, exist_ok=True)
 for subdir in ["olcu", "teknik", "sozlesme", "teklif", "diger", "servis"]:
     (DOCS_DIR / subdir).mkdir(exist_ok=True)
+# İçerik adresli dosyalar: blobs/<sha256[:2]>/<sha256>. Aynı içerik tek kez saklanır,
+# documents.json kayıtları path + sha256 ile blob'u gösterir. Eski kayıtlar
+# (sha256 alanı olmayanlar) tip klasörlerindeki kendi dosyalarını kullanmaya devam eder.
+BLOBS_DIR = DOCS_DIR / "blobs"
+BLOBS_DIR.mkdir(exist_ok=True)
+# Yarım kalan yüklemeler (tamamlanınca hedef klasöre taşınır)
+TEMP_DIR = DOCS_DIR / ".tmp"
+TEMP_DIR.mkdir(exist_ok=True)
+# Devam ettirilebilir yükleme oturumları
+upload_sessions = UploadSessionStore(TEMP_DIR / "sessions")
 
 ALLOWED_TYPES = {
     # Görsel formatları
@@ -71,12 +92,25 @@ class DocumentMeta(BaseModel):
     description: str | None = None
 
 
-@router.get("/")
+class UploadInit(BaseModel):
+    jobId: str
+    docType: str
+    filename: str
+    size: int
+    mimeType: str | None = None
+    description: str | None = None
+    chunkSize: int | None = None
+    # Verilirse ve bu içerik zaten saklanıyorsa yükleme parça gönderilmeden tamamlanır
+    sha256: str | None = None
+
+
+@router.get("/", dependencies=[Depends(conditional("documents.json"))])
 def list_documents(job_id: str | None = None, doc_type: str | None = None):
     """List all documents, optionally filtered by jobId or type"""
-    docs = load_json("documents.json")
     if job_id:
-        docs = [d for d in docs if d.get("jobId") == job_id]
+        docs = find_records("documents.json", "jobId", job_id, readonly=True)
+    else:
+        docs = load_json("documents.json", readonly=True)
     if doc_type:
         docs = [d for d in docs if d.get("type") == doc_type]
     return docs
@@ -85,164 +119,440 @@ def list_documents(job_id: str | None = None, doc_type: str | None = None):
 @router.get("/{doc_id}")
 def get_document(doc_id: str):
     """Get document metadata by ID"""
-    docs = load_json("documents.json")
-    for doc in docs:
-        if doc.get("id") == doc_id:
-            return doc
-    raise HTTPException(status_code=404, detail="Döküman bulunamadı")
-
-
-@router.get("/{doc_id}/download")
-def download_document(doc_id: str):
-    """Download a document file"""
-    docs = load_json("documents.json")
-    doc = None
-    for d in docs:
-        if d.get("id") == doc_id:
-            doc = d
-            break
-    
+    doc = get_record("documents.json", doc_id, readonly=True)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    return doc
+
+
+@router.api_route("/{doc_id}/download", methods=["GET", "HEAD"])
+def download_document(doc_id: str, inline: bool = False):
+    """
+    Download a document file. Supports Range (206), If-Range, If-None-Match /
+    If-Modified-Since (304). inline=true: tarayıcıda görüntülemek için.
+    """
+    doc = get_record("documents.json", doc_id, readonly=True)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
     file_path = BASE_DIR / "md.docs" / doc["path"]
-    if not file_path.exists():
+    try:
+        stat_result = file_path.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="Dosya bulunamadı")
     
-    return FileResponse(
+    # İçerik adresli dosyanın içeriği hiç değişmez: hash güçlü ETag, süresiz cache
+    sha256 = doc.get("sha256")
+    return CachedFileResponse(
         path=str(file_path),
         filename=doc.get("originalName", doc["filename"]),
-        media_type=doc.get("mimeType", "application/octet-stream")
+        media_type=doc.get("mimeType") or "application/octet-stream",
+        stat_result=stat_result,
+        etag=f'"{sha256}"' if sha256 else None,
+        immutable=bool(sha256),
+        content_disposition_type="inline" if inline else "attachment",
     )
 
 
-@router.post("/upload")
-async def upload_document(
-    file: UploadFile = File(...),
-    jobId: str = Form(...),
-    docType: str = Form(...),
-    description: str = Form(None)
-):
-    """
-    Upload a document file.
-    docType: olcu, teknik, sozlesme, teklif, diger, measure_*, technical_*
-    """
-    # Validate type - ana tipler ve iş kolu bazlı tipler
-    valid_base_types = ["olcu", "teknik", "sozlesme", "teklif", "diger", "servis_oncesi", "servis_sonrasi"]
-    is_role_based = docType.startswith("measure_") or docType.startswith("technical_")
-    
-    if docType not in valid_base_types and not is_role_based:
-        raise HTTPException(status_code=400, detail="Geçersiz döküman tipi")
-    
-    # Dosya uzantısını al
-    original_name = file.filename or "unnamed"
+# Swagger'da form alanlarının görünmesi için (gövde elle ayrıştırılıyor)
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "jobId", "docType"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "jobId": {"type": "string"},
+                        "docType": {"type": "string"},
+                        "description": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def resolve_extension(original_name: str, content_type: str) -> str:
+    """content-type veya uzantıya göre kaydedilecek uzantı; desteklenmiyorsa 400"""
     file_ext = os.path.splitext(original_name)[1].lower()
     
-    # content-type veya uzantıya göre kontrol
-    content_type = file.content_type or ""
-    
     # Önce content-type'a bak
     if content_type in ALLOWED_TYPES and ALLOWED_TYPES[content_type] is not None:
-        ext = ALLOWED_TYPES[content_type]
+        return ALLOWED_TYPES[content_type]
     # content-type bilinmiyorsa uzantıya bak
-    elif file_ext in ALLOWED_EXTENSIONS:
-        ext = file_ext
-    # application/octet-stream ise uzantıya güven
-    elif content_type == "application/octet-stream" and file_ext in ALLOWED_EXTENSIONS:
-        ext = file_ext
-    else:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Desteklenmeyen dosya tipi: {content_type or 'bilinmiyor'} ({file_ext}). "
-                   f"Desteklenen formatlar: JPG, PNG, PDF, DOC, DOCX, XLS, XLSX, DWG, DXF, ZIP, RAR vb."
-        )
+    if file_ext in ALLOWED_EXTENSIONS:
+        return file_ext
+    raise HTTPException(
+        status_code=400,
+        detail=f"Desteklenmeyen dosya tipi: {content_type or 'bilinmiyor'} ({file_ext}). "
+               f"Desteklenen formatlar: JPG, PNG, PDF, DOC, DOCX, XLS, XLSX, DWG, DXF, ZIP, RAR vb."
+    )
+
+
+# İş kolu bazlı tipler: measure_<rol> / technical_<rol>; tip ZIP'te klasör adı olur
+ROLE_BASED_DOC_TYPE = re.compile(r"(measure|technical)_[A-Za-z0-9_-]+")
+
+
+def validate_doc_type(docType: str) -> None:
+    """Validate type - ana tipler ve iş kolu bazlı tipler"""
+    valid_base_types = ["olcu", "teknik", "sozlesme", "teklif", "diger", "servis_oncesi", "servis_sonrasi"]
+    is_role_based = ROLE_BASED_DOC_TYPE.fullmatch(docType) is not None
     
-    # Generate unique filename
+    if docType not in valid_base_types and not is_role_based:
+        raise HTTPException(status_code=400, detail="Geçersiz döküman tipi")
+
+
+def blob_relpath(sha256: str) -> str:
+    """md.docs'a göre blob yolu (documents.json'daki path alanı)"""
+    return f"documents/blobs/{sha256[:2]}/{sha256}"
+
+
+def find_blob(sha256: str, size: int) -> bool:
+    """Bu içerik zaten saklanıyor mu (boyut da tutmalı)"""
+    blob = BASE_DIR / "md.docs" / blob_relpath(sha256)
+    try:
+        return blob.stat().st_size == size
+    except OSError:
+        return False
+
+
+def _store_blob_and_record(temp_path: Path | None, sha256: str, size: int, doc_meta: dict) -> bool:
+    """
+    Thread'de çalışır. Blob yoksa geçici dosyayı blob yapar; True = yeni blob yazıldı.
+    Kilit sadece dosya işlemleri için tutulur; kayıt yazılana kadar blob bekleyen
+    referans sayılır ve silinmez.
+    """
+    relpath = blob_relpath(sha256)
+    with blobs.referencing(temp_path, BASE_DIR / "md.docs" / relpath, relpath, size) as created:
+        upsert_record("documents.json", doc_meta, prepend=True)
+    return created
+
+
+async def store_document(temp_path: Path | None, size: int, sha256: str, *, jobId: str, docType: str,
+                         ext: str, original_name: str, content_type: str, description: str | None) -> dict:
+    """
+    Tamamlanmış geçici dosyayı içerik adresli blob olarak saklar ve documents.json
+    kaydını yazar. Aynı içerik zaten varsa geçici dosya silinir, disk kullanılmaz.
+    temp_path None ise blob'un var olması beklenir (hash ile anında tamamlama).
+    Dosya işlemleri ve metadata yazımı thread'de yapılır; event loop bloklanmaz.
+    """
     doc_id = f"DOC-{str(uuid.uuid4())[:8].upper()}"
     safe_name = f"{doc_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{ext}"
     
-    # İş kolu bazlı dosyalar için klasör belirleme
-    target_subdir = "diger"
-    if docType in ["olcu", "teknik", "sozlesme", "teklif", "diger"]:
-        target_subdir = docType
-    elif docType.startswith("measure_"):
-        target_subdir = "olcu"
-    elif docType.startswith("technical_"):
-        target_subdir = "teknik"
-    elif docType.startswith("servis"):
-        target_subdir = "servis"
-    
-    # Save file
-    target_dir = DOCS_DIR / target_subdir
-    target_dir.mkdir(parents=True, exist_ok=True)
-    target_path = target_dir / safe_name
-    
-    try:
-        with open(target_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
-    
-    # Get file size
-    file_size = target_path.stat().st_size
-    
     # Create metadata
     doc_meta = {
         "id": doc_id,
         "jobId": jobId,
         "type": docType,
         "filename": safe_name,
-        "originalName": file.filename,
-        "path": f"documents/{target_subdir}/{safe_name}",
+        "originalName": original_name,
+        "path": blob_relpath(sha256),
+        "sha256": sha256,
         "mimeType": content_type,
-        "size": file_size,
+        "size": size,
         "uploadedBy": "Kullanıcı",
         "uploadedAt": datetime.utcnow().isoformat() + "Z",
         "description": description
     }
     
-    # Save to database
-    docs = load_json("documents.json")
-    docs.insert(0, doc_meta)
-    save_json("documents.json", docs)
+    # Save blob + database
+    try:
+        created = await anyio.to_thread.run_sync(_store_blob_and_record, temp_path, sha256, size, doc_meta)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
+    
+    # Resimlerin önizlemeleri arka planda üretilir (aynı blob için zaten varsa atlanır)
+    if thumbnails.is_image(doc_meta):
+        thumbnails.schedule(BASE_DIR / "md.docs" / doc_meta["path"])
+    
+    return {**doc_meta, "deduplicated": not created}
+
+
+@router.get("/{doc_id}/thumbnail")
+async def get_document_thumbnail(doc_id: str, size: int = 256):
+    """
+    JPEG preview of an image document. size: 128, 256 or 512 (longest edge).
+    Generated in the background after upload, or on first request for older files.
+    """
+    if size not in thumbnails.THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz boyut; desteklenenler: {', '.join(map(str, thumbnails.THUMBNAIL_SIZES))}")
+    if not thumbnails.available():
+        raise HTTPException(status_code=501, detail="Önizleme desteği kurulu değil (Pillow)")
+    doc = await anyio.to_thread.run_sync(lambda: get_record("documents.json", doc_id, readonly=True))
+    if not doc:
+        raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    if not thumbnails.is_image(doc):
+        raise HTTPException(status_code=404, detail="Bu döküman için önizleme yok")
+    
+    file_path = BASE_DIR / "md.docs" / doc["path"]
+    if not await anyio.to_thread.run_sync(file_path.exists):
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı")
+    thumb = await thumbnails.get_thumbnail(file_path, size)
+    if thumb is None:
+        raise HTTPException(status_code=422, detail="Önizleme üretilemedi")
     
+    # Bir dökümanın içeriği değişmez: önizleme süresiz cache'lenebilir
+    return CachedFileResponse(path=str(thumb), media_type="image/jpeg", immutable=True)
+
+
+@router.post("/upload", openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_document(request: Request):
+    """
+    Upload a document file (multipart: file, jobId, docType, description).
+    docType: olcu, teknik, sozlesme, teklif, diger, measure_*, technical_*
+    Gövde akış hâlinde diske yazılır; UPLOAD_MAX_BYTES aşılırsa 413.
+    """
+    upload = await parse_upload(request, TEMP_DIR)
+    try:
+        jobId = upload.fields.get("jobId")
+        docType = upload.fields.get("docType")
+        if not jobId or not docType:
+            raise HTTPException(status_code=422, detail="jobId ve docType zorunlu")
+        validate_doc_type(docType)
+        original_name = upload.filename or "unnamed"
+        ext = resolve_extension(original_name, upload.content_type)
+        return await store_document(
+            upload.sink.path, upload.size, upload.sink.hexdigest,
+            jobId=jobId, docType=docType, ext=ext,
+            original_name=original_name, content_type=upload.content_type,
+            description=upload.fields.get("description"),
+        )
+    finally:
+        # Taşınmışsa silinecek bir şey kalmaz
+        await upload.discard()
+
+
+# --- Devam ettirilebilir (parçalı) yükleme ---
+#   POST   /documents/uploads                      -> oturum aç (uploadId, chunkSize)
+#   PUT    /documents/uploads/{id}/chunks/{index}  -> parça gönder (ham gövde)
+#   GET    /documents/uploads/{id}                 -> alınan aralıklar / eksik parçalar
+#   POST   /documents/uploads/{id}/complete        -> birleştir, documents.json'a yaz
+#   DELETE /documents/uploads/{id}                 -> iptal
+
+
+def _get_session(upload_id: str):
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Yükleme oturumu bulunamadı")
+    return session
+
+
+def _document_args(meta: dict) -> dict:
+    """Oturum meta verisinden store_document argümanları"""
+    return {
+        "jobId": meta["jobId"],
+        "docType": meta["docType"],
+        "ext": resolve_extension(meta["filename"], meta.get("mimeType") or ""),
+        "original_name": meta["filename"],
+        "content_type": meta.get("mimeType") or "application/octet-stream",
+        "description": meta.get("description"),
+    }
+
+
+@router.post("/uploads")
+async def initiate_upload(payload: UploadInit):
+    """
+    Start a resumable upload; returns uploadId and the chunk layout.
+    If sha256 is given and that content is already stored, the document is
+    created right away: {"complete": true, "document": {...}}, no chunks needed.
+    """
+    validate_doc_type(payload.docType)
+    resolve_extension(payload.filename, payload.mimeType or "")
+    if payload.size <= 0:
+        raise HTTPException(status_code=400, detail="Dosya boyutu geçersiz")
+    if payload.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Dosya çok büyük (en fazla {UPLOAD_MAX_BYTES // (1024 * 1024)} MB)")
+    meta = payload.model_dump(exclude={"size", "chunkSize"})
+    if payload.sha256:
+        meta["sha256"] = payload.sha256.lower()
+        if await anyio.to_thread.run_sync(find_blob, meta["sha256"], payload.size):
+            try:
+                doc_meta = await store_document(None, payload.size, meta["sha256"], **_document_args(meta))
+            except HTTPException as exc:
+                if exc.status_code != 409:
+                    raise
+                # Blob arada silinmiş: normal yüklemeye devam
+            else:
+                return {"uploadId": None, "size": payload.size, "complete": True, "document": doc_meta}
+    chunk_size = min(max(payload.chunkSize or UPLOAD_CHUNK_BYTES, MIN_CHUNK_BYTES), MAX_CHUNK_BYTES)
+    session = await anyio.to_thread.run_sync(upload_sessions.create, payload.size, chunk_size, meta)
+    return session.status()
+
+
+@router.get("/uploads/{upload_id}")
+def get_upload_status(upload_id: str):
+    """Received byte ranges and missing chunk numbers of a resumable upload"""
+    return _get_session(upload_id).status()
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    """
+    Upload one chunk as the raw request body. Chunk i covers bytes
+    [i*chunkSize, min((i+1)*chunkSize, size)). Re-sending a chunk overwrites it.
+    Optional X-Chunk-Sha256 header is verified.
+    """
+    session = await anyio.to_thread.run_sync(_get_session, upload_id)
+    await write_chunk(upload_sessions, session, index, request, request.headers.get("x-chunk-sha256"))
+    return session.status()
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    """Assemble a fully received upload and create its documents.json record"""
+    session = await anyio.to_thread.run_sync(_get_session, upload_id)
+    if not session.complete:
+        raise HTTPException(status_code=409, detail={"message": "Eksik parçalar var", "missingChunks": session.missing})
+    if not upload_sessions.claim(session):
+        raise HTTPException(status_code=409, detail="Yükleme zaten tamamlanıyor veya parça yazımı sürüyor")
+    meta = session.meta
+    part_path = upload_sessions.part_path(session.id)
+    try:
+        # Parçalar sırasız gelebildiği için hash birleştirilmiş dosyadan hesaplanır
+        sha256 = await anyio.to_thread.run_sync(hash_file, part_path)
+        if meta.get("sha256") and meta["sha256"] != sha256:
+            raise HTTPException(status_code=400, detail="Dosya sha256 doğrulaması başarısız; parçaları yeniden gönderin")
+        doc_meta = await store_document(part_path, session.size, sha256, **_document_args(meta))
+    except BaseException:
+        upload_sessions.release(session)
+        raise
+    await anyio.to_thread.run_sync(lambda: upload_sessions.remove(session.id, keep_part=True))
     return doc_meta
 
 
+@router.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str):
+    """Cancel a resumable upload and delete its partial file"""
+    session = _get_session(upload_id)
+    if not upload_sessions.claim(session):
+        raise HTTPException(status_code=409, detail="Yükleme tamamlanıyor veya parça yazımı sürüyor")
+    upload_sessions.remove(session.id)
+    return {"success": True, "uploadId": upload_id}
+
+
 @router.delete("/{doc_id}")
 def delete_document(doc_id: str):
     """Delete a document and its file"""
-    docs = load_json("documents.json")
-    doc = None
-    doc_idx = -1
-    
-    for idx, d in enumerate(docs):
-        if d.get("id") == doc_id:
-            doc = d
-            doc_idx = idx
-            break
-    
+    doc = get_record("documents.json", doc_id, readonly=True)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
-    # Delete file
-    file_path = BASE_DIR / "md.docs" / doc["path"]
-    if file_path.exists():
-        try:
-            file_path.unlink()
-        except Exception:
-            pass  # File deletion is best effort
-    
     # Remove from database
-    docs.pop(doc_idx)
-    save_json("documents.json", docs)
+    delete_record("documents.json", doc_id)
+    # Dosyayı (blob ise) başka kayıt göstermiyorsa sil; referanslar path indeksinden
+    file_path = BASE_DIR / "md.docs" / doc["path"]
+    try:
+        if blobs.remove_if_unreferenced(file_path, doc["path"]):
+            thumbnails.remove(file_path)
+    except Exception:
+        pass  # File deletion is best effort
     
     return {"success": True, "id": doc_id}
 
 
-@router.get("/job/{job_id}")
+@router.get("/job/{job_id}", dependencies=[Depends(conditional("documents.json"))])
 def get_job_documents(job_id: str):
     """Get all documents for a specific job"""
-    docs = load_json("documents.json")
-    return [d for d in docs if d.get("jobId") == job_id]
+    return find_records("documents.json", "jobId", job_id, readonly=True)
+
+
+# Zaten sıkıştırılmış formatlar ZIP'e sıkıştırılmadan (stored) konur
+STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".pdf",
+    ".docx", ".xlsx", ".pptx", ".zip", ".rar", ".7z",
+}
+BUNDLE_BLOCK_BYTES = 1024 * 1024
+
+
+class _ZipSink:
+    """zipfile'ın yazdığı baytları toplayan, geri sarılamayan hedef (ZIP akış modunda yazılır)"""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
 
+
+def _archive_part(value: str | None, fallback: str) -> str:
+    """ZIP yolunun tek bileşeni: ayraçlar '_' olur, baştaki/sondaki noktalar (.., .) atılır"""
+    part = (value or "").replace("\\", "_").replace("/", "_").strip(". ")
+    return part or fallback
+
+
+def _bundle_entries(docs: list[dict]) -> list[tuple[Path, str, str]]:
+    """(dosya, ZIP içindeki ad, uzantı); ad çakışmaları numaralandırılır"""
+    entries, used = [], set()
+    for doc in docs:
+        file_path = BASE_DIR / "md.docs" / doc["path"]
+        # Kayıttaki değerler (eski kayıtlarda doğrulanmamış tipler dahil) yol olarak yorumlanmasın
+        folder = _archive_part(doc.get("type"), "diger")
+        name = _archive_part(doc.get("originalName") or doc.get("filename"), doc["id"])
+        stem, ext = os.path.splitext(name)
+        arcname = f"{folder}/{name}"
+        counter = 2
+        while arcname.lower() in used:
+            arcname = f"{folder}/{stem} ({counter}){ext}"
+            counter += 1
+        used.add(arcname.lower())
+        entries.append((file_path, arcname, ext.lower() or os.path.splitext(doc.get("filename", ""))[1].lower()))
+    return entries
+
+
+def _iter_bundle(entries: list[tuple[Path, str, str]]):
+    """
+    ZIP'i parça parça üretir; bellekte en fazla bir blok tutulur. Senkron generator:
+    StreamingResponse her adımı thread'de çalıştırır, event loop bloklanmaz.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for file_path, arcname, ext in entries:
+            try:
+                f = open(file_path, "rb")
+            except OSError:
+                continue  # Diskte olmayan dosya atlanır
+            with f:
+                st = os.fstat(f.fileno())
+                info = zipfile.ZipInfo(arcname, datetime.fromtimestamp(st.st_mtime).timetuple()[:6])
+                info.file_size = st.st_size
+                info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                with zf.open(info, "w") as dest:
+                    while block := f.read(BUNDLE_BLOCK_BYTES):
+                        dest.write(block)
+                        yield sink.take()
+            yield sink.take()
+    yield sink.take()
+
+
+@router.get("/job/{job_id}/bundle")
+def download_job_bundle(job_id: str, doc_type: str | None = None):
+    """
+    Download all documents of a job as a ZIP streamed on the fly
+    (folders per document type). Optional doc_type filter.
+    """
+    docs = find_records("documents.json", "jobId", job_id, readonly=True)
+    if doc_type:
+        docs = [d for d in docs if d.get("type") == doc_type]
+    if not docs:
+        raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    safe_job = "".join(c if c.isalnum() or c in "-_" else "_" for c in job_id)
+    return StreamingResponse(
+        (chunk for chunk in _iter_bundle(_bundle_entries(docs)) if chunk),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{safe_job}-dokumanlar.zip"'},
+    )
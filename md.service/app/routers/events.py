@@ -0,0 +1,61 @@
+"""
+Server-sent events: canlı ekranlar (dashboard, üretim uyarıları, görev panosu)
+zamanlayıcıyla yoklamak yerine değişiklik bildirimlerine abone olur.
+
+  GET /events/stream?collections=jobs,tasks
+
+İlk olay ("hello") istenen koleksiyonların güncel sürümlerini taşır; bağlantı
+koparsa istemci bu sürümlerle /sync/{koleksiyon}?since= üzerinden eksikleri alabilir.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..data_loader import collection_version
+from ..events import subscribe, unsubscribe
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Bağlantının ara katmanlarda kapanmaması için boş yorum satırı aralığı (sn)
+KEEPALIVE_S = 15.0
+
+
+def _format(event: str, data: dict, event_id: Optional[int] = None) -> str:
+  lines = [f"event: {event}"]
+  if event_id is not None:
+    lines.append(f"id: {event_id}")
+  lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+  return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def event_stream(
+  request: Request,
+  collections: Optional[str] = Query(None, description="Virgülle ayrılmış koleksiyonlar (ör. jobs,tasks); boşsa hepsi"),
+):
+  wanted = {c.strip() for c in collections.split(",") if c.strip()} if collections else None
+  subscription = subscribe(wanted)
+
+  async def stream():
+    try:
+      yield "retry: 3000\n\n"
+      versions = {name: collection_version(f"{name}.json") for name in sorted(wanted or ())}
+      yield _format("hello", {"versions": versions})
+      while not await request.is_disconnected():
+        try:
+          event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_S)
+        except asyncio.TimeoutError:
+          yield ": keepalive\n\n"
+          continue
+        yield _format("change", event, event.get("version"))
+    finally:
+      unsubscribe(subscription)
+
+  return StreamingResponse(
+    stream(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
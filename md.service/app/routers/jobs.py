@@ -1,24 +1,28 @@
-from copy import deepcopy
 from datetime import datetime
 import uuid
-from fastapi import APIRouter, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 
-from ..data_loader import load_json, save_json
+from ..data_loader import declare_index, find_records, get_record, load_json, update_record, upsert_record
+from ..http_cache import conditional
+from ..pagination import paginate
+from ..storage.text import fold
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+declare_index("jobs.json", "status", "startType", "customerId")
 
-def _now_iso() -> str:
-  return datetime.utcnow().isoformat()
+JobSort = Literal["createdAt", "-createdAt", "status", "-status", "customerName", "-customerName"]
 
 
-def _jobs():
-  return load_json("jobs.json")
+def _now_iso() -> str:
+  return datetime.utcnow().isoformat()
 
 
-def _save_jobs(data):
-  save_json("jobs.json", data)
+def _save_job(job: dict, new: bool = False):
+  # Kayıt seviyesinde yazım: yeni işler listenin başına eklenir
+  upsert_record("jobs.json", job, prepend=new)
 
 
 class JobCreate(BaseModel):
@@ -104,12 +108,15 @@ class StatusUpdate(BaseModel):
   rejection: dict | None = None  # Ret bilgileri
 
 
-def _find_job(job_id: str):
-  data = _jobs()
-  for idx, job in enumerate(data):
-    if job.get("id") == job_id:
-      return data, idx, job
-  raise HTTPException(status_code=404, detail="Job not found")
+def _update_job(job_id: str, apply) -> dict:
+  """
+  apply(job) işin güncel hâlinin kopyasını yerinde değiştirir. Güncelleme yazıcı
+  sırasında uygulandığı için aynı işe gelen eşzamanlı istekler birbirini ezmez.
+  """
+  job = update_record("jobs.json", job_id, apply)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return job
 
 
 def _log(job: dict, action: str, note: str | None = None):
@@ -118,22 +125,67 @@ def _log(job: dict, action: str, note: str | None = None):
   job["logs"] = logs
 
 
-@router.get("/")
-def list_jobs():
-  return _jobs()
+def _job_sort_key(sort: str):
+  field = sort.lstrip("-")
+  if field == "customerName":
+    # Türkçe harfler doğru yere sıralansın (Ç -> C, Ş -> S)
+    return lambda job: (fold(job.get("customerName") or ""), job.get("id") or "")
+  if field == "status":
+    return lambda job: (job.get("status") or "", job.get("createdAt") or "", job.get("id") or "")
+  return lambda job: (job.get(field) or "", job.get("id") or "")
+
+
+@router.get("/", dependencies=[Depends(conditional("jobs.json"))])
+def list_jobs(
+  response: Response,
+  status: Optional[str] = None,
+  startType: Optional[str] = None,
+  customerId: Optional[str] = None,
+  sort: Optional[JobSort] = Query(None, description="Sıralama: createdAt, status, customerName; '-' ile ters yön"),
+  limit: Optional[int] = Query(None, ge=1, description="Sayfa boyutu; devamı varsa X-Next-Cursor header'ı döner"),
+  cursor: Optional[str] = Query(None, description="Önceki sayfanın X-Next-Cursor değeri"),
+  fields: Optional[str] = Query(None, description="Dönecek alanlar, virgülle ayrılmış (ör. id,title,status)"),
+):
+  """
+  İş listesi. Parametresiz çağrı eskisi gibi tüm işleri dosya sırasıyla döndürür.
+  Sayfalı isteklerde sıralama verilmezse en yeni iş önce gelir (-createdAt).
+  """
+  filters = {name: value for name, value in (("status", status), ("startType", startType), ("customerId", customerId)) if value}
+  if filters:
+    # İlk filtre indeksten, kalanlar eşleşen işler üzerinde
+    name, value = next(iter(filters.items()))
+    jobs = [
+      job for job in find_records("jobs.json", name, value, readonly=True)
+      if all(job.get(k) == v for k, v in filters.items())
+    ]
+  else:
+    jobs = load_json("jobs.json", readonly=True)
+  
+  if sort is None and (limit or cursor):
+    sort = "-createdAt"
+  if sort:
+    jobs = paginate(
+      jobs, _job_sort_key(sort), limit=limit, cursor=cursor, sort=sort,
+      reverse=sort.startswith("-"), response=response,
+    )
+  
+  if fields:
+    # Projeksiyon: liste ekranı logs/measure/offer gibi ağır alanları taşımasın
+    wanted = {f.strip() for f in fields.split(",") if f.strip()} | {"id"}
+    jobs = [{k: v for k, v in job.items() if k in wanted} for job in jobs]
+  return jobs
 
 
-@router.get("/{job_id}")
+@router.get("/{job_id}", dependencies=[Depends(conditional("jobs.json"))])
 def get_job(job_id: str):
-  for job in _jobs():
-    if job.get("id") == job_id:
-      return job
-  raise HTTPException(status_code=404, detail="Job not found")
+  job = get_record("jobs.json", job_id, readonly=True)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return job
 
 
 @router.post("/", status_code=201)
 def create_job(payload: JobCreate):
-  data = _jobs()
   new_id = f"JOB-{str(uuid.uuid4())[:8].upper()}"
   
   # Arşiv işi mi kontrol et
@@ -174,8 +226,7 @@ def create_job(payload: JobCreate):
         "createdAt": payload.archiveDate or _now_iso(),
     }
     _log(job, "archive_created", f"Arşiv kaydı oluşturuldu - Tutar: {payload.archiveTotalAmount}")
-    data.insert(0, job)
-    _save_jobs(data)
+    _save_job(job, new=True)
     return job
   
   # Normal iş akışı
@@ -214,66 +265,58 @@ def create_job(payload: JobCreate):
       "createdAt": _now_iso(),
   }
   _log(job, "created", f"startType={payload.startType}")
-  data.insert(0, job)
-  _save_jobs(data)
+  _save_job(job, new=True)
   return job
 
 
 @router.put("/{job_id}/measure")
 def update_measure(job_id: str, payload: MeasureUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  def apply(job):
+    # Mevcut measure bilgilerini koru ve güncelle
+    existing_measure = job.get("measure", {})
   
-  # Mevcut measure bilgilerini koru ve güncelle
-  existing_measure = job.get("measure", {})
+    if payload.measurements is not None:
+      existing_measure["measurements"] = payload.measurements
+    if payload.appointment is not None:
+      existing_measure["appointment"] = payload.appointment
   
-  if payload.measurements is not None:
-    existing_measure["measurements"] = payload.measurements
-  if payload.appointment is not None:
-    existing_measure["appointment"] = payload.appointment
+    job["measure"] = existing_measure
   
-  job["measure"] = existing_measure
+    # Servis bilgilerini ayrı kaydet
+    if payload.service:
+      existing_service = job.get("service", {})
+      job["service"] = {**existing_service, **payload.service}
   
-  # Servis bilgilerini ayrı kaydet
-  if payload.service:
-    existing_service = job.get("service", {})
-    job["service"] = {**existing_service, **payload.service}
+    # Statü güncellemesi
+    if payload.status:
+      old_status = job.get("status", "")
+      job["status"] = payload.status
+      _log(job, "status.updated", f"{old_status} -> {payload.status}")
+    else:
+      _log(job, "measure.updated")
   
-  # Statü güncellemesi
-  if payload.status:
-    old_status = job.get("status", "")
-    job["status"] = payload.status
-    _log(job, "status.updated", f"{old_status} -> {payload.status}")
-  else:
-    _log(job, "measure.updated")
-  
-  data[idx] = job
-  _save_jobs(data)
-  return job
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/offer")
 def update_offer(job_id: str, payload: OfferUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  job["offer"] = payload.model_dump()
-  job["status"] = payload.status or "TEKLIF_TASLAK"
-  _log(job, "offer.updated")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    job["offer"] = payload.model_dump()
+    job["status"] = payload.status or "TEKLIF_TASLAK"
+    _log(job, "offer.updated")
+
+  return _update_job(job_id, apply)
 
 
 @router.post("/{job_id}/approval/start")
 def start_approval(job_id: str, payload: ApprovalStart):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  job["approval"] = payload.model_dump()
-  job["status"] = "ANLASMA_TAMAMLANDI"
-  _log(job, "approval.started")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    job["approval"] = payload.model_dump()
+    job["status"] = "ANLASMA_TAMAMLANDI"
+    _log(job, "approval.started")
+
+  return _update_job(job_id, apply)
 
 
 class PaymentUpdate(BaseModel):
@@ -283,161 +326,144 @@ class PaymentUpdate(BaseModel):
 @router.put("/{job_id}/approval/payment")
 def update_payment(job_id: str, payload: PaymentUpdate):
   """Ödeme planını güncelle (tahsilat, çek detayı vs.)"""
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  
-  if "approval" not in job:
-    job["approval"] = {}
+  def apply(job):
+    if "approval" not in job:
+      job["approval"] = {}
   
-  job["approval"]["paymentPlan"] = payload.paymentPlan
-  _log(job, "payment.updated")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+    job["approval"]["paymentPlan"] = payload.paymentPlan
+    _log(job, "payment.updated")
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/stock")
 def update_stock(job_id: str, payload: StockStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  stock = job.get("stock", {})
-  stock["ready"] = payload.ready
-  stock["purchaseNotes"] = payload.purchaseNotes
-  # Seçilen stok kalemlerini kaydet (arşiv için)
-  if payload.items:
-    stock["items"] = [item.model_dump() for item in payload.items]
-  # Tahmini hazır olma tarihi (Sonra Üret için)
-  if payload.estimatedDate:
-    stock["estimatedDate"] = payload.estimatedDate
-  job["stock"] = stock
-  # ready=True -> Üretime Hazır, ready=False -> Sonra Üretilecek (rezerve edildi)
-  job["status"] = "URETIME_HAZIR" if payload.ready else "SONRA_URETILECEK"
-  _log(job, "stock.updated", f"ready={payload.ready}, items={len(payload.items or [])}, estimatedDate={payload.estimatedDate}")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    stock = job.get("stock", {})
+    stock["ready"] = payload.ready
+    stock["purchaseNotes"] = payload.purchaseNotes
+    # Seçilen stok kalemlerini kaydet (arşiv için)
+    if payload.items:
+      stock["items"] = [item.model_dump() for item in payload.items]
+    # Tahmini hazır olma tarihi (Sonra Üret için)
+    if payload.estimatedDate:
+      stock["estimatedDate"] = payload.estimatedDate
+    job["stock"] = stock
+    # ready=True -> Üretime Hazır, ready=False -> Sonra Üretilecek (rezerve edildi)
+    job["status"] = "URETIME_HAZIR" if payload.ready else "SONRA_URETILECEK"
+    _log(job, "stock.updated", f"ready={payload.ready}, items={len(payload.items or [])}, estimatedDate={payload.estimatedDate}")
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/production")
 def production_status(job_id: str, payload: ProductionStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  prod_data = {"status": payload.status, "note": payload.note}
-  if payload.agreementDate:
-    prod_data["agreementDate"] = payload.agreementDate
-  job["production"] = prod_data
-  job["status"] = payload.status
-  _log(job, "production.updated", payload.status)
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    prod_data = {"status": payload.status, "note": payload.note}
+    if payload.agreementDate:
+      prod_data["agreementDate"] = payload.agreementDate
+    job["production"] = prod_data
+    job["status"] = payload.status
+    _log(job, "production.updated", payload.status)
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/assembly/schedule")
 def assembly_schedule(job_id: str, payload: AssemblySchedule):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  job["assembly"] = job.get("assembly", {})
-  job["assembly"]["schedule"] = payload.model_dump()
-  job["status"] = "MONTAJ_TERMIN"
-  _log(job, "assembly.scheduled")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    job["assembly"] = job.get("assembly", {})
+    job["assembly"]["schedule"] = payload.model_dump()
+    job["status"] = "MONTAJ_TERMIN"
+    _log(job, "assembly.scheduled")
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/assembly/complete")
 def assembly_complete(job_id: str, payload: AssemblyComplete):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  job["assembly"] = job.get("assembly", {})
-  job["assembly"]["schedule"] = job["assembly"].get("schedule", {})
-  if payload.date:
-    job["assembly"]["schedule"]["date"] = payload.date
-  if payload.note:
-    job["assembly"]["schedule"]["note"] = payload.note
-  if payload.team:
-    job["assembly"]["schedule"]["team"] = payload.team
-  job["assembly"]["complete"] = {"at": _now_iso(), "proof": payload.proof}
-  job["status"] = "MUHASEBE_BEKLIYOR"
-  _log(job, "assembly.complete", f"team={payload.team}")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  def apply(job):
+    job["assembly"] = job.get("assembly", {})
+    job["assembly"]["schedule"] = job["assembly"].get("schedule", {})
+    if payload.date:
+      job["assembly"]["schedule"]["date"] = payload.date
+    if payload.note:
+      job["assembly"]["schedule"]["note"] = payload.note
+    if payload.team:
+      job["assembly"]["schedule"]["team"] = payload.team
+    job["assembly"]["complete"] = {"at": _now_iso(), "proof": payload.proof}
+    job["status"] = "MUHASEBE_BEKLIYOR"
+    _log(job, "assembly.complete", f"team={payload.team}")
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/status")
 def update_status(job_id: str, payload: StatusUpdate):
   """Genel statü güncelleme - servis işleri ve diğer geçişler için"""
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  
-  old_status = job.get("status", "")
-  job["status"] = payload.status
+  def apply(job):
+    old_status = job.get("status", "")
+    job["status"] = payload.status
   
-  # Servis bilgileri varsa güncelle
-  if payload.service:
-    existing_service = job.get("service", {})
-    job["service"] = {**existing_service, **payload.service}
+    # Servis bilgileri varsa güncelle
+    if payload.service:
+      existing_service = job.get("service", {})
+      job["service"] = {**existing_service, **payload.service}
   
-  # Teklif/fiyat bilgileri varsa güncelle
-  if payload.offer:
-    existing_offer = job.get("offer", {})
-    job["offer"] = {**existing_offer, **payload.offer}
+    # Teklif/fiyat bilgileri varsa güncelle
+    if payload.offer:
+      existing_offer = job.get("offer", {})
+      job["offer"] = {**existing_offer, **payload.offer}
   
-  # Ret bilgileri varsa güncelle
-  if payload.rejection:
-    job["rejection"] = payload.rejection
+    # Ret bilgileri varsa güncelle
+    if payload.rejection:
+      job["rejection"] = payload.rejection
   
-  _log(job, "status.updated", f"{old_status} -> {payload.status}")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+    _log(job, "status.updated", f"{old_status} -> {payload.status}")
+
+  return _update_job(job_id, apply)
 
 
 @router.put("/{job_id}/finance/close")
 def finance_close(job_id: str, payload: FinanceClose):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-
-  offer_total = float(job.get("offer", {}).get("total", 0))
-  approval_plan = job.get("approval", {}).get("paymentPlan", {})
+  def apply(job):
+    offer_total = float(job.get("offer", {}).get("total", 0))
+    approval_plan = job.get("approval", {}).get("paymentPlan", {})
   
-  # Pre-received amounts
-  pre_cash = float(approval_plan.get("cash", 0))
-  pre_card = float(approval_plan.get("card", 0))
-  pre_cheque = float(approval_plan.get("cheque", 0))
-  after_delivery = float(approval_plan.get("afterDelivery", 0))
-  pre_total = pre_cash + pre_card + pre_cheque
-
-  # Final payments
-  payments = payload.payments or {}
-  final_cash = float(payments.get("cash", 0))
-  final_card = float(payments.get("card", 0))
-  final_cheque = float(payments.get("cheque", 0))
-  final_total = final_cash + final_card + final_cheque
+    # Pre-received amounts
+    pre_cash = float(approval_plan.get("cash", 0))
+    pre_card = float(approval_plan.get("card", 0))
+    pre_cheque = float(approval_plan.get("cheque", 0))
+    after_delivery = float(approval_plan.get("afterDelivery", 0))
+    pre_total = pre_cash + pre_card + pre_cheque
+
+    # Final payments
+    payments = payload.payments or {}
+    final_cash = float(payments.get("cash", 0))
+    final_card = float(payments.get("card", 0))
+    final_cheque = float(payments.get("cheque", 0))
+    final_total = final_cash + final_card + final_cheque
   
-  discount_amt = float(payload.discount.get("amount", 0)) if payload.discount else 0
+    discount_amt = float(payload.discount.get("amount", 0)) if payload.discount else 0
   
-  # Total received = pre + final + discount
-  total_received = pre_total + final_total + discount_amt
-  balance = round(offer_total - total_received, 2)
+    # Total received = pre + final + discount
+    total_received = pre_total + final_total + discount_amt
+    balance = round(offer_total - total_received, 2)
   
-  if abs(balance) > 0.01:  # Allow small float differences
-    raise HTTPException(status_code=400, detail=f"Bakiye 0 olmalı. Fark: {balance}₺")
-  if discount_amt > 0 and not payload.discount.get("note"):
-    raise HTTPException(status_code=400, detail="İskonto notu zorunlu")
-
-  job["finance"] = {
-    "total": offer_total,
-    "prePayments": {"cash": pre_cash, "card": pre_card, "cheque": pre_cheque},
-    "finalPayments": {"cash": final_cash, "card": final_card, "cheque": final_cheque},
-    "discount": payload.discount,
-    "closedAt": _now_iso()
-  }
-  job["status"] = "KAPALI"
-  _log(job, "finance.closed", f"balance={balance}")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+    if abs(balance) > 0.01:  # Allow small float differences
+      raise HTTPException(status_code=400, detail=f"Bakiye 0 olmalı. Fark: {balance}₺")
+    if discount_amt > 0 and not payload.discount.get("note"):
+      raise HTTPException(status_code=400, detail="İskonto notu zorunlu")
+
+    job["finance"] = {
+      "total": offer_total,
+      "prePayments": {"cash": pre_cash, "card": pre_card, "cheque": pre_cheque},
+      "finalPayments": {"cash": final_cash, "card": final_card, "cheque": final_cheque},
+      "discount": payload.discount,
+      "closedAt": _now_iso()
+    }
+    job["status"] = "KAPALI"
+    _log(job, "finance.closed", f"balance={balance}")
+
+  return _update_job(job_id, apply)
 
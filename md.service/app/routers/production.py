@@ -8,14 +8,26 @@ teslimat durumlarını ve sorunları takip eder.
 
 import uuid
 from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+    declare_index,
+    delete_record,
+    find_records,
+    get_record,
+    load_json,
+    save_json,
+    update_record,
+    upsert_record,
+)
+from ..http_cache import conditional
 
 router = APIRouter(prefix="/production", tags=["production"])
 
+declare_index("productionOrders.json", "jobId", "supplierId", "status")
+
 
 # ========== Models ==========
 
@@ -81,13 +93,23 @@ def _now() -> str:
     return datetime.utcnow().isoformat()
 
 
-def _find_order(order_id: str):
-    """Sipariş bul"""
-    orders = load_json("productionOrders.json")
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            return orders, idx, order
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+def _find_order(order_id: str) -> dict:
+    """Sipariş bul (çağırana ait kopya)"""
+    order = get_record("productionOrders.json", order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return order
+
+
+def _update_order(order_id: str, apply) -> dict:
+    """
+    apply(order) siparişin güncel hâlinin kopyasını yerinde değiştirir; aynı
+    siparişe gelen eşzamanlı teslimat/sorun kayıtları birbirini ezmez.
+    """
+    order = update_record("productionOrders.json", order_id, apply)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return order
 
 
 def _calc_order_status(order: dict) -> str:
@@ -120,9 +142,14 @@ def _is_overdue(order: dict) -> bool:
         return False
 
 
+def _today() -> str:
+    """Gecikme/bugün teslim hesapları tarihe bağlı: ETag gün değişince de değişir"""
+    return f"{datetime.now():%Y-%m-%d}/{datetime.utcnow():%Y-%m-%d}"
+
+
 # ========== Endpoints ==========
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional("productionOrders.json", vary=_today))])
 def list_orders(
     jobId: str | None = None,
     roleId: str | None = None,
@@ -132,7 +159,15 @@ def list_orders(
     overdue: bool | None = None
 ):
     """Tüm üretim/tedarik siparişlerini listele"""
-    orders = load_json("productionOrders.json")
+    # En seçici indeksli filtreyle başla, kalanları tarayarak uygula
+    if jobId:
+        orders = find_records("productionOrders.json", "jobId", jobId)
+    elif supplierId:
+        orders = find_records("productionOrders.json", "supplierId", supplierId)
+    elif status:
+        orders = find_records("productionOrders.json", "status", status)
+    else:
+        orders = load_json("productionOrders.json")
     
     if jobId:
         orders = [o for o in orders if o.get("jobId") == jobId]
@@ -162,7 +197,7 @@ def get_combinations():
     return settings.get("combinationTypes", [])
 
 
-@router.get("/alerts")
+@router.get("/alerts", dependencies=[Depends(conditional("productionOrders.json", vary=_today))])
 def get_alerts():
     """Üretim uyarılarını getir (gecikmeler, sorunlar)"""
     orders = load_json("productionOrders.json")
@@ -241,8 +276,7 @@ def get_summary():
 @router.get("/by-job/{job_id}")
 def get_orders_by_job(job_id: str):
     """Bir iş için tüm siparişleri getir"""
-    orders = load_json("productionOrders.json")
-    job_orders = [o for o in orders if o.get("jobId") == job_id]
+    job_orders = find_records("productionOrders.json", "jobId", job_id)
     
     # Her sipariş için güncel durum
     for order in job_orders:
@@ -272,7 +306,7 @@ def get_orders_by_job(job_id: str):
 @router.get("/{order_id}")
 def get_order(order_id: str):
     """Tek bir sipariş detayı"""
-    _, _, order = _find_order(order_id)
+    order = _find_order(order_id)
     order["isOverdue"] = _is_overdue(order)
     order["calculatedStatus"] = _calc_order_status(order)
     return order
@@ -281,11 +315,8 @@ def get_order(order_id: str):
 @router.post("/", status_code=201)
 def create_order(payload: CreateProductionOrder):
     """Yeni sipariş oluştur"""
-    orders = load_json("productionOrders.json")
-    
     # İş kontrolü
-    jobs = load_json("jobs.json")
-    job = next((j for j in jobs if j.get("id") == payload.jobId), None)
+    job = get_record("jobs.json", payload.jobId, readonly=True)
     if not job:
         raise HTTPException(status_code=404, detail="İş bulunamadı")
     
@@ -324,8 +355,7 @@ def create_order(payload: CreateProductionOrder):
         "updatedAt": _now()
     }
     
-    orders.insert(0, new_order)
-    save_json("productionOrders.json", orders)
+    upsert_record("productionOrders.json", new_order, prepend=True)
     
     # Kombinasyon tipini kaydet (autocomplete için)
     for item in payload.items:
@@ -338,180 +368,167 @@ def create_order(payload: CreateProductionOrder):
 @router.put("/{order_id}")
 def update_order(order_id: str, payload: CreateProductionOrder):
     """Siparişi güncelle"""
-    orders, idx, order = _find_order(order_id)
-    
-    # Sadece pending durumundayken güncelleme yapılabilir
-    if order.get("status") not in ["pending", "partial"]:
-        raise HTTPException(status_code=400, detail="Tamamlanan sipariş güncellenemez")
-    
-    # Kalemler hazırla (mevcut receivedQty'leri koru)
-    items = []
-    for i, item in enumerate(payload.items):
-        existing_received = 0
-        if i < len(order.get("items", [])):
-            existing_received = order["items"][i].get("receivedQty", 0)
+    def apply(order):
+        # Sadece pending durumundayken güncelleme yapılabilir
+        if order.get("status") not in ["pending", "partial"]:
+            raise HTTPException(status_code=400, detail="Tamamlanan sipariş güncellenemez")
+    
+        # Kalemler hazırla (mevcut receivedQty'leri koru)
+        items = []
+        for i, item in enumerate(payload.items):
+            existing_received = 0
+            if i < len(order.get("items", [])):
+                existing_received = order["items"][i].get("receivedQty", 0)
         
-        items.append({
-            "glassType": item.glassType,
-            "glassName": item.glassName,
-            "quantity": item.quantity,
-            "unit": item.unit,
-            "combination": item.combination,
-            "notes": item.notes,
-            "receivedQty": existing_received,
-            "problemQty": 0
-        })
-    
-    order["roleId"] = payload.roleId
-    order["roleName"] = payload.roleName
-    order["supplierId"] = payload.supplierId
-    order["supplierName"] = payload.supplierName
-    order["items"] = items
-    order["documentUrl"] = payload.documentUrl
-    order["estimatedDelivery"] = payload.estimatedDelivery
-    order["notes"] = payload.notes
-    order["updatedAt"] = _now()
-    
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+            items.append({
+                "glassType": item.glassType,
+                "glassName": item.glassName,
+                "quantity": item.quantity,
+                "unit": item.unit,
+                "combination": item.combination,
+                "notes": item.notes,
+                "receivedQty": existing_received,
+                "problemQty": 0
+            })
     
-    return order
+        order["roleId"] = payload.roleId
+        order["roleName"] = payload.roleName
+        order["supplierId"] = payload.supplierId
+        order["supplierName"] = payload.supplierName
+        order["items"] = items
+        order["documentUrl"] = payload.documentUrl
+        order["estimatedDelivery"] = payload.estimatedDelivery
+        order["notes"] = payload.notes
+        order["updatedAt"] = _now()
+
+    return _update_order(order_id, apply)
 
 
 @router.post("/{order_id}/delivery")
 def record_delivery(order_id: str, payload: RecordDelivery):
     """Teslimat kaydet"""
-    orders, idx, order = _find_order(order_id)
-    
-    delivery_record = {
-        "id": _gen_id("DEL"),
-        "date": payload.deliveryDate or _now()[:10],
-        "note": payload.deliveryNote,
-        "documentUrl": payload.documentUrl,
-        "items": [],
-        "createdAt": _now()
-    }
+    def apply(order):
+        delivery_record = {
+            "id": _gen_id("DEL"),
+            "date": payload.deliveryDate or _now()[:10],
+            "note": payload.deliveryNote,
+            "documentUrl": payload.documentUrl,
+            "items": [],
+            "createdAt": _now()
+        }
     
-    for delivery in payload.deliveries:
-        line_idx = delivery.lineIndex
-        if line_idx >= len(order["items"]):
-            continue
+        for delivery in payload.deliveries:
+            line_idx = delivery.lineIndex
+            if line_idx >= len(order["items"]):
+                continue
         
-        item = order["items"][line_idx]
+            item = order["items"][line_idx]
         
-        # Teslim miktarını güncelle
-        item["receivedQty"] = item.get("receivedQty", 0) + delivery.receivedQty
+            # Teslim miktarını güncelle
+            item["receivedQty"] = item.get("receivedQty", 0) + delivery.receivedQty
         
-        # Sorun varsa kaydet
-        if delivery.problemQty > 0 and delivery.problemType:
-            item["problemQty"] = item.get("problemQty", 0) + delivery.problemQty
+            # Sorun varsa kaydet
+            if delivery.problemQty > 0 and delivery.problemType:
+                item["problemQty"] = item.get("problemQty", 0) + delivery.problemQty
             
-            issue = {
-                "id": _gen_id("ISS"),
-                "lineIndex": line_idx,
-                "type": delivery.problemType,
-                "quantity": delivery.problemQty,
-                "note": delivery.problemNote,
-                "status": "pending",
-                "createdAt": _now(),
-                "history": []
-            }
-            order["issues"].append(issue)
+                issue = {
+                    "id": _gen_id("ISS"),
+                    "lineIndex": line_idx,
+                    "type": delivery.problemType,
+                    "quantity": delivery.problemQty,
+                    "note": delivery.problemNote,
+                    "status": "pending",
+                    "createdAt": _now(),
+                    "history": []
+                }
+                order["issues"].append(issue)
         
-        delivery_record["items"].append({
-            "lineIndex": line_idx,
-            "receivedQty": delivery.receivedQty,
-            "problemQty": delivery.problemQty,
-            "problemType": delivery.problemType,
-            "problemNote": delivery.problemNote
-        })
+            delivery_record["items"].append({
+                "lineIndex": line_idx,
+                "receivedQty": delivery.receivedQty,
+                "problemQty": delivery.problemQty,
+                "problemType": delivery.problemType,
+                "problemNote": delivery.problemNote
+            })
         
-        order["items"][line_idx] = item
-    
-    order["deliveryHistory"].append(delivery_record)
-    order["status"] = _calc_order_status(order)
-    order["updatedAt"] = _now()
-    
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
+            order["items"][line_idx] = item
     
-    return order
+        order["deliveryHistory"].append(delivery_record)
+        order["status"] = _calc_order_status(order)
+        order["updatedAt"] = _now()
+
+    return _update_order(order_id, apply)
 
 
 @router.post("/{order_id}/issues/{issue_id}/resolve")
 def resolve_issue(order_id: str, issue_id: str, payload: ResolveIssue):
     """Sorunu çöz (zincirleme sorun desteği)"""
-    orders, idx, order = _find_order(order_id)
-    
-    # Sorunu bul
-    issue = next((iss for iss in order.get("issues", []) if iss.get("id") == issue_id), None)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Sorun bulunamadı")
-    
-    # Çözüm geçmişine ekle
-    resolution_record = {
-        "date": _now(),
-        "resolution": payload.resolution,
-        "resolvedQty": payload.resolvedQty,
-        "note": payload.note
-    }
-    issue["history"].append(resolution_record)
-    
-    # Zincirleme sorun kontrolü
-    if payload.newIssueQty > 0 and payload.newIssueType:
-        # Değişim de sorunlu geldiyse yeni sorun oluştur
-        new_issue = {
-            "id": _gen_id("ISS"),
-            "lineIndex": issue.get("lineIndex"),
-            "type": payload.newIssueType,
-            "quantity": payload.newIssueQty,
-            "note": payload.newIssueNote,
-            "status": "pending",
-            "createdAt": _now(),
-            "parentIssueId": issue_id,  # Zincirleme bağlantı
-            "history": []
+    def apply(order):
+        # Sorunu bul
+        issue = next((iss for iss in order.get("issues", []) if iss.get("id") == issue_id), None)
+        if not issue:
+            raise HTTPException(status_code=404, detail="Sorun bulunamadı")
+    
+        # Çözüm geçmişine ekle
+        resolution_record = {
+            "date": _now(),
+            "resolution": payload.resolution,
+            "resolvedQty": payload.resolvedQty,
+            "note": payload.note
         }
-        order["issues"].append(new_issue)
+        issue["history"].append(resolution_record)
+    
+        # Zincirleme sorun kontrolü
+        if payload.newIssueQty > 0 and payload.newIssueType:
+            # Değişim de sorunlu geldiyse yeni sorun oluştur
+            new_issue = {
+                "id": _gen_id("ISS"),
+                "lineIndex": issue.get("lineIndex"),
+                "type": payload.newIssueType,
+                "quantity": payload.newIssueQty,
+                "note": payload.newIssueNote,
+                "status": "pending",
+                "createdAt": _now(),
+                "parentIssueId": issue_id,  # Zincirleme bağlantı
+                "history": []
+            }
+            order["issues"].append(new_issue)
         
-        # Orijinal sorun kısmen çözüldü
-        remaining = payload.resolvedQty - payload.newIssueQty
-        if remaining >= issue.get("quantity", 0):
-            issue["status"] = "resolved"
-        else:
-            issue["status"] = "partial"
-    else:
-        # Tam çözüm
-        if payload.resolvedQty >= issue.get("quantity", 0):
-            issue["status"] = "resolved"
+            # Orijinal sorun kısmen çözüldü
+            remaining = payload.resolvedQty - payload.newIssueQty
+            if remaining >= issue.get("quantity", 0):
+                issue["status"] = "resolved"
+            else:
+                issue["status"] = "partial"
         else:
-            issue["status"] = "partial"
-    
-    # Item'a eklenen miktarı güncelle (değişim geldi)
-    if payload.resolution in ["replaced", "credited"]:
-        line_idx = issue.get("lineIndex", 0)
-        if line_idx < len(order["items"]):
-            # Değişim geldi, effective received arttır
-            order["items"][line_idx]["receivedQty"] = order["items"][line_idx].get("receivedQty", 0) + payload.resolvedQty - payload.newIssueQty
+            # Tam çözüm
+            if payload.resolvedQty >= issue.get("quantity", 0):
+                issue["status"] = "resolved"
+            else:
+                issue["status"] = "partial"
     
-    order["status"] = _calc_order_status(order)
-    order["updatedAt"] = _now()
+        # Item'a eklenen miktarı güncelle (değişim geldi)
+        if payload.resolution in ["replaced", "credited"]:
+            line_idx = issue.get("lineIndex", 0)
+            if line_idx < len(order["items"]):
+                # Değişim geldi, effective received arttır
+                order["items"][line_idx]["receivedQty"] = order["items"][line_idx].get("receivedQty", 0) + payload.resolvedQty - payload.newIssueQty
     
-    orders[idx] = order
-    save_json("productionOrders.json", orders)
-    
-    return order
+        order["status"] = _calc_order_status(order)
+        order["updatedAt"] = _now()
+
+    return _update_order(order_id, apply)
 
 
 @router.delete("/{order_id}")
 def delete_order(order_id: str):
     """Siparişi sil (sadece pending durumda)"""
-    orders, idx, order = _find_order(order_id)
+    order = _find_order(order_id)
     
     if order.get("status") != "pending":
         raise HTTPException(status_code=400, detail="Sadece bekleyen siparişler silinebilir")
     
-    orders.pop(idx)
-    save_json("productionOrders.json", orders)
+    delete_record("productionOrders.json", order_id)
     
     return {"success": True, "id": order_id}
 
@@ -546,7 +563,7 @@ def get_combinations():
 
 # ========== Notifications / Alerts ==========
 
-@router.get("/alerts")
+@router.get("/alerts", dependencies=[Depends(conditional("productionOrders.json", vary=_today))])
 def get_alerts():
     """Uyarıları getir (gecikme, bekleyen sorunlar)"""
     orders = load_json("productionOrders.json")
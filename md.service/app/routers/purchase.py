@@ -3,10 +3,38 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+    declare_index,
+    delete_record,
+    find_records,
+    get_record,
+    load_json,
+    save_json,
+    transaction,
+    update_record,
+)
+from ..ledger import Posting
 
 router = APIRouter(prefix="/purchase", tags=["purchase"])
 
+PENDING_STATUSES = ("draft", "sent", "partial")
+
+
+def _pending_line_codes(order: dict) -> list[tuple]:
+    """Bekleyen siparişin hâlâ teslim alınmamış kalemlerinin (productCode, colorCode) anahtarları"""
+    if order.get("status") not in PENDING_STATUSES:
+        return []
+    return [
+        (item.get("productCode"), item.get("colorCode"))
+        for item in order.get("items", [])
+        if item.get("quantity", 0) - (item.get("receivedQty") or 0) > 0
+    ]
+
+
+declare_index("stockItems.json", ("productCode", "colorCode"))
+declare_index("purchaseOrders.json", keys={"pendingLineCode": _pending_line_codes})
+declare_index("supplierTransactions.json", "supplierId")
+
 
 def _now_iso() -> str:
     return datetime.utcnow().isoformat()
@@ -89,11 +117,10 @@ def list_orders(
 @router.get("/orders/{order_id}")
 def get_order(order_id: str):
     """Sipariş detayını getir"""
-    orders = load_json("purchaseOrders.json")
-    for order in orders:
-        if order.get("id") == order_id:
-            return order
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    order = get_record("purchaseOrders.json", order_id, readonly=True)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return order
 
 
 @router.post("/orders", status_code=201)
@@ -141,193 +168,175 @@ def create_order(payload: POCreate):
     return new_order
 
 
+def _update_order(order_id: str, apply) -> dict:
+    """
+    apply(order) siparişin güncel hâlinin kopyasını yerinde değiştirir; id
+    indeksiyle bulunur, koleksiyon taranmaz ve yeniden yazılmaz.
+    """
+    order = update_record("purchaseOrders.json", order_id, apply)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return order
+
+
 @router.post("/orders/{order_id}/items")
 def add_items_to_order(order_id: str, payload: POAddItems):
     """Mevcut taslak siparişe ürün ekle"""
-    orders = load_json("purchaseOrders.json")
-    
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            if order.get("status") != "draft":
-                raise HTTPException(status_code=400, detail="Sadece taslak siparişlere ürün eklenebilir")
-            
-            # Mevcut ürünleri al
-            existing_items = order.get("items", [])
-            total_amount = order.get("totalAmount", 0)
-            
-            for item in payload.items:
-                item_data = item.model_dump()
-                # Aynı ürün varsa miktarı artır
-                found = False
-                for ei in existing_items:
-                    if ei.get("productCode") == item_data["productCode"] and ei.get("colorCode") == item_data["colorCode"]:
-                        ei["quantity"] += item_data["quantity"]
-                        if ei.get("unitCost"):
-                            ei["totalCost"] = ei["quantity"] * ei["unitCost"]
-                            # Total'ı yeniden hesapla
-                        found = True
-                        break
-                
-                if not found:
-                    item_data["id"] = f"POI-{str(uuid.uuid4())[:8].upper()}"
-                    item_data["receivedQty"] = 0
-                    if item_data.get("unitCost"):
-                        item_data["totalCost"] = item_data["quantity"] * item_data["unitCost"]
-                    existing_items.append(item_data)
-            
-            # Total'ı yeniden hesapla
-            total_amount = sum(i.get("totalCost", 0) for i in existing_items)
-            
-            order["items"] = existing_items
-            order["totalAmount"] = total_amount
-            order["relatedJobs"] = list(set(order.get("relatedJobs", []) + payload.relatedJobs))
+    def apply(order):
+        if order.get("status") != "draft":
+            raise HTTPException(status_code=400, detail="Sadece taslak siparişlere ürün eklenebilir")
+        
+        # Mevcut ürünleri al
+        existing_items = order.get("items", [])
+        
+        for item in payload.items:
+            item_data = item.model_dump()
+            # Aynı ürün varsa miktarı artır
+            found = False
+            for ei in existing_items:
+                if ei.get("productCode") == item_data["productCode"] and ei.get("colorCode") == item_data["colorCode"]:
+                    ei["quantity"] += item_data["quantity"]
+                    if ei.get("unitCost"):
+                        ei["totalCost"] = ei["quantity"] * ei["unitCost"]
+                    found = True
+                    break
             
-            orders[idx] = order
-            save_json("purchaseOrders.json", orders)
-            return order
+            if not found:
+                item_data["id"] = f"POI-{str(uuid.uuid4())[:8].upper()}"
+                item_data["receivedQty"] = 0
+                if item_data.get("unitCost"):
+                    item_data["totalCost"] = item_data["quantity"] * item_data["unitCost"]
+                existing_items.append(item_data)
+        
+        # Total'ı yeniden hesapla
+        order["items"] = existing_items
+        order["totalAmount"] = sum(i.get("totalCost", 0) for i in existing_items)
+        order["relatedJobs"] = list(set(order.get("relatedJobs", []) + payload.relatedJobs))
     
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return _update_order(order_id, apply)
 
 
 @router.put("/orders/{order_id}/send")
 def send_order(order_id: str, expectedDate: str | None = None):
     """Siparişi gönder (taslak -> gönderildi)"""
-    orders = load_json("purchaseOrders.json")
-    
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            if order.get("status") != "draft":
-                raise HTTPException(status_code=400, detail="Sadece taslak siparişler gönderilebilir")
-            
-            order["status"] = "sent"
-            order["sentAt"] = _now_iso()
-            if expectedDate:
-                order["expectedDate"] = expectedDate
-            
-            orders[idx] = order
-            save_json("purchaseOrders.json", orders)
-            return order
+    def apply(order):
+        if order.get("status") != "draft":
+            raise HTTPException(status_code=400, detail="Sadece taslak siparişler gönderilebilir")
+        
+        order["status"] = "sent"
+        order["sentAt"] = _now_iso()
+        if expectedDate:
+            order["expectedDate"] = expectedDate
     
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+    return _update_order(order_id, apply)
 
 
 @router.post("/orders/{order_id}/receive")
 def receive_delivery(order_id: str, payload: PODelivery):
     """Kısmi veya tam teslimat kaydet"""
-    orders = load_json("purchaseOrders.json")
-    stock_items = load_json("stockItems.json")
-    stock_movements = load_json("stockMovements.json")
-    
-    for idx, order in enumerate(orders):
-        if order.get("id") == order_id:
-            if order.get("status") not in ("sent", "partial"):
-                raise HTTPException(status_code=400, detail="Bu sipariş teslim alınamaz")
-            
-            # Teslimat kaydı oluştur
-            delivery = {
-                "id": f"DEL-{str(uuid.uuid4())[:8].upper()}",
-                "date": _today(),
-                "items": payload.items,
-                "note": payload.note,
-                "receivedBy": payload.receivedBy or "Sistem"
-            }
-            
-            all_complete = True
-            
-            for recv_item in payload.items:
-                prod_code = recv_item.get("productCode")
-                color_code = recv_item.get("colorCode")
-                qty = recv_item.get("quantity", 0)
-                
-                # Sipariş kalemini bul ve güncelle
-                for poi in order.get("items", []):
-                    if poi.get("productCode") == prod_code and poi.get("colorCode") == color_code:
-                        poi["receivedQty"] = (poi.get("receivedQty") or 0) + qty
-                        
-                        if poi["receivedQty"] < poi["quantity"]:
-                            all_complete = False
-                        break
-                
-                # Stoku güncelle
-                for sidx, si in enumerate(stock_items):
-                    if si.get("productCode") == prod_code and si.get("colorCode") == color_code:
-                        si["onHand"] = (si.get("onHand") or 0) + qty
-                        si["lastUpdated"] = _today()
-                        stock_items[sidx] = si
-                        
-                        # Hareket kaydı
-                        stock_movements.insert(0, {
-                            "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
-                            "date": _today(),
-                            "item": si.get("name"),
-                            "itemId": si.get("id"),
-                            "productCode": prod_code,
-                            "colorCode": color_code,
-                            "change": qty,
-                            "type": "stockIn",
-                            "reason": f"Sipariş teslimi - {order_id}",
-                            "operator": payload.receivedBy or "Sistem",
-                            "reference": order_id
-                        })
-                        break
+    with transaction("purchaseOrders.json", "stockItems.json", "stockMovements.json") as tx:
+        posting = Posting(tx)
+        
+        order = tx.get("purchaseOrders.json", order_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+        if order.get("status") not in ("sent", "partial"):
+            raise HTTPException(status_code=400, detail="Bu sipariş teslim alınamaz")
+        
+        # Teslimat kaydı oluştur
+        delivery = {
+            "id": f"DEL-{str(uuid.uuid4())[:8].upper()}",
+            "date": _today(),
+            "items": payload.items,
+            "note": payload.note,
+            "receivedBy": payload.receivedBy or "Sistem"
+        }
+        
+        all_complete = True
+        
+        # Sipariş kalemleri kod ile (aynı kod birden fazla ise ilk kalem)
+        order_lines = {}
+        for poi in order.get("items", []):
+            order_lines.setdefault((poi.get("productCode"), poi.get("colorCode")), poi)
+        
+        for recv_item in payload.items:
+            prod_code = recv_item.get("productCode")
+            color_code = recv_item.get("colorCode")
+            qty = recv_item.get("quantity", 0)
             
-            # Tüm kalemler tamamlandı mı kontrol et
-            for poi in order.get("items", []):
-                if (poi.get("receivedQty") or 0) < poi.get("quantity", 0):
+            # Sipariş kalemini bul ve güncelle
+            poi = order_lines.get((prod_code, color_code))
+            if poi is not None:
+                poi["receivedQty"] = (poi.get("receivedQty") or 0) + qty
+                if poi["receivedQty"] < poi["quantity"]:
                     all_complete = False
-                    break
-            
-            order["deliveries"].append(delivery)
-            
-            if all_complete:
-                order["status"] = "delivered"
-                order["completedAt"] = _now_iso()
-            else:
-                order["status"] = "partial"
-            
-            orders[idx] = order
-            save_json("purchaseOrders.json", orders)
-            save_json("stockItems.json", stock_items)
-            save_json("stockMovements.json", stock_movements)
             
-            return order
-    
-    raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+            # Stoku güncelle
+            matches = tx.find("stockItems.json", ("productCode", "colorCode"), (prod_code, color_code))
+            if matches:
+                si = matches[0]
+                si["lastUpdated"] = _today()
+                
+                # Hareket kaydı; onHand defterden yazılır
+                posting.post(si, {
+                    "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+                    "date": _today(),
+                    "item": si.get("name"),
+                    "itemId": si.get("id"),
+                    "productCode": prod_code,
+                    "colorCode": color_code,
+                    "change": qty,
+                    "type": "stockIn",
+                    "reason": f"Sipariş teslimi - {order_id}",
+                    "operator": payload.receivedBy or "Sistem",
+                    "reference": order_id
+                })
+        
+        # Tüm kalemler tamamlandı mı kontrol et
+        for poi in order.get("items", []):
+            if (poi.get("receivedQty") or 0) < poi.get("quantity", 0):
+                all_complete = False
+                break
+        
+        order["deliveries"].append(delivery)
+        
+        if all_complete:
+            order["status"] = "delivered"
+            order["completedAt"] = _now_iso()
+        else:
+            order["status"] = "partial"
+        
+        return order
 
 
 @router.delete("/orders/{order_id}")
 def delete_order(order_id: str):
     """Taslak siparişi sil"""
-    orders = load_json("purchaseOrders.json")
+    order = get_record("purchaseOrders.json", order_id, readonly=True)
+    if order is not None and order.get("status") != "draft":
+        raise HTTPException(status_code=400, detail="Sadece taslak siparişler silinebilir")
     
-    for order in orders:
-        if order.get("id") == order_id:
-            if order.get("status") != "draft":
-                raise HTTPException(status_code=400, detail="Sadece taslak siparişler silinebilir")
-            break
-    
-    orders = [o for o in orders if o.get("id") != order_id]
-    save_json("purchaseOrders.json", orders)
+    delete_record("purchaseOrders.json", order_id)
     return {"success": True, "id": order_id}
 
 
+def _pending_quantity(product_code: str, color_code: str) -> float:
+    """Bekleyen siparişlerde bu kod için teslim alınmamış toplam miktar"""
+    key = (product_code, color_code)
+    total = 0
+    for order in find_records("purchaseOrders.json", "pendingLineCode", key, readonly=True):
+        for item in order.get("items", []):
+            if (item.get("productCode"), item.get("colorCode")) == key:
+                pending = item.get("quantity", 0) - (item.get("receivedQty") or 0)
+                if pending > 0:
+                    total += pending
+    return total
+
+
 @router.get("/missing-items")
 def get_missing_items():
     """Eksik ürün listesi - sipariş edilmesi gerekenler"""
-    stock_items = load_json("stockItems.json")
-    orders = load_json("purchaseOrders.json")
-    
-    # Bekleyen siparişlerdeki ürünleri topla
-    pending_orders = {}
-    for order in orders:
-        if order.get("status") in ("draft", "sent", "partial"):
-            for item in order.get("items", []):
-                key = f"{item.get('productCode')}_{item.get('colorCode')}"
-                pending = item.get("quantity", 0) - (item.get("receivedQty") or 0)
-                if pending > 0:
-                    if key not in pending_orders:
-                        pending_orders[key] = 0
-                    pending_orders[key] += pending
+    stock_items = load_json("stockItems.json", readonly=True)
     
     missing = []
     
@@ -337,8 +346,7 @@ def get_missing_items():
         
         if available <= critical:
             shortage = critical - available + 10  # Kritik seviyenin 10 üstünü öner
-            key = f"{item.get('productCode')}_{item.get('colorCode')}"
-            pending = pending_orders.get(key, 0)
+            pending = _pending_quantity(item.get("productCode"), item.get("colorCode"))
             
             missing.append({
                 "itemId": item.get("id"),
@@ -405,11 +413,10 @@ def list_suppliers(type: str | None = None):
 @router.get("/suppliers/{supplier_id}")
 def get_supplier(supplier_id: str):
     """Tedarikçi detayını getir"""
-    suppliers = load_json("suppliers.json")
-    for supplier in suppliers:
-        if supplier.get("id") == supplier_id:
-            return supplier
-    raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
+    supplier = get_record("suppliers.json", supplier_id)
+    if supplier is None:
+        raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
+    return supplier
 
 
 @router.post("/suppliers", status_code=201)
@@ -433,25 +440,17 @@ def create_supplier(payload: SupplierIn):
 @router.put("/suppliers/{supplier_id}")
 def update_supplier(supplier_id: str, payload: SupplierUpdate):
     """Tedarikçi güncelle"""
-    suppliers = load_json("suppliers.json")
-    
-    for idx, supplier in enumerate(suppliers):
-        if supplier.get("id") == supplier_id:
-            update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
-            updated = {**supplier, **update_data}
-            suppliers[idx] = updated
-            save_json("suppliers.json", suppliers)
-            return updated
-    
-    raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
+    update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
+    updated = update_record("suppliers.json", supplier_id, lambda supplier: supplier.update(update_data))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
+    return updated
 
 
 @router.delete("/suppliers/{supplier_id}")
 def delete_supplier(supplier_id: str):
     """Tedarikçi sil"""
-    suppliers = load_json("suppliers.json")
-    suppliers = [s for s in suppliers if s.get("id") != supplier_id]
-    save_json("suppliers.json", suppliers)
+    delete_record("suppliers.json", supplier_id)
     return {"success": True, "id": supplier_id}
 
 
@@ -471,15 +470,13 @@ class SupplierTransactionIn(BaseModel):
 @router.get("/suppliers/{supplier_id}/transactions")
 def get_supplier_transactions(supplier_id: str):
     """Tedarikçi/bayi ürün hareketlerini getir"""
-    transactions = load_json("supplierTransactions.json")
-    
-    # Bu tedarikçiye ait hareketleri filtrele
-    supplier_txs = [t for t in transactions if t.get("supplierId") == supplier_id]
+    # Bu tedarikçiye ait hareketler
+    supplier_txs = find_records("supplierTransactions.json", "supplierId", supplier_id, readonly=True)
     
     # Ürün bazlı bakiye hesapla
     product_balances = {}
     for tx in supplier_txs:
-        key = f"{tx.get('productCode')}_{tx.get('colorCode')}"
+        key = (tx.get("productCode"), tx.get("colorCode"))
         if key not in product_balances:
             product_balances[key] = {
                 "productCode": tx.get("productCode"),
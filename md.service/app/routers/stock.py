@@ -1,12 +1,32 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+    declare_index,
+    declare_sorted_index,
+    declare_text_index,
+    delete_record,
+    find_records,
+    get_record,
+    load_json,
+    prefix_records,
+    search_records,
+    transaction,
+    update_record,
+)
+from ..http_cache import conditional
+from ..ledger import Posting, adjust_movement, drift, ledger
 
 router = APIRouter(prefix="/stock", tags=["stock"])
 
+declare_index("stockItems.json", "supplierId", ("productCode", "colorCode"))
+declare_index("stockMovements.json", "jobId", "itemId")
+declare_index("reservations.json", "jobId", "itemId", "status")
+declare_sorted_index("stockItems.json", "productCode", "colorCode")
+declare_text_index("stockItems.json", "text", "productCode", "name", "colorName")
+
 
 class StockItemIn(BaseModel):
     productCode: str
@@ -41,7 +61,7 @@ class StockItemUpdate(BaseModel):
 class MovementIn(BaseModel):
     itemId: str
     qty: float
-    type: str  # stockIn, stockOut, reserve, release
+    type: str  # stockIn, stockOut, reserve, release, consume (adjust sadece sayaç düzeltmelerinden)
     reason: str | None = None
     operator: str | None = None
     reference: str | None = None
@@ -55,128 +75,242 @@ class BulkReservation(BaseModel):
     note: str | None = None
 
 
-@router.get("/items")
+def _parse_as_of(as_of: str | None) -> str | None:
+    if as_of is None:
+        return None
+    try:
+        return datetime.strptime(as_of, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="asOf YYYY-MM-DD formatında olmalı")
+
+
+def _items_by_code_prefix(product_code: str | None, color_code: str | None, limit: int | None = None) -> list[dict]:
+    """
+    Ürün/renk kodu önek filtresi sıralı indeks üzerinden (O(log n + k)); sonuç koda
+    göre sıralıdır. İkisi birden verilirse ürün kodu indeksi kullanılır, renk kodu
+    eşleşenler üzerinde süzülür. Dönen kayıtlar cache'e aittir, değiştirilmemeli.
+    """
+    if product_code:
+        items = prefix_records("stockItems.json", "productCode", product_code,
+                               limit=None if color_code else limit, readonly=True)
+        if color_code:
+            items = [i for i in items if i.get("colorCode", "").startswith(color_code)]
+            if limit:
+                items = items[:limit]
+        return items
+    return prefix_records("stockItems.json", "colorCode", color_code, limit=limit, readonly=True)
+
+
+@router.get("/items", dependencies=[Depends(conditional("stockItems.json"))])
 def list_items(
     productCode: str | None = None,
     colorCode: str | None = None,
     supplierId: str | None = None,
-    critical_only: bool = False
+    critical_only: bool = False,
+    limit: int | None = Query(None, ge=1, description="En fazla kaç kayıt dönsün")
 ):
-    """Stok kalemlerini listele, opsiyonel filtrelerle"""
-    items = load_json("stockItems.json")
+    """
+    Stok kalemlerini listele, opsiyonel filtrelerle.
+    productCode/colorCode önek filtresidir; verildiğinde sonuç koda göre sıralıdır.
+    """
+    extra_filters = supplierId or critical_only
+    if productCode or colorCode:
+        items = _items_by_code_prefix(productCode, colorCode, limit=None if extra_filters else limit)
+        if supplierId:
+            items = [i for i in items if i.get("supplierId") == supplierId]
+    elif supplierId:
+        items = find_records("stockItems.json", "supplierId", supplierId, readonly=True)
+    else:
+        items = load_json("stockItems.json", readonly=True)
     
-    if productCode:
-        items = [i for i in items if i.get("productCode", "").startswith(productCode)]
-    if colorCode:
-        items = [i for i in items if i.get("colorCode", "").startswith(colorCode)]
-    if supplierId:
-        items = [i for i in items if i.get("supplierId") == supplierId]
     if critical_only:
         items = [i for i in items if (i.get("onHand", 0) - i.get("reserved", 0)) <= i.get("critical", 0)]
     
-    return items
+    return items[:limit] if limit else items
 
 
-@router.get("/items/search")
+@router.get("/items/search", dependencies=[Depends(conditional("stockItems.json"))])
 def search_items(
     q: str = Query(None, description="Ürün kodu veya adı ile arama"),
     productCode: str = Query(None, description="Ürün kodu ile filtrele"),
-    colorCode: str = Query(None, description="Renk kodu ile filtrele")
+    colorCode: str = Query(None, description="Renk kodu ile filtrele"),
+    limit: int | None = Query(None, ge=1, description="En fazla kaç kayıt dönsün")
 ):
     """Ürün arama - klavye odaklı stok girişi için"""
-    items = load_json("stockItems.json")
-    
     if q:
-        q_lower = q.lower()
-        items = [i for i in items if 
-                 q_lower in i.get("productCode", "").lower() or
-                 q_lower in i.get("name", "").lower() or
-                 q_lower in i.get("colorName", "").lower()]
-    
-    if productCode:
-        items = [i for i in items if i.get("productCode", "").startswith(productCode)]
-    
-    if colorCode:
-        items = [i for i in items if i.get("colorCode", "").startswith(colorCode)]
+        # Trigram indeksi: Türkçe harf duyarsız, her kelime eşleşmeli, en iyi eşleşme önce
+        filtered = productCode or colorCode
+        items = search_records("stockItems.json", "text", q, limit=None if filtered else limit, readonly=True)
+        if productCode:
+            items = [i for i in items if i.get("productCode", "").startswith(productCode)]
+        if colorCode:
+            items = [i for i in items if i.get("colorCode", "").startswith(colorCode)]
+    elif productCode or colorCode:
+        # Autocomplete: önek sorgusu sıralı indeksten, limit indekste uygulanır
+        items = _items_by_code_prefix(productCode, colorCode, limit=limit)
+    else:
+        items = load_json("stockItems.json", readonly=True)
+    
+    if limit:
+        items = items[:limit]
     
     # Her ürün için kullanılabilir stok hesapla
+    result = []
     for item in items:
-        item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-        item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
+        available = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
+        result.append({
+            **item,
+            "available": available,
+            "isCritical": available <= (item.get("critical", 0) or 0)
+        })
     
-    return items
+    return result
 
 
 @router.get("/items/{item_id}")
 def get_item(item_id: str):
     """Tek bir stok kalemini getir"""
-    items = load_json("stockItems.json")
-    for item in items:
-        if item.get("id") == item_id:
-            item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-            item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
-            return item
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    item = get_record("stockItems.json", item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
+    item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
+    return item
 
 
 @router.get("/items/by-code/{product_code}/{color_code}")
 def get_item_by_code(product_code: str, color_code: str):
     """Ürün kodu ve renk kodu ile stok kalemini getir"""
-    items = load_json("stockItems.json")
-    for item in items:
-        if item.get("productCode") == product_code and item.get("colorCode") == color_code:
-            item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
-            item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
-            return item
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    items = find_records("stockItems.json", ("productCode", "colorCode"), (product_code, color_code))
+    if not items:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    item = items[0]
+    item["available"] = (item.get("onHand", 0) or 0) - (item.get("reserved", 0) or 0)
+    item["isCritical"] = item["available"] <= (item.get("critical", 0) or 0)
+    return item
 
 
 @router.post("/items", status_code=201)
 def create_item(payload: StockItemIn):
     """Yeni stok kalemi oluştur"""
-    items = load_json("stockItems.json")
-    
     # Aynı ürün kodu + renk kodu kontrolü
-    for item in items:
-        if item.get("productCode") == payload.productCode and item.get("colorCode") == payload.colorCode:
-            raise HTTPException(status_code=400, detail="Bu ürün kodu ve renk kodu kombinasyonu zaten mevcut")
+    if find_records("stockItems.json", ("productCode", "colorCode"), (payload.productCode, payload.colorCode), readonly=True):
+        raise HTTPException(status_code=400, detail="Bu ürün kodu ve renk kodu kombinasyonu zaten mevcut")
     
     new_id = f"STK-{str(uuid.uuid4())[:8].upper()}"
     new_item = {
         "id": new_id,
         **payload.model_dump(),
+        "onHand": 0,
+        "reserved": 0,
         "lastUpdated": datetime.utcnow().isoformat()[:10]
     }
     
-    items.insert(0, new_item)
-    save_json("stockItems.json", items)
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+        tx["stockItems.json"].insert(0, new_item)
+        # Açılış bakiyesi hareket olarak yazılır, sayaçlar defterden gelir
+        if payload.onHand or payload.reserved:
+            Posting(tx).post(new_item, adjust_movement(new_item, payload.onHand, payload.reserved, "Açılış bakiyesi"))
     return new_item
 
 
 @router.put("/items/{item_id}")
 def update_item(item_id: str, payload: StockItemUpdate):
     """Stok kalemini güncelle"""
-    items = load_json("stockItems.json")
-    for idx, item in enumerate(items):
-        if item.get("id") == item_id:
-            update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
-            updated = {**item, **update_data}
-            updated["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-            items[idx] = updated
-            save_json("stockItems.json", items)
-            return updated
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    update_data = {k: v for k, v in payload.model_dump().items() if v is not None}
+    counts = {k: update_data.pop(k) for k in ("onHand", "reserved") if k in update_data}
+
+    def apply(item):
+        item.update(update_data)
+        item["lastUpdated"] = datetime.utcnow().isoformat()[:10]
+
+    if not counts:
+        updated = update_record("stockItems.json", item_id, apply)
+        if updated is None:
+            raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+        return updated
+
+    # Sayım: defter bakiyesine göre fark düzeltme hareketi olarak yazılır
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+        item = tx.get("stockItems.json", item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+        apply(item)
+        posting = Posting(tx)
+        on_hand, reserved = posting.balance(item)
+        on_hand_change = counts.get("onHand", on_hand) - on_hand
+        reserved_change = counts.get("reserved", reserved) - reserved
+        if on_hand_change or reserved_change:
+            posting.post(item, adjust_movement(item, on_hand_change, reserved_change, "Sayım düzeltmesi"))
+    return item
 
 
 @router.delete("/items/{item_id}")
 def delete_item(item_id: str):
     """Stok kalemini sil"""
-    items = load_json("stockItems.json")
-    items = [i for i in items if i.get("id") != item_id]
-    save_json("stockItems.json", items)
+    delete_record("stockItems.json", item_id)
     return {"success": True, "id": item_id}
 
 
+@router.get("/items/{item_id}/balance")
+def get_item_balance(item_id: str, asOf: str | None = None):
+    """Kalemin hareketlerden türetilen bakiyesi; asOf verilirse o gün sonundaki bakiye"""
+    as_of = _parse_as_of(asOf)
+    item = get_record("stockItems.json", item_id, readonly=True)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    balance = ledger.balance(item_id, as_of)
+    if as_of is None:
+        balance["inSync"] = drift([item]) == []
+    return balance
+
+
+@router.get("/balances")
+def list_balances(asOf: str | None = None):
+    """Tüm kalemlerin defter bakiyeleri (asOf: YYYY-MM-DD gün sonu)"""
+    as_of = _parse_as_of(asOf)
+    result = []
+    for item in load_json("stockItems.json", readonly=True):
+        balance = ledger.balance(item.get("id"), as_of)
+        balance["productCode"] = item.get("productCode")
+        balance["colorCode"] = item.get("colorCode")
+        balance["name"] = item.get("name")
+        result.append(balance)
+    return result
+
+
+@router.get("/ledger/check")
+def check_ledger():
+    """stockItems sayaçları ile hareket defteri arasındaki uyuşmazlıklar"""
+    items = load_json("stockItems.json", readonly=True)
+    mismatches = drift(items)
+    return {"inSync": not mismatches, "checked": len(items), "mismatches": mismatches}
+
+
+@router.post("/ledger/reconcile")
+def reconcile_ledger(source: str = Query("counters", pattern="^(counters|ledger)$")):
+    """
+    Uyuşmazlıkları gider. source=counters: sayaçlar doğru kabul edilir, fark
+    düzeltme hareketi olarak deftere yazılır (hareketsiz açılış bakiyeleri için).
+    source=ledger: sayaçlar defter bakiyesine eşitlenir.
+    """
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+        items = tx["stockItems.json"]
+        mismatches = drift(items)
+        posting = Posting(tx)
+        for mismatch in mismatches:
+            item = tx.get("stockItems.json", mismatch["itemId"])
+            balance = mismatch["ledger"]
+            if source == "counters":
+                # Fark ilk bakiye sorgusunda düzeltme hareketi olarak yazılır
+                posting.balance(item)
+            else:
+                item["onHand"] = balance["onHand"]
+                item["reserved"] = balance["reserved"]
+                item["lastUpdated"] = datetime.utcnow().isoformat()[:10]
+    return {"source": source, "reconciled": len(mismatches), "items": mismatches}
+
+
 @router.get("/movements")
 def list_movements(
     itemId: str | None = None,
@@ -184,12 +318,14 @@ def list_movements(
     limit: int = 100
 ):
     """Stok hareketlerini listele"""
-    movements = load_json("stockMovements.json")
-    
-    if itemId:
-        movements = [m for m in movements if m.get("itemId") == itemId]
     if jobId:
-        movements = [m for m in movements if m.get("jobId") == jobId]
+        movements = find_records("stockMovements.json", "jobId", jobId, readonly=True)
+        if itemId:
+            movements = [m for m in movements if m.get("itemId") == itemId]
+    elif itemId:
+        movements = find_records("stockMovements.json", "itemId", itemId, readonly=True)
+    else:
+        movements = load_json("stockMovements.json", readonly=True)
     
     return movements[:limit]
 
@@ -197,233 +333,186 @@ def list_movements(
 @router.post("/movements", status_code=201)
 def create_movement(payload: MovementIn):
     """Stok hareketi oluştur"""
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+        posting = Posting(tx)
     
-    # Find item
-    target = None
-    target_idx = -1
-    for idx, item in enumerate(items):
-        if item.get("id") == payload.itemId:
-            target = item
-            target_idx = idx
-            break
+        target = tx.get("stockItems.json", payload.itemId)
+        if target is None:
+            raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
     
-    if not target:
-        raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+        qty = payload.qty
     
-    qty = payload.qty
-    
-    # Apply movement
-    if payload.type == "stockIn":
-        target["onHand"] = (target.get("onHand") or 0) + qty
-    elif payload.type == "stockOut":
-        available = (target.get("onHand") or 0) - (target.get("reserved") or 0)
-        if qty > available:
-            raise HTTPException(status_code=400, detail=f"Yetersiz stok. Kullanılabilir: {available}")
-        target["onHand"] = max(0, (target.get("onHand") or 0) - qty)
-    elif payload.type == "reserve":
-        available = (target.get("onHand") or 0) - (target.get("reserved") or 0)
-        if qty > available:
-            raise HTTPException(status_code=400, detail=f"Yetersiz stok. Kullanılabilir: {available}")
-        target["reserved"] = (target.get("reserved") or 0) + qty
-    elif payload.type == "release":
-        target["reserved"] = max(0, (target.get("reserved") or 0) - qty)
-    elif payload.type == "consume":
-        # Rezervasyonu kaldır ve stoktan düş (üretime alındığında)
-        target["reserved"] = max(0, (target.get("reserved") or 0) - qty)
-        target["onHand"] = max(0, (target.get("onHand") or 0) - qty)
-    
-    target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-    items[target_idx] = target
-    
-    # Create movement record
-    change = qty if payload.type in ("stockIn",) else -qty
-    if payload.type == "reserve":
-        change = qty  # Rezervasyon pozitif gösterilir
-    elif payload.type == "release":
-        change = -qty
+        if payload.type in ("stockOut", "reserve"):
+            on_hand, reserved = posting.balance(target)
+            available = on_hand - reserved
+            if qty > available:
+                raise HTTPException(status_code=400, detail=f"Yetersiz stok. Kullanılabilir: {available}")
     
-    movement = {
-        "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
-        "date": datetime.utcnow().isoformat()[:10],
-        "item": target.get("name"),
-        "itemId": payload.itemId,
-        "productCode": target.get("productCode"),
-        "colorCode": target.get("colorCode"),
-        "change": change,
-        "type": payload.type,
-        "reason": payload.reason or payload.type,
-        "operator": payload.operator or "Sistem",
-        "reference": payload.reference,
-        "jobId": payload.jobId,
-    }
+        target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
     
-    movements.insert(0, movement)
+        # Hareket kaydı; sayaçlar deftere eklendikten sonra defter bakiyesinden yazılır
+        # (consume: rezervasyonu kaldırıp stoktan düşer)
+        change = qty if payload.type in ("stockIn", "reserve") else -qty
     
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
+        movement = posting.post(target, {
+            "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+            "date": datetime.utcnow().isoformat()[:10],
+            "item": target.get("name"),
+            "itemId": payload.itemId,
+            "productCode": target.get("productCode"),
+            "colorCode": target.get("colorCode"),
+            "change": change,
+            "type": payload.type,
+            "reason": payload.reason or payload.type,
+            "operator": payload.operator or "Sistem",
+            "reference": payload.reference,
+            "jobId": payload.jobId,
+        })
     
-    return {"item": target, "movement": movement}
+        return {"item": target, "movement": movement}
 
 
 @router.post("/bulk-reserve", status_code=201)
 def bulk_reserve(payload: BulkReservation):
     """Toplu rezervasyon veya stoktan düşme (iş için)"""
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
-    reservations = load_json("reservations.json")
+    with transaction("stockItems.json", "stockMovements.json", "reservations.json") as tx:
+        posting = Posting(tx)
+        reservations = tx["reservations.json"]
     
-    results = []
-    errors = []
+        results = []
+        errors = []
     
-    for line in payload.items:
-        item_id = line.get("itemId")
-        qty = line.get("qty", 0)
-        
-        # Find item
-        target = None
-        target_idx = -1
-        for idx, item in enumerate(items):
-            if item.get("id") == item_id:
-                target = item
-                target_idx = idx
-                break
+        for line in payload.items:
+            item_id = line.get("itemId")
+            qty = line.get("qty", 0)
         
-        if not target:
-            errors.append({"itemId": item_id, "error": "Stok kalemi bulunamadı"})
-            continue
+            target = tx.get("stockItems.json", item_id)
+            if target is None:
+                errors.append({"itemId": item_id, "error": "Stok kalemi bulunamadı"})
+                continue
         
-        available = (target.get("onHand") or 0) - (target.get("reserved") or 0)
+            on_hand, reserved = posting.balance(target)
+            available = on_hand - reserved
         
-        if payload.reserveType == "consume":
-            # Direkt stoktan düş (üretime al)
-            if qty > (target.get("onHand") or 0):
-                errors.append({
-                    "itemId": item_id,
-                    "name": target.get("name"),
-                    "error": f"Yetersiz stok. Mevcut: {target.get('onHand')}, İstenen: {qty}"
-                })
-                continue
-            
-            # Stoktan düş
-            old_on_hand = target.get("onHand") or 0
-            old_reserved = target.get("reserved") or 0
-            target["onHand"] = max(0, old_on_hand - qty)
+            if payload.reserveType == "consume":
+                # Direkt stoktan düş (üretime al)
+                if qty > on_hand:
+                    errors.append({
+                        "itemId": item_id,
+                        "name": target.get("name"),
+                        "error": f"Yetersiz stok. Mevcut: {on_hand}, İstenen: {qty}"
+                    })
+                    continue
             
-            # Eğer düşülen miktar, başka işlerin rezervasyonunu etkiliyor ise
-            # reserved değerini de ayarla (available negatif olamaz)
-            new_available = target["onHand"] - old_reserved
-            affected_reservations = []
-            if new_available < 0:
-                # Başka işlerin rezervasyonları etkilendi
-                affected_amount = abs(new_available)
-                target["reserved"] = max(0, old_reserved - affected_amount)
+                # Düşülen miktar başka işlerin rezervasyonunu etkiliyorsa (available
+                # negatif olamaz) stockOut hareketi reserved'ı da düşürür; burada
+                # etkilenen rezervasyon kayıtları güncellenir
+                new_available = on_hand - qty - reserved
+                affected_reservations = []
+                if new_available < 0:
+                    # Başka işlerin rezervasyonları etkilendi
+                    affected_amount = abs(new_available)
                 
-                # Etkilenen rezervasyonları bul ve güncelle
-                for rsv in reservations:
-                    if rsv.get("itemId") == item_id and rsv.get("status") == "Beklemede" and rsv.get("jobId") != payload.jobId:
-                        if affected_amount <= 0:
-                            break
-                        rsv_qty = rsv.get("qty", 0)
-                        reduce_by = min(rsv_qty, affected_amount)
-                        rsv["qty"] = rsv_qty - reduce_by
-                        rsv["affectedBy"] = payload.jobId
-                        rsv["note"] = f"Stok başka iş için kullanıldı (-{reduce_by})"
-                        affected_amount -= reduce_by
-                        if rsv["qty"] <= 0:
-                            rsv["status"] = "İptal"
-                        affected_reservations.append({
-                            "reservationId": rsv.get("id"),
-                            "jobId": rsv.get("jobId"),
-                            "reducedBy": reduce_by
-                        })
+                    # Etkilenen rezervasyonları bul ve güncelle
+                    for rsv in tx.find("reservations.json", "itemId", item_id):
+                        if rsv.get("status") == "Beklemede" and rsv.get("jobId") != payload.jobId:
+                            if affected_amount <= 0:
+                                break
+                            rsv_qty = rsv.get("qty", 0)
+                            reduce_by = min(rsv_qty, affected_amount)
+                            rsv["qty"] = rsv_qty - reduce_by
+                            rsv["affectedBy"] = payload.jobId
+                            rsv["note"] = f"Stok başka iş için kullanıldı (-{reduce_by})"
+                            affected_amount -= reduce_by
+                            if rsv["qty"] <= 0:
+                                rsv["status"] = "İptal"
+                            affected_reservations.append({
+                                "reservationId": rsv.get("id"),
+                                "jobId": rsv.get("jobId"),
+                                "reducedBy": reduce_by
+                            })
             
-            movement_type = "stockOut"
-            reason = f"Üretime alındı - {payload.jobId}"
-            if affected_reservations:
-                reason += f" (⚠️ {len(affected_reservations)} iş etkilendi)"
-        else:
-            # Rezerve et
-            affected_reservations = []  # Reserve işleminde etkilenen rezervasyon yok
-            if qty > available:
-                errors.append({
-                    "itemId": item_id,
-                    "name": target.get("name"),
-                    "error": f"Yetersiz kullanılabilir stok. Kullanılabilir: {available}, İstenen: {qty}",
-                    "shortage": qty - available
-                })
-                continue
+                movement_type = "stockOut"
+                reason = f"Üretime alındı - {payload.jobId}"
+                if affected_reservations:
+                    reason += f" (⚠️ {len(affected_reservations)} iş etkilendi)"
+            else:
+                # Rezerve et
+                affected_reservations = []  # Reserve işleminde etkilenen rezervasyon yok
+                if qty > available:
+                    errors.append({
+                        "itemId": item_id,
+                        "name": target.get("name"),
+                        "error": f"Yetersiz kullanılabilir stok. Kullanılabilir: {available}, İstenen: {qty}",
+                        "shortage": qty - available
+                    })
+                    continue
             
-            target["reserved"] = (target.get("reserved") or 0) + qty
-            movement_type = "reserve"
-            reason = f"Rezerve edildi - {payload.jobId}"
+                movement_type = "reserve"
+                reason = f"Rezerve edildi - {payload.jobId}"
             
-            # Rezervasyon kaydı
-            reservations.insert(0, {
-                "id": f"RSV-{str(uuid.uuid4())[:8].upper()}",
-                "jobId": payload.jobId,
+                # Rezervasyon kaydı
+                reservations.insert(0, {
+                    "id": f"RSV-{str(uuid.uuid4())[:8].upper()}",
+                    "jobId": payload.jobId,
+                    "itemId": item_id,
+                    "productCode": target.get("productCode"),
+                    "colorCode": target.get("colorCode"),
+                    "item": target.get("name"),
+                    "qty": qty,
+                    "unit": target.get("unit"),
+                    "createdAt": datetime.utcnow().isoformat(),
+                    "status": "Beklemede"
+                })
+        
+            target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
+        
+            # Hareket kaydı; sayaçlar defterden yazılır
+            posting.post(target, {
+                "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+                "date": datetime.utcnow().isoformat()[:10],
+                "item": target.get("name"),
                 "itemId": item_id,
                 "productCode": target.get("productCode"),
                 "colorCode": target.get("colorCode"),
-                "item": target.get("name"),
-                "qty": qty,
-                "unit": target.get("unit"),
-                "createdAt": datetime.utcnow().isoformat(),
-                "status": "Beklemede"
+                "change": -qty if movement_type == "stockOut" else qty,
+                "type": movement_type,
+                "reason": reason,
+                "operator": "Sistem",
+                "jobId": payload.jobId,
             })
         
-        target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-        items[target_idx] = target
-        
-        # Movement record
-        movements.insert(0, {
-            "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
-            "date": datetime.utcnow().isoformat()[:10],
-            "item": target.get("name"),
-            "itemId": item_id,
-            "productCode": target.get("productCode"),
-            "colorCode": target.get("colorCode"),
-            "change": -qty if movement_type == "stockOut" else qty,
-            "type": movement_type,
-            "reason": reason,
-            "operator": "Sistem",
-            "jobId": payload.jobId,
-        })
-        
-        result_item = {
-            "itemId": item_id,
-            "name": target.get("name"),
-            "qty": qty,
-            "newOnHand": target.get("onHand"),
-            "newReserved": target.get("reserved"),
-            "available": target.get("onHand", 0) - target.get("reserved", 0)
+            result_item = {
+                "itemId": item_id,
+                "name": target.get("name"),
+                "qty": qty,
+                "newOnHand": target.get("onHand"),
+                "newReserved": target.get("reserved"),
+                "available": target.get("onHand", 0) - target.get("reserved", 0)
+            }
+            if payload.reserveType == "consume" and affected_reservations:
+                result_item["affectedReservations"] = affected_reservations
+            results.append(result_item)
+    
+        return {
+            "success": len(errors) == 0,
+            "results": results,
+            "errors": errors,
+            "jobId": payload.jobId
         }
-        if payload.reserveType == "consume" and affected_reservations:
-            result_item["affectedReservations"] = affected_reservations
-        results.append(result_item)
-    
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
-    save_json("reservations.json", reservations)
-    
-    return {
-        "success": len(errors) == 0,
-        "results": results,
-        "errors": errors,
-        "jobId": payload.jobId
-    }
 
 
 @router.get("/reservations")
 def list_reservations(jobId: str | None = None, status: str | None = None):
     """Rezervasyonları listele"""
-    reservations = load_json("reservations.json")
-    
     if jobId:
-        reservations = [r for r in reservations if r.get("jobId") == jobId]
-    if status:
-        reservations = [r for r in reservations if r.get("status") == status]
+        reservations = find_records("reservations.json", "jobId", jobId, readonly=True)
+        if status:
+            reservations = [r for r in reservations if r.get("status") == status]
+    elif status:
+        reservations = find_records("reservations.json", "status", status, readonly=True)
+    else:
+        reservations = load_json("reservations.json", readonly=True)
     
     return reservations
 
@@ -431,30 +520,20 @@ def list_reservations(jobId: str | None = None, status: str | None = None):
 @router.put("/reservations/{reservation_id}/release")
 def release_reservation(reservation_id: str):
     """Rezervasyonu serbest bırak"""
-    reservations = load_json("reservations.json")
-    items = load_json("stockItems.json")
-    movements = load_json("stockMovements.json")
-    
-    target_res = None
-    target_idx = -1
-    for idx, res in enumerate(reservations):
-        if res.get("id") == reservation_id:
-            target_res = res
-            target_idx = idx
-            break
+    with transaction("reservations.json", "stockItems.json", "stockMovements.json") as tx:
+        posting = Posting(tx)
     
-    if not target_res:
-        raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı")
+        target_res = tx.get("reservations.json", reservation_id)
+        if target_res is None:
+            raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı")
     
-    # Find item and release
-    for idx, item in enumerate(items):
-        if item.get("id") == target_res.get("itemId"):
-            item["reserved"] = max(0, (item.get("reserved") or 0) - target_res.get("qty", 0))
+        # Find item and release
+        item = tx.get("stockItems.json", target_res.get("itemId"))
+        if item is not None:
             item["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-            items[idx] = item
-            
-            # Movement record
-            movements.insert(0, {
+        
+            # Hareket kaydı; reserved defterden yazılır
+            posting.post(item, {
                 "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
                 "date": datetime.utcnow().isoformat()[:10],
                 "item": item.get("name"),
@@ -467,18 +546,12 @@ def release_reservation(reservation_id: str):
                 "operator": "Sistem",
                 "jobId": target_res.get("jobId"),
             })
-            break
-    
-    # Update reservation status
-    target_res["status"] = "İptal"
-    target_res["releasedAt"] = datetime.utcnow().isoformat()
-    reservations[target_idx] = target_res
     
-    save_json("stockItems.json", items)
-    save_json("stockMovements.json", movements)
-    save_json("reservations.json", reservations)
+        # Update reservation status
+        target_res["status"] = "İptal"
+        target_res["releasedAt"] = datetime.utcnow().isoformat()
     
-    return {"success": True, "reservation": target_res}
+        return {"success": True, "reservation": target_res}
 
 
 @router.get("/critical")
@@ -3,10 +3,12 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import declare_index, find_records, get_record, load_json, save_json
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
+declare_index("supplierTransactions.json", "supplierId")
+
 
 class SupplierContact(BaseModel):
     phone: str | None = None
@@ -141,9 +143,7 @@ def get_supplier_transactions(
     productCode: str | None = None
 ):
     """Tedarikçi ile ürün bazlı hareketleri getir"""
-    transactions = load_json("supplierTransactions.json")
-    
-    result = [t for t in transactions if t.get("supplierId") == supplier_id]
+    result = find_records("supplierTransactions.json", "supplierId", supplier_id, readonly=True)
     
     if type:
         result = [t for t in result if t.get("type") == type]
@@ -198,20 +198,17 @@ def delete_transaction(supplier_id: str, transaction_id: str):
 @router.get("/{supplier_id}/balance")
 def get_supplier_balance(supplier_id: str):
     """Tedarikçi ile ürün bazlı bakiye özeti"""
-    suppliers = load_json("suppliers.json")
-    transactions = load_json("supplierTransactions.json")
-    
     # Tedarikçi kontrolü
-    supplier = next((s for s in suppliers if s.get("id") == supplier_id), None)
+    supplier = get_record("suppliers.json", supplier_id, readonly=True)
     if not supplier:
         raise HTTPException(status_code=404, detail="Tedarikçi bulunamadı")
     
-    supplier_trans = [t for t in transactions if t.get("supplierId") == supplier_id]
+    supplier_trans = find_records("supplierTransactions.json", "supplierId", supplier_id, readonly=True)
     
     # Ürün bazlı gruplama
     balance_map = {}
     for trans in supplier_trans:
-        key = f"{trans.get('productCode')}-{trans.get('colorCode')}"
+        key = (trans.get("productCode"), trans.get("colorCode"))
         if key not in balance_map:
             balance_map[key] = {
                 "productCode": trans.get("productCode"),
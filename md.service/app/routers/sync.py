@@ -0,0 +1,64 @@
+"""
+Delta senkronizasyon: istemci son bildiği koleksiyon sürümünden sonraki
+değişiklikleri alır (eklenen/güncellenen kayıtlar + silinenler için tombstone).
+Trafik veri boyutuyla değil değişiklik sayısıyla orantılıdır.
+
+  GET /sync/jobs            -> tam liste + sürüm (reset: true)
+  GET /sync/jobs?since=123  -> sadece 123'ten sonraki değişiklikler
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from ..data_loader import changes_since, collection_version, get_record, load_json
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+# Senkronize edilebilen koleksiyonlar (dosya adı .json olmadan)
+SYNC_COLLECTIONS = {
+  "colors", "customers", "documents", "jobs", "personnel", "planningEvents",
+  "productionOrders", "purchaseOrders", "reservations", "settings", "stockItems",
+  "stockMovements", "suppliers", "task_assignments", "tasks", "team_members", "teams",
+}
+
+
+@router.get("/{collection}")
+def sync_collection(
+  collection: str,
+  since: Optional[int] = Query(None, description="İstemcinin son aldığı sürüm (önceki yanıttaki version)"),
+):
+  """
+  since verilmezse veya değişiklik günlüğü since'i kapsamıyorsa tüm koleksiyon
+  döner (reset: true); istemci yerel kopyasını bununla değiştirmelidir.
+  """
+  if collection not in SYNC_COLLECTIONS:
+    raise HTTPException(status_code=404, detail="Koleksiyon senkronize edilemez")
+  filename = f"{collection}.json"
+
+  entries = None
+  if since is not None:
+    try:
+      version, entries = changes_since(filename, since)
+    except FileNotFoundError:
+      raise HTTPException(status_code=404, detail="Koleksiyon bulunamadı")
+
+  if entries is None:
+    # Sürüm veriden önce okunur: arada yazım olursa sonraki senkron onu tekrar getirir
+    version = collection_version(filename)
+    try:
+      data = load_json(filename, readonly=True)
+    except FileNotFoundError:
+      raise HTTPException(status_code=404, detail="Koleksiyon bulunamadı")
+    return {"collection": collection, "version": version, "reset": True, "records": data, "tombstones": []}
+
+  # Kayıt başına son işlem geçerli; kayıtlar güncel hâlleriyle döner
+  last: dict[str, tuple[int, str]] = {}
+  for entry_version, op, record_id in entries:
+    last[record_id] = (entry_version, op)
+  records, tombstones = [], []
+  for record_id, (entry_version, op) in last.items():
+    record = get_record(filename, record_id, readonly=True) if op == "upsert" else None
+    if record is None:
+      tombstones.append({"id": record_id, "deleted": True, "version": entry_version})
+    else:
+      records.append(record)
+  return {"collection": collection, "version": version, "reset": False, "records": records, "tombstones": tombstones}
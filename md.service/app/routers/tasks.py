@@ -1,10 +1,21 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 
-from ..data_loader import load_json, save_json
+from ..data_loader import (
+  declare_index,
+  find_records,
+  get_record,
+  load_json,
+  save_json,
+  transaction,
+  update_record,
+  upsert_record,
+)
+from ..http_cache import conditional
+from ..pagination import paginate
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -18,128 +29,142 @@ class TaskIn(BaseModel):
   bitisTarihi: Optional[str] = Field(None, description="Bitiş tarihi (ISO format)")
 
 
-@router.get("/")
+# Aktif atamalar: görev -> atamalar ve (tip, kişi/ekip) -> atamalar indeksleri
+def _active(ta: dict) -> bool:
+  return ta.get("active", True) and not ta.get("deleted")
+
+
+declare_index(
+  "task_assignments.json",
+  "taskId",
+  keys={
+    "activeTaskId": lambda ta: (ta.get("taskId"),) if _active(ta) else (),
+    "activeAssignee": lambda ta: ((ta.get("assigneeType"), ta.get("assigneeId")),) if _active(ta) else (),
+  },
+)
+
+# Görev listesi/detayı bu koleksiyonlardan okunur (ETag)
+TASK_COLLECTIONS = ("tasks.json", "task_assignments.json", "personnel.json", "teams.json")
+PRIORITY_RANK = {"high": 0, "med": 1, "low": 2}
+TaskSort = Literal["bitisTarihi", "-bitisTarihi", "oncelik", "-oncelik"]
+
+
+def _sort_key(sort: Optional[str], positions: dict[str, int]):
+  """Sıralama anahtarı; boş bitiş tarihleri her iki yönde de sona kalır"""
+  if sort in ("bitisTarihi", "-bitisTarihi"):
+    descending = sort.startswith("-")
+    return lambda t: ((t.get("bitisTarihi") is None) != descending, t.get("bitisTarihi") or "", t["id"])
+  if sort in ("oncelik", "-oncelik"):
+    # Aynı öncelikte bitiş tarihi yakın olan önce
+    sign = -1 if sort.startswith("-") else 1
+    rank = PRIORITY_RANK.get
+    return lambda t: (
+      sign * rank(t.get("oncelik"), len(PRIORITY_RANK)), t.get("bitisTarihi") is None, t.get("bitisTarihi") or "", t["id"]
+    )
+  # Varsayılan: dosyadaki sıra
+  return lambda t: (positions[t["id"]],)
+
+
+def _assignee_names(assignments: list[dict]) -> list[str]:
+  names = []
+  for ca in assignments:
+    if ca.get("assigneeType") == "personnel":
+      person = get_record("personnel.json", ca.get("assigneeId"), readonly=True)
+      if person and not person.get("deleted"):
+        names.append(f"{person.get('ad')} {person.get('soyad')}")
+    elif ca.get("assigneeType") == "team":
+      team = get_record("teams.json", ca.get("assigneeId"), readonly=True)
+      if team and not team.get("deleted"):
+        names.append(f"👥 {team.get('ad')}")
+  return names
+
+
+@router.get("/", dependencies=[Depends(conditional(*TASK_COLLECTIONS))])
 def list_tasks(
+  response: Response,
   durum: Optional[str] = None,
   oncelik: Optional[str] = None,
   assigneeType: Optional[str] = None,  # "personnel" or "team"
   assigneeId: Optional[str] = None,
+  sort: Optional[TaskSort] = Query(None, description="Sıralama: bitisTarihi, oncelik; '-' ile ters yön"),
+  limit: Optional[int] = Query(None, ge=1, description="Sayfa boyutu; devamı varsa X-Next-Cursor header'ı döner"),
+  cursor: Optional[str] = Query(None, description="Önceki sayfanın X-Next-Cursor değeri"),
 ):
-  tasks = load_json("tasks.json")
-  task_assignments = load_json("task_assignments.json")
-  personnel = load_json("personnel.json")
-  teams = load_json("teams.json")
+  tasks = load_json("tasks.json", readonly=True)
   
-  # Mapping'ler
-  personnel_map = {p.get("id"): p for p in personnel if not p.get("deleted")}
-  teams_map = {t.get("id"): t for t in teams if not t.get("deleted")}
+  # Atama filtresi indeksten: sadece bu kişiye/ekibe aktif ataması olan görevler
+  assigned_ids = None
+  if assigneeType and assigneeId:
+    assigned_ids = {
+      ta.get("taskId")
+      for ta in find_records("task_assignments.json", "activeAssignee", (assigneeType, assigneeId), readonly=True)
+    }
   
   # Filtreleme
   filtered = []
-  for task in tasks:
+  positions = {}
+  for pos, task in enumerate(tasks):
     if task.get("deleted"):
       continue
     if durum and task.get("durum") != durum:
       continue
     if oncelik and task.get("oncelik") != oncelik:
       continue
-    
-    # Tüm aktif atamaları bul (çoklu atama desteği)
-    current_assignments = []
-    for ta in task_assignments:
-      if (ta.get("taskId") == task.get("id") and 
-          not ta.get("deleted") and
-          ta.get("active", True)):
-        current_assignments.append(ta)
-    
-    # Atama filtresi
-    if assigneeType and assigneeId:
-      has_matching_assignment = any(
-        ta.get("assigneeType") == assigneeType and ta.get("assigneeId") == assigneeId
-        for ta in current_assignments
-      )
-      if not has_matching_assignment:
-        continue
-    
-    # Atama bilgilerini ekle (birden fazla atama için)
-    assigneeNames = []
-    for ca in current_assignments:
-      if ca.get("assigneeType") == "personnel":
-        person = personnel_map.get(ca.get("assigneeId"))
-        if person:
-          assigneeNames.append(f"{person.get('ad')} {person.get('soyad')}")
-      elif ca.get("assigneeType") == "team":
-        team = teams_map.get(ca.get("assigneeId"))
-        if team:
-          assigneeNames.append(f"👥 {team.get('ad')}")
+    if assigned_ids is not None and task.get("id") not in assigned_ids:
+      continue
+    positions[task.get("id")] = pos
+    filtered.append(task)
+  
+  page = paginate(
+    filtered, _sort_key(sort, positions), limit=limit, cursor=cursor, sort=sort,
+    reverse=sort == "-bitisTarihi", response=response,
+  )
+  
+  result = []
+  for task in page:
+    # Tüm aktif atamalar (çoklu atama desteği)
+    current_assignments = find_records("task_assignments.json", "activeTaskId", task.get("id"))
+    assigneeNames = _assignee_names(current_assignments)
     
     # Backward compatibility: assigneeName (virgülle ayrılmış)
     assignee_name_str = ", ".join(assigneeNames) if assigneeNames else None
     
-    task_with_assignment = {
+    result.append({
       **task,
       "currentAssignment": current_assignments[0] if current_assignments else None,
       "currentAssignments": current_assignments,
       "assigneeName": assignee_name_str,
       "assigneeType": current_assignments[0].get("assigneeType") if current_assignments else None,
-    }
-    
-    filtered.append(task_with_assignment)
+    })
   
-  return filtered
+  return result
 
 
-@router.get("/{task_id}")
+@router.get("/{task_id}", dependencies=[Depends(conditional(*TASK_COLLECTIONS))])
 def get_task(task_id: str):
-  tasks = load_json("tasks.json")
-  task_assignments = load_json("task_assignments.json")
-  personnel = load_json("personnel.json")
-  teams = load_json("teams.json")
+  task = get_record("tasks.json", task_id, readonly=True)
+  if not task or task.get("deleted"):
+    raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  
+  # Tüm aktif atamalar (çoklu atama desteği)
+  current_assignments = find_records("task_assignments.json", "activeTaskId", task_id, readonly=True)
   
-  # Mapping'ler
-  personnel_map = {p.get("id"): p for p in personnel if not p.get("deleted")}
-  teams_map = {t.get("id"): t for t in teams if not t.get("deleted")}
+  # Assignment history (tümü, active/passive)
+  history = [ta for ta in find_records("task_assignments.json", "taskId", task_id, readonly=True)
+             if not ta.get("deleted")]
+  history.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
   
-  for task in tasks:
-    if task.get("id") == task_id and not task.get("deleted"):
-      # Tüm aktif atamaları bul (çoklu atama desteği)
-      current_assignments = []
-      for ta in task_assignments:
-        if (ta.get("taskId") == task_id and 
-            not ta.get("deleted") and
-            ta.get("active", True)):
-          current_assignments.append(ta)
-      
-      # Assignment history (tümü, active/passive)
-      history = [ta for ta in task_assignments 
-                 if ta.get("taskId") == task_id and not ta.get("deleted")]
-      history.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
-      
-      # Backward compatibility: currentAssignment (ilk aktif atama)
-      current_assignment = current_assignments[0] if current_assignments else None
-      
-      # Assignee bilgilerini ekle
-      assigneeNames = []
-      for ca in current_assignments:
-        if ca.get("assigneeType") == "personnel":
-          person = personnel_map.get(ca.get("assigneeId"))
-          if person:
-            assigneeNames.append(f"{person.get('ad')} {person.get('soyad')}")
-        elif ca.get("assigneeType") == "team":
-          team = teams_map.get(ca.get("assigneeId"))
-          if team:
-            assigneeNames.append(f"👥 {team.get('ad')}")
-      
-      result = {
-        **task,
-        "currentAssignment": current_assignment,  # Backward compatibility
-        "currentAssignments": current_assignments,  # Tüm aktif atamalar
-        "assigneeNames": assigneeNames,  # Atanan kişi/ekip isimleri
-        "assignmentHistory": history
-      }
-      return result
+  # Backward compatibility: currentAssignment (ilk aktif atama)
+  current_assignment = current_assignments[0] if current_assignments else None
   
-  raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  result = {
+    **task,
+    "currentAssignment": current_assignment,  # Backward compatibility
+    "currentAssignments": current_assignments,  # Tüm aktif atamalar
+    "assigneeNames": _assignee_names(current_assignments),  # Atanan kişi/ekip isimleri
+    "assignmentHistory": history
+  }
+  return result
 
 
 @router.post("/", status_code=201)
@@ -176,6 +201,18 @@ def create_task(payload: TaskIn, createdBy: Optional[str] = None):
   return new_item
 
 
+def _update_task(task_id: str, fields: dict) -> dict:
+  """Görevi id indeksiyle bulup yazıcı sırasında güncelle; koleksiyon taranmaz"""
+  def apply(task):
+    task.update(fields)
+    task["updatedAt"] = datetime.now().isoformat()
+
+  task = update_record("tasks.json", task_id, apply)
+  if task is None:
+    raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  return task
+
+
 @router.put("/{task_id}")
 def update_task(task_id: str, payload: TaskIn):
   # Tarih validasyonu
@@ -188,22 +225,14 @@ def update_task(task_id: str, payload: TaskIn):
     except ValueError:
       raise HTTPException(status_code=400, detail="Geçersiz tarih formatı")
   
-  tasks = load_json("tasks.json")
-  for idx, item in enumerate(tasks):
-    if item.get("id") == task_id:
-      tasks[idx] = {
-        **item,
-        "baslik": payload.baslik,
-        "aciklama": payload.aciklama,
-        "oncelik": payload.oncelik,
-        "durum": payload.durum,
-        "baslangicTarihi": payload.baslangicTarihi,
-        "bitisTarihi": payload.bitisTarihi,
-        "updatedAt": datetime.now().isoformat(),
-      }
-      save_json("tasks.json", tasks)
-      return tasks[idx]
-  raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  return _update_task(task_id, {
+    "baslik": payload.baslik,
+    "aciklama": payload.aciklama,
+    "oncelik": payload.oncelik,
+    "durum": payload.durum,
+    "baslangicTarihi": payload.baslangicTarihi,
+    "bitisTarihi": payload.bitisTarihi,
+  })
 
 
 @router.patch("/{task_id}/durum")
@@ -212,32 +241,13 @@ def update_task_status(task_id: str, durum: str):
   if durum not in valid_statuses:
     raise HTTPException(status_code=400, detail=f"Geçersiz durum. Geçerli değerler: {valid_statuses}")
   
-  tasks = load_json("tasks.json")
-  for idx, item in enumerate(tasks):
-    if item.get("id") == task_id:
-      tasks[idx] = {
-        **item,
-        "durum": durum,
-        "updatedAt": datetime.now().isoformat(),
-      }
-      save_json("tasks.json", tasks)
-      return tasks[idx]
-  raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  return _update_task(task_id, {"durum": durum})
 
 
 @router.delete("/{task_id}")
 def soft_delete_task(task_id: str):
-  tasks = load_json("tasks.json")
-  for idx, item in enumerate(tasks):
-    if item.get("id") == task_id:
-      tasks[idx] = {
-        **item,
-        "deleted": True,
-        "updatedAt": datetime.now().isoformat(),
-      }
-      save_json("tasks.json", tasks)
-      return {"id": task_id, "deleted": True}
-  raise HTTPException(status_code=404, detail="Görev bulunamadı")
+  _update_task(task_id, {"deleted": True})
+  return {"id": task_id, "deleted": True}
 
 
 class TaskAssignmentIn(BaseModel):
@@ -249,33 +259,24 @@ class TaskAssignmentIn(BaseModel):
 @router.post("/{task_id}/assign")
 def assign_task(task_id: str, payload: TaskAssignmentIn, assignedBy: Optional[str] = None):
   # Görev var mı kontrol et
-  tasks = load_json("tasks.json")
-  task_exists = any(t.get("id") == task_id for t in tasks if not t.get("deleted"))
-  if not task_exists:
+  task = get_record("tasks.json", task_id, readonly=True)
+  if not task or task.get("deleted"):
     raise HTTPException(status_code=404, detail="Görev bulunamadı")
   
   # Assignee var mı kontrol et
   if payload.assigneeType == "personnel":
-    personnel = load_json("personnel.json")
-    assignee_exists = any(p.get("id") == payload.assigneeId for p in personnel if not p.get("deleted"))
-    if not assignee_exists:
+    person = get_record("personnel.json", payload.assigneeId, readonly=True)
+    if not person or person.get("deleted"):
       raise HTTPException(status_code=404, detail="Personel bulunamadı")
   elif payload.assigneeType == "team":
-    teams = load_json("teams.json")
-    assignee_exists = any(t.get("id") == payload.assigneeId for t in teams if not t.get("deleted"))
-    if not assignee_exists:
+    team = get_record("teams.json", payload.assigneeId, readonly=True)
+    if not team or team.get("deleted"):
       raise HTTPException(status_code=404, detail="Ekip bulunamadı")
   
-  task_assignments = load_json("task_assignments.json")
-  
   # Duplicate kontrolü: Aynı atama zaten var mı?
-  for ta in task_assignments:
-    if (ta.get("taskId") == task_id and 
-        ta.get("assigneeType") == payload.assigneeType and
-        ta.get("assigneeId") == payload.assigneeId and
-        ta.get("active", True) and
-        not ta.get("deleted")):
-      raise HTTPException(status_code=409, detail="Bu atama zaten mevcut")
+  active = find_records("task_assignments.json", "activeAssignee", (payload.assigneeType, payload.assigneeId), readonly=True)
+  if any(ta.get("taskId") == task_id for ta in active):
+    raise HTTPException(status_code=409, detail="Bu atama zaten mevcut")
   
   # Çoklu atama destekleniyor - eski atamayı pasif yapmıyoruz
   # Yeni atama oluştur
@@ -293,24 +294,18 @@ def assign_task(task_id: str, payload: TaskAssignmentIn, assignedBy: Optional[st
     "createdAt": now,
     "deleted": False,
   }
-  task_assignments.append(new_assignment)
-  save_json("task_assignments.json", task_assignments)
+  upsert_record("task_assignments.json", new_assignment)
   return new_assignment
 
 
 @router.delete("/{task_id}/assign")
 def unassign_task(task_id: str):
-  task_assignments = load_json("task_assignments.json")
-  found = False
-  for ta_idx, ta in enumerate(task_assignments):
-    if ta.get("taskId") == task_id and ta.get("active", True) and not ta.get("deleted"):
-      task_assignments[ta_idx] = {
-        **ta,
-        "active": False,
-        "endedAt": datetime.now().isoformat(),
-      }
-      found = True
-  if found:
-    save_json("task_assignments.json", task_assignments)
-    return {"taskId": task_id, "unassigned": True}
-  raise HTTPException(status_code=404, detail="Aktif atama bulunamadı")
\ No newline at end of file
+  with transaction("task_assignments.json") as tx:
+    active = tx.find("task_assignments.json", "activeTaskId", task_id)
+    if not active:
+      raise HTTPException(status_code=404, detail="Aktif atama bulunamadı")
+    now = datetime.now().isoformat()
+    for ta in active:
+      ta["active"] = False
+      ta["endedAt"] = now
+  return {"taskId": task_id, "unassigned": True}
\ No newline at end of file
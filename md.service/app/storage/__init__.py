@@ -0,0 +1,8 @@
+"""
+Depolama backend'leri. Backend seçimi data_loader.get_backend() üzerinden
+DATA_BACKEND ortam değişkeni ile yapılır (json | sqlite | journal).
+"""
+from .base import Change, StorageBackend
+from .json_backend import JsonFileBackend
+
+__all__ = ["Change", "StorageBackend", "JsonFileBackend"]
@@ -0,0 +1,41 @@
+"""
+Depolama backend arayüzü.
+Her koleksiyon data_loader API'sindeki dosya adıyla (ör. "jobs.json") adreslenir.
+"""
+from typing import Any, Hashable, NamedTuple
+
+
+class Change(NamedTuple):
+  """Bir koleksiyonun yeni hâli ve (biliniyorsa) kayıt seviyesindeki işlemleri"""
+  data: Any
+  ops: list[tuple] | None = None
+
+
+class StorageBackend:
+  """Koleksiyon bazlı kalıcı depolama arayüzü"""
+  name = "base"
+  # True ise commit, Change.ops varken koleksiyonun tamamını yazmaz
+  record_level = False
+
+  def signature(self, collection: str) -> Hashable:
+    """
+    Koleksiyonun değişim imzası. İmza değişmediyse içerik de değişmemiştir.
+    Koleksiyon yoksa FileNotFoundError fırlatır.
+    """
+    raise NotImplementedError
+
+  def read(self, collection: str) -> Any:
+    raise NotImplementedError
+
+  def write(self, collection: str, data: Any) -> None:
+    """Koleksiyonun tamamını değiştir"""
+    raise NotImplementedError
+
+  def commit(self, changes: dict[str, Change], durable: bool = False) -> None:
+    """
+    Birden fazla koleksiyonu birlikte yaz. Alt sınıflar bunu atomik yapmalı;
+    varsayılan uygulama koleksiyonları sırayla yazar.
+    durable=True ise commit dönmeden önce veri diske sabitlenmelidir (fsync).
+    """
+    for collection, change in changes.items():
+      self.write(collection, change.data)
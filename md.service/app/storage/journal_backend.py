@@ -0,0 +1,351 @@
+"""
+Log-structured backend (DATA_BACKEND=journal).
+
+Her koleksiyon iki parçadan oluşur: md.data altındaki JSON dosyası (snapshot)
+ve .journal/<ad>.jsonl altındaki append-only journal. Commit'ler koleksiyonu
+yeniden yazmaz; kayıt seviyesindeki işlemler (Change.ops) journal'a birer satır
+olarak eklenir, yani yazım maliyeti kaydın boyutuyla orantılıdır. Koleksiyonun
+güncel hâli snapshot + journal yeniden oynatılarak elde edilir.
+
+Arka plandaki compactor journal'ı belirli aralıklarla yeni bir snapshot'a katlar
+ve journal'ı sıfırlar. Snapshot'lar düz JSON dosyaları olduğundan mevcut md.data
+bu modda doğrudan kullanılabilir; json backend'ine geri dönmeden önce journal'lar
+katlanmalıdır:
+  python -m app.storage.journal_backend
+
+Birden fazla koleksiyonu değiştiren commit'ler önce .journal/_txn.jsonl'e tek
+kayıt olarak yazılır (tek fsync); süreç koleksiyon journal'ları yazılırken çökerse
+eksik satırlar sonraki açılışta tamamlanır.
+
+Journal işlemleri idempotent'tir (insert/update kaydın tamamını taşır), bu yüzden
+compaction sırasında çökme sonrası aynı satırların yeni snapshot üzerinde tekrar
+oynatılması sonucu değiştirmez.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterator
+
+from .base import Change, StorageBackend
+from .json_backend import JsonFileBackend, _dumps
+from .records import is_record_list
+
+JOURNAL_DIR = ".journal"
+TXN_NAME = "_txn.jsonl"
+# Bu boyutu aşan txn kaydı koleksiyon journal'ları fsync edilip sıfırlanır
+CHECKPOINT_BYTES = 1024 * 1024
+# Journal hem bu boyutu hem de snapshot boyutunun COMPACT_RATIO katını aşınca katlanır
+COMPACT_MIN_BYTES = 64 * 1024
+COMPACT_RATIO = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+def _entry(op: tuple) -> dict:
+  if op[0] == "insert":
+    return {"op": "insert", "record": op[1], "prepend": op[2]}
+  if op[0] == "update":
+    return {"op": "update", "record": op[1]}
+  return {"op": "delete", "id": op[1]}
+
+
+def _line(entry: dict) -> bytes:
+  return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _size(path: Path) -> int:
+  try:
+    return path.stat().st_size
+  except FileNotFoundError:
+    return 0
+
+
+class _Replay:
+  """Snapshot üzerine journal işlemlerini uygular; kayıt listelerinde id ile O(1)."""
+
+  def __init__(self, data: Any):
+    self.reset(data)
+
+  def reset(self, data: Any) -> None:
+    if data is None:
+      data = []
+    if is_record_list(data):
+      # Başa eklenenler ayrı tutulur; sonuçta ters sırayla listenin başına gelir
+      self.front: dict[str, dict] | None = {}
+      self.body: dict[str, dict] | None = {r["id"]: r for r in data}
+      self.raw = None
+    else:
+      self.front = self.body = None
+      self.raw = data
+
+  def apply(self, entry: dict) -> None:
+    op = entry["op"]
+    if op == "replace":
+      self.reset(entry["data"])
+      return
+    if self.body is None:
+      raise ValueError(f"Kayıt işlemi kayıt listesi olmayan koleksiyona uygulanamaz: {op}")
+    if op == "delete":
+      if self.front.pop(entry["id"], None) is None:
+        self.body.pop(entry["id"], None)
+      return
+    record = entry["record"]
+    record_id = record["id"]
+    if record_id in self.front:
+      self.front[record_id] = record
+    elif record_id in self.body or not entry.get("prepend"):
+      self.body[record_id] = record
+    else:
+      self.front[record_id] = record
+
+  def result(self) -> Any:
+    if self.body is None:
+      return self.raw
+    return [*reversed(self.front.values()), *self.body.values()]
+
+
+class JournalBackend(StorageBackend):
+  name = "journal"
+  record_level = True
+
+  def __init__(self, data_dir: Path, compact_interval: float = 30.0):
+    self.data_dir = Path(data_dir)
+    self.journal_dir = self.data_dir / JOURNAL_DIR
+    self.txn_path = self.journal_dir / TXN_NAME
+    self.journal_dir.mkdir(parents=True, exist_ok=True)
+    self._snapshots = JsonFileBackend(self.data_dir)
+    self._lock = threading.RLock()
+    self._compact_lock = threading.Lock()
+    # Açık append handle'ları: koleksiyon -> dosya
+    self._files: dict[str, Any] = {}
+    # Compaction içeriği değiştirmez ama dosya imzasını değiştirir: koleksiyon ->
+    # (compaction sonrası imza, öncesi imza). Böylece cache'ler katlamayı dışarıdan
+    # yapılmış bir değişiklik sanıp sürümü ve değişiklik günlüğünü sıfırlamaz.
+    self._aliases: dict[str, tuple[tuple, tuple]] = {}
+    self._recover()
+    self._compactor = None
+    if compact_interval > 0:
+      self._compactor = threading.Thread(
+        target=self._compact_loop, args=(compact_interval,), name="journal-compactor", daemon=True
+      )
+      self._compactor.start()
+
+  def journal_path(self, collection: str) -> Path:
+    return self.journal_dir / f"{Path(collection).stem}.jsonl"
+
+  def signature(self, collection: str) -> tuple[int, int, int]:
+    # Kilit: snapshot ile journal'ın yer değiştirdiği ara an görülmesin
+    with self._lock:
+      raw = self._raw_signature(collection)
+      alias = self._aliases.get(collection)
+    if alias is not None and alias[0] == raw:
+      return alias[1]
+    return raw
+
+  def _raw_signature(self, collection: str) -> tuple[int, int, int]:
+    snapshot = self._snapshots.path(collection)
+    try:
+      st = snapshot.stat()
+      snap_sig = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+      snap_sig = (0, 0)
+    journal_size = _size(self.journal_path(collection))
+    if snap_sig == (0, 0) and journal_size == 0:
+      raise FileNotFoundError(f"Data file not found: {snapshot}")
+    return (*snap_sig, journal_size)
+
+  def _entries(self, collection: str, upto: int | None = None) -> Iterator[dict]:
+    try:
+      with self.journal_path(collection).open("rb") as f:
+        raw = f.read() if upto is None else f.read(upto)
+    except FileNotFoundError:
+      return
+    for line in raw.splitlines():
+      if not line.strip():
+        continue
+      try:
+        yield json.loads(line)
+      except json.JSONDecodeError:
+        break  # Yarım yazılmış son satır
+
+  def _replay(self, collection: str, upto: int | None = None) -> Any:
+    try:
+      data = self._snapshots.read(collection)
+    except FileNotFoundError:
+      data = None
+    state = _Replay(data)
+    for entry in self._entries(collection, upto):
+      state.apply(entry)
+    return state.result()
+
+  def read(self, collection: str) -> Any:
+    with self._lock:
+      self.signature(collection)  # Koleksiyon yoksa FileNotFoundError
+      return self._replay(collection)
+
+  def _append(self, collection: str, lines: list[bytes], fsync: bool) -> None:
+    f = self._files.get(collection)
+    if f is None:
+      f = self._files[collection] = self.journal_path(collection).open("ab")
+    f.write(b"".join(lines))
+    f.flush()
+    if fsync:
+      os.fsync(f.fileno())
+
+  def _lines(self, change: Change, tx: str | None = None) -> list[bytes]:
+    if change.ops is None:
+      entries = [{"op": "replace", "data": change.data}]
+    else:
+      entries = [_entry(op) for op in change.ops]
+    if tx is not None:
+      for entry in entries:
+        entry["tx"] = tx
+    return [_line(entry) for entry in entries]
+
+  def write(self, collection: str, data: Any) -> None:
+    self.commit({collection: Change(data)})
+
+  def commit(self, changes: dict[str, Change], durable: bool = False) -> None:
+    if len(changes) <= 1:
+      for collection, change in changes.items():
+        lines = self._lines(change)
+        with self._lock:
+          self._append(collection, lines, fsync=durable)
+      return
+
+    tx = uuid.uuid4().hex
+    payload = {collection: self._lines(change, tx) for collection, change in changes.items()}
+    record = _line({"tx": tx, "lines": {c: b"".join(lines).decode("utf-8") for c, lines in payload.items()}})
+    with self._lock:
+      # Tek kayıt + tek fsync: commit bu noktada kalıcıdır
+      with self.txn_path.open("ab") as f:
+        f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+      for collection, lines in payload.items():
+        self._append(collection, lines, fsync=False)
+      if _size(self.txn_path) > CHECKPOINT_BYTES:
+        self._checkpoint()
+
+  def _checkpoint(self) -> None:
+    """Koleksiyon journal'larını diske sabitle ve txn kaydını sıfırla"""
+    for f in self._files.values():
+      os.fsync(f.fileno())
+    with self.txn_path.open("wb") as f:
+      f.flush()
+      os.fsync(f.fileno())
+
+  def _recover(self) -> None:
+    """Yarım satırları kırp, tamamlanmamış çoklu commit'leri journal'lara ekle"""
+    for path in self.journal_dir.glob("*.jsonl"):
+      raw = path.read_bytes()
+      if raw and not raw.endswith(b"\n"):
+        with path.open("r+b") as f:
+          f.truncate(raw.rfind(b"\n") + 1)
+
+    if _size(self.txn_path) == 0:
+      return
+    pending = []
+    for line in self.txn_path.read_bytes().splitlines():
+      try:
+        pending.append(json.loads(line))
+      except json.JSONDecodeError:
+        break  # Yarım kalan txn kaydı: commit hiç gerçekleşmemiş
+    for collection in {c for record in pending for c in record["lines"]}:
+      seen = {entry.get("tx") for entry in self._entries(collection)}
+      missing = [
+        record["lines"][collection].encode("utf-8")
+        for record in pending
+        if collection in record["lines"] and record["tx"] not in seen
+      ]
+      if missing:
+        self._append(collection, missing, fsync=False)
+    self._checkpoint()
+
+  # ---- Compaction ----
+
+  def needs_compaction(self, collection: str) -> bool:
+    journal_size = _size(self.journal_path(collection))
+    snapshot_size = _size(self._snapshots.path(collection))
+    return journal_size >= max(COMPACT_MIN_BYTES, snapshot_size * COMPACT_RATIO)
+
+  def compact(self, collection: str) -> bool:
+    """
+    Journal'ı yeni bir snapshot'a katla. Ağır kısım (replay + serileştirme)
+    kilit dışında yapılır; bu sırada gelen yazımlar yeni journal'a taşınır.
+    """
+    with self._compact_lock:
+      return self._compact(collection)
+
+  def _compact(self, collection: str) -> bool:
+    path = self.journal_path(collection)
+    with self._lock:
+      offset = _size(path)
+      if offset == 0:
+        return False
+      # Katlanacak satırlar tekrar oynatılmasın diye txn kaydı önce sıfırlanır
+      self._checkpoint()
+
+    data = self._replay(collection, upto=offset)
+    snapshot = self._snapshots.path(collection)
+    temp_snapshot = snapshot.with_suffix(snapshot.suffix + ".compact")
+    with temp_snapshot.open("w", encoding="utf-8") as f:
+      f.write(_dumps(data))
+      f.flush()
+      os.fsync(f.fileno())
+
+    with self._lock:
+      with path.open("rb") as f:
+        f.seek(offset)
+        tail = f.read()
+      temp_journal = path.with_suffix(".jsonl.tmp")
+      with temp_journal.open("wb") as f:
+        f.write(tail)
+        f.flush()
+        os.fsync(f.fileno())
+      handle = self._files.pop(collection, None)
+      if handle is not None:
+        handle.close()
+      before = self.signature(collection)
+      # Önce snapshot: arada çökülürse eski journal yeni snapshot üzerine
+      # tekrar oynatılır, sonuç değişmez
+      temp_snapshot.replace(snapshot)
+      temp_journal.replace(path)
+      self._aliases[collection] = (self._raw_signature(collection), before)
+    return True
+
+  def compact_all(self, force: bool = False) -> list[str]:
+    """Eşiği aşan (force=True ise boş olmayan tüm) journal'ları katla"""
+    compacted = []
+    for path in sorted(self.journal_dir.glob("*.jsonl")):
+      if path.name == TXN_NAME:
+        continue
+      collection = f"{path.stem}.json"
+      if (force or self.needs_compaction(collection)) and self.compact(collection):
+        compacted.append(collection)
+    return compacted
+
+  def _compact_loop(self, interval: float) -> None:
+    while True:
+      time.sleep(interval)
+      try:
+        self.compact_all()
+      except Exception:  # Compactor durmasın; bir sonraki turda tekrar denenir
+        logger.exception("journal compaction failed")
+
+
+def main() -> None:
+  from ..data_loader import get_data_dir
+
+  backend = JournalBackend(get_data_dir(), compact_interval=0)
+  for name in backend.compact_all(force=True):
+    print(f"{name}: katlandı")
+  print(f"-> {backend.data_dir}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,138 @@
+"""
+Varsayılan backend: md.data altındaki JSON dosyaları.
+
+Tek dosyalık yazımlar temp dosya + rename ile yapılır. Birden fazla dosyayı
+birlikte değiştiren commit'ler önce tüm yeni içerikleri tek bir kayıt olarak
+commit journal'ına (.txn.journal) ekler ve sadece journal'ı fsync eder; dosyalar
+ardından yerine yazılır. Süreç dosyalar yazılırken çökerse, sonraki açılışta
+journal yeniden oynatılır ve dosyalar birbiriyle tutarlı hâle gelir.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from .base import Change, StorageBackend
+
+JOURNAL_NAME = ".txn.journal"
+# Journal bu boyutu aşınca dosyalar fsync edilip journal sıfırlanır
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+
+def _dumps(data: Any) -> str:
+  return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _fsync_path(path: Path) -> None:
+  fd = os.open(path, os.O_RDWR)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+
+
+class JsonFileBackend(StorageBackend):
+  name = "json"
+
+  def __init__(self, data_dir: Path):
+    self.data_dir = Path(data_dir)
+    self.journal_path = self.data_dir / JOURNAL_NAME
+    self._lock = threading.RLock()
+    # Journal'da olup henüz fsync edilmemiş dosyalar
+    self._dirty: set[str] = set()
+    self._recover()
+
+  def path(self, collection: str) -> Path:
+    return self.data_dir / collection
+
+  def signature(self, collection: str) -> tuple[int, int]:
+    path = self.path(collection)
+    try:
+      st = path.stat()
+    except FileNotFoundError:
+      raise FileNotFoundError(f"Data file not found: {path}") from None
+    return (st.st_mtime_ns, st.st_size)
+
+  def read(self, collection: str) -> Any:
+    path = self.path(collection)
+    # Try different encodings
+    for encoding in ["utf-8", "utf-8-sig", "utf-16", "latin-1"]:
+      try:
+        with path.open(encoding=encoding) as f:
+          return json.load(f)
+      except (UnicodeDecodeError, json.JSONDecodeError):
+        continue
+
+    # If all encodings fail, raise error
+    raise ValueError(f"Cannot decode JSON file: {path}")
+
+  def _write_text(self, collection: str, text: str, fsync: bool = False) -> None:
+    self.data_dir.mkdir(parents=True, exist_ok=True)
+    path = self.path(collection)
+    # Atomic write: temp file + rename to prevent corruption
+    temp_path = path.with_suffix(path.suffix + '.tmp')
+    try:
+      with temp_path.open("w", encoding="utf-8") as f:
+        f.write(text)
+        if fsync:
+          f.flush()
+          os.fsync(f.fileno())
+      temp_path.replace(path)  # Atomic rename
+    except Exception:
+      if temp_path.exists():
+        temp_path.unlink()
+      raise
+
+  def write(self, collection: str, data: Any, fsync: bool = False) -> None:
+    with self._lock:
+      # Journal'daki eski içerik bu yazımın üzerine oynatılmasın
+      if collection in self._dirty:
+        self._checkpoint()
+      self._write_text(collection, _dumps(data), fsync=fsync)
+
+  def commit(self, changes: dict[str, Change], durable: bool = False) -> None:
+    if len(changes) <= 1:
+      for collection, change in changes.items():
+        self.write(collection, change.data, fsync=durable)
+      return
+
+    payload = {collection: _dumps(change.data) for collection, change in changes.items()}
+    with self._lock:
+      # Tek kayıt + tek fsync: commit bu noktada kalıcıdır
+      with self.journal_path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+      for collection, text in payload.items():
+        self._write_text(collection, text)
+      self._dirty.update(payload)
+      if self.journal_path.stat().st_size > CHECKPOINT_BYTES:
+        self._checkpoint()
+
+  def _checkpoint(self) -> None:
+    """Journal'daki dosyaları diske sabitle ve journal'ı sıfırla"""
+    for collection in self._dirty:
+      path = self.path(collection)
+      if path.exists():
+        _fsync_path(path)
+    self._dirty.clear()
+    with self.journal_path.open("w", encoding="utf-8") as f:
+      f.flush()
+      os.fsync(f.fileno())
+
+  def _recover(self) -> None:
+    """Yarım kalmış commit'leri journal'dan yeniden oynat"""
+    if not self.journal_path.exists() or self.journal_path.stat().st_size == 0:
+      return
+    latest: dict[str, str] = {}
+    with self.journal_path.open(encoding="utf-8") as f:
+      for line in f:
+        try:
+          latest.update(json.loads(line))
+        except json.JSONDecodeError:
+          break  # Yarım yazılmış son kayıt: commit tamamlanmamış
+    for collection, text in latest.items():
+      self._write_text(collection, text)
+    self._dirty.update(latest)
+    self._checkpoint()
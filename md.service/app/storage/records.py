@@ -0,0 +1,303 @@
+"""
+Kayıt listeleri için yardımcılar: koleksiyonun iki hâli arasındaki farkı
+kayıt seviyesindeki işlemlere (insert/update/delete) çevirir.
+
+İşlem biçimleri:
+  ("insert", record, prepend)   prepend=True -> listenin başına
+  ("update", record)
+  ("delete", record_id)
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Hashable, Iterable, NamedTuple
+
+from .text import TextIndex
+
+
+def is_record_list(data: Any) -> bool:
+  """Liste, id'li ve id'leri benzersiz dict'lerden mi oluşuyor?"""
+  if not isinstance(data, list):
+    return False
+  seen = set()
+  for record in data:
+    if not isinstance(record, dict):
+      return False
+    record_id = record.get("id")
+    if not isinstance(record_id, str) or record_id in seen:
+      return False
+    seen.add(record_id)
+  return True
+
+
+def diff_records(old: Any, new: Any) -> list[tuple] | None:
+  """
+  old -> new geçişini kayıt işlemlerine çevir.
+  Yeni kayıtlar sadece listenin başına veya sonuna eklenmişse ve kalan
+  kayıtların sırası değişmemişse işlem listesi döner; aksi halde None
+  (koleksiyon bütün olarak yazılmalı).
+  """
+  if not (is_record_list(old) and is_record_list(new)):
+    return None
+
+  old_by_id = {r["id"]: r for r in old}
+  new_ids = {r["id"] for r in new}
+
+  start, end = 0, len(new)
+  while start < end and new[start]["id"] not in old_by_id:
+    start += 1
+  while end > start and new[end - 1]["id"] not in old_by_id:
+    end -= 1
+  middle = new[start:end]
+  survivors = [r["id"] for r in old if r["id"] in new_ids]
+  if [r["id"] for r in middle] != survivors:
+    return None
+
+  ops: list[tuple] = [("delete", rid) for rid in old_by_id if rid not in new_ids]
+  ops += [("update", r) for r in middle if r != old_by_id[r["id"]]]
+  # Baştaki yeni kayıtlar tersten eklenir ki sıraları korunsun
+  ops += [("insert", r, True) for r in reversed(new[:start])]
+  ops += [("insert", r, False) for r in new[end:]]
+  return ops
+
+
+# İkincil indeks tanımı: kayıttan indeks değerlerini üreten fonksiyon.
+# Bir kayıt birden fazla değerle indekslenebilir (ör. siparişin tüm kalem kodları).
+IndexKey = Callable[[dict], Iterable[Hashable]]
+
+
+def field_key(field: str | tuple[str, ...]) -> IndexKey:
+  """
+  Alan adından indeks fonksiyonu. Tuple verilirse bileşik indeks olur ve değer
+  alanların tuple'ıdır (ör. ("productCode", "colorCode") -> ("P01", "RAL9016")).
+  """
+  if isinstance(field, str):
+    return lambda record: (record.get(field),)
+  return lambda record: (tuple(record.get(f) for f in field),)
+
+
+class _View(NamedTuple):
+  """Okuyucuların gördüğü indeks hâli; advance() yenisini kurup tek atamayla yayınlar"""
+  records: dict[str, dict]
+  positions: dict[str, int]
+  offset: int
+  # Silinmiş kayıtların mutlak konumları (sıralı)
+  holes: list[int]
+  by: dict[Hashable, dict[Hashable, frozenset]]
+  sorted: dict[str, list[tuple[str, str]]]
+
+
+class RecordIndex:
+  """
+  Kayıt listesi için id -> kayıt ve id -> konum indeksi, ayrıca istenen
+  ikincil indeksler (ad -> değer -> id kümesi), önek sorguları için
+  sıralı indeksler (alan -> [(değer, id)] sıralı dizi) ve metin araması için
+  trigram indeksleri (ad -> TextIndex; kurulumu pahalı olduğundan ilk aramada kurulur).
+  Konumlar mutlak tutulur (liste başı = offset), böylece başa ve sona eklemeler
+  diğer kayıtların konumlarını değiştirmeden işlenir; silinen konumlar sıralı
+  bir boşluk listesinde tutulur ve göreli konum hesabında düşülür. Aynı id birden fazla kez
+  geçiyorsa doğrusal aramada olduğu gibi ilk kayıt esas alınır.
+
+  Sorgular kilit almaz: her sorgu tek bir _View okur, advance() değişen yapıları
+  kopyalayıp yeni _View'i tek atamayla yayınlar (copy-on-write).
+  """
+
+  def __init__(
+    self,
+    data: list,
+    keys: dict[Hashable, IndexKey] | None = None,
+    sorted_fields: tuple[str, ...] = (),
+    text_fields: dict[str, tuple[str, ...]] | None = None,
+  ):
+    self.data = data
+    self.keys = dict(keys or {})
+    self.sorted_fields = tuple(sorted_fields)
+    records: dict[str, dict] = {}
+    positions: dict[str, int] = {}
+    self.end = len(data)
+    groups: dict[Hashable, dict[Hashable, set]] = {name: {} for name in self.keys}
+    for pos, record in enumerate(data):
+      if isinstance(record, dict):
+        record_id = record.get("id")
+        if record_id is not None and record_id not in records:
+          records[record_id] = record
+          positions[record_id] = pos
+          for name, key in self.keys.items():
+            for value in _values(key, record):
+              groups[name].setdefault(value, set()).add(record_id)
+    by = {
+      name: {value: frozenset(ids) for value, ids in values.items()}
+      for name, values in groups.items()
+    }
+    sorted_entries = {
+      field: sorted(
+        (record[field], record_id)
+        for record_id, record in records.items()
+        if isinstance(record.get(field), str)
+      )
+      for field in self.sorted_fields
+    }
+    self._view = _View(records, positions, 0, [], by, sorted_entries)
+    self.text_fields = {name: tuple(fields) for name, fields in (text_fields or {}).items()}
+    self.text: dict[str, TextIndex] = {}
+    # Metin indeksinin kurulumu ile advance() birbirini beklemeli
+    self._text_lock = threading.Lock()
+
+  @property
+  def records(self) -> dict[str, dict]:
+    return self._view.records
+
+  def get(self, record_id: str) -> dict | None:
+    return self._view.records.get(record_id)
+
+  def position(self, record_id: str) -> int | None:
+    view = self._view
+    pos = view.positions.get(record_id)
+    if pos is None:
+      return None
+    return pos - view.offset - bisect_left(view.holes, pos)
+
+  def find(self, name: Hashable, value: Hashable) -> list[dict]:
+    """İndeks değeri value olan kayıtlar, listedeki sırayla; maliyet eşleşme sayısıyla orantılı"""
+    view = self._view
+    ids = view.by[name].get(value, ()) if _indexable(value) else ()
+    return [view.records[i] for i in sorted(ids, key=view.positions.__getitem__)]
+
+  def prefix(self, field: str, prefix: str, limit: int | None = None) -> list[dict]:
+    """
+    field değeri prefix ile başlayan kayıtlar, değere (sonra id'ye) göre sıralı.
+    İkili arama + eşleşmeler: O(log n + k).
+    """
+    view = self._view
+    entries = view.sorted[field]
+    result = []
+    i = bisect_left(entries, (prefix,))
+    while i < len(entries) and (limit is None or len(result) < limit):
+      value, record_id = entries[i]
+      if not value.startswith(prefix):
+        break
+      result.append(view.records[record_id])
+      i += 1
+    return result
+
+  def search(self, name: str, query: str, limit: int | None = None) -> list[dict]:
+    """Metin indeksinde puanlı arama; en iyi eşleşme önce"""
+    text = self.text.get(name)
+    if text is None:
+      with self._text_lock:
+        text = self.text.get(name)
+        if text is None:
+          text = self.text[name] = TextIndex(self.text_fields[name], self._view.records.items())
+    records = self._view.records
+    return [records[record_id] for _, record_id in text.search(query, limit)]
+
+  @staticmethod
+  def _resort(
+    sorted_fields: tuple[str, ...],
+    entries_by_field: dict[str, list[tuple[str, str]]],
+    record_id: str,
+    old: dict | None,
+    new: dict | None,
+    copied: set,
+  ) -> None:
+    for field in sorted_fields:
+      old_value = old.get(field) if old is not None else None
+      new_value = new.get(field) if new is not None else None
+      if old is not None and new is not None and old_value == new_value:
+        continue
+      # İlk değişiklikte kopyalanır; okuyucular ellerindeki diziyi güvenle dolaşır
+      entries = entries_by_field[field]
+      if field not in copied:
+        entries = list(entries)
+        copied.add(field)
+      if isinstance(old_value, str):
+        i = bisect_left(entries, (old_value, record_id))
+        if i < len(entries) and entries[i] == (old_value, record_id):
+          del entries[i]
+      if isinstance(new_value, str):
+        insort(entries, (new_value, record_id))
+      entries_by_field[field] = entries
+
+  def _reindex(self, by: dict, record_id: str, old: dict | None, new: dict | None, copied: set) -> None:
+    # Kümeler değiştirilmez, yenisiyle değiştirilir; değer sözlüğü ilk değişiklikte kopyalanır
+    for name, key in self.keys.items():
+      old_values = _values(key, old) if old is not None else set()
+      new_values = _values(key, new) if new is not None else set()
+      if old_values == new_values:
+        continue
+      if name not in copied:
+        by[name] = dict(by[name])
+        copied.add(name)
+      values = by[name]
+      for value in old_values - new_values:
+        remaining = values.get(value, frozenset()) - {record_id}
+        if remaining:
+          values[value] = remaining
+        else:
+          values.pop(value, None)
+      for value in new_values - old_values:
+        values[value] = values.get(value, frozenset()) | {record_id}
+
+  def advance(self, data: list, ops: list[tuple]) -> bool:
+    """
+    İndeksi, ops uygulanarak elde edilmiş yeni listeye taşı. Değişen yapıların
+    kopyaları güncellenip tek atamayla yayınlanır; eşzamanlı sorgular ya eski ya
+    yeni hâli görür. Kayıt bulunamayan bir silme gelirse False döner (indeks
+    değişmez, yeniden kurulmalı).
+    """
+    with self._text_lock:
+      return self._advance(data, ops)
+
+  def _advance(self, data: list, ops: list[tuple]) -> bool:
+    view = self._view
+    records = dict(view.records)
+    positions = dict(view.positions)
+    holes = list(view.holes)
+    by = dict(view.by)
+    entries_by_field = dict(view.sorted)
+    offset, end = view.offset, self.end
+    copied_keys: set = set()
+    copied_fields: set = set()
+    changes: list[tuple[str, dict | None]] = []
+    for op in ops:
+      if op[0] == "delete":
+        record_id = op[1]
+        old = records.pop(record_id, None)
+        if old is None:
+          return False
+        insort(holes, positions.pop(record_id))
+        self._reindex(by, record_id, old, None, copied_keys)
+        self._resort(self.sorted_fields, entries_by_field, record_id, old, None, copied_fields)
+        changes.append((record_id, None))
+        continue
+      record = op[1]
+      record_id = record["id"]
+      old = records.get(record_id)
+      if old is None:
+        if op[0] == "insert" and op[2]:
+          offset -= 1
+          positions[record_id] = offset
+        else:
+          positions[record_id] = end
+          end += 1
+      records[record_id] = record
+      self._reindex(by, record_id, old, record, copied_keys)
+      self._resort(self.sorted_fields, entries_by_field, record_id, old, record, copied_fields)
+      changes.append((record_id, record))
+    self._view = _View(records, positions, offset, holes, by, entries_by_field)
+    self.end = end
+    self.data = data
+    for text in self.text.values():
+      for record_id, record in changes:
+        text.update(record_id, record)
+    return True
+
+
+def _indexable(value: Any) -> bool:
+  """None içermeyen skaler veya skalerlerden oluşan tuple (bileşik anahtar)"""
+  if isinstance(value, tuple):
+    return bool(value) and all(_indexable(v) for v in value)
+  return value is not None and isinstance(value, (str, int, float, bool))
+
+
+def _values(key: IndexKey, record: dict) -> set:
+  return {value for value in key(record) if _indexable(value)}
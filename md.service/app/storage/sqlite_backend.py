@@ -0,0 +1,212 @@
+"""
+SQLite backend (DATA_BACKEND=sqlite).
+
+Id'li kayıtlardan oluşan liste koleksiyonları (jobs, stockItems, tasks, ...)
+her kayıt bir satır olacak şekilde `records` tablosunda tutulur; commit'ler
+kayıt seviyesindeki işlemlerle (Change.ops) uygulandığından tek bir işin
+güncellenmesi tüm koleksiyonu yeniden yazmaz. Sözlük tipindeki
+dosyalar (settings, dashboard) tek parça halinde `collections.body` içinde
+saklanır. Veritabanı WAL modunda açılır.
+
+Mevcut md.data/*.json dosyalarını içeri aktarmak için:
+  python -m app.storage.sqlite_backend [--force]
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from .base import Change, StorageBackend
+from .records import is_record_list
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+  name TEXT PRIMARY KEY,
+  kind TEXT NOT NULL,
+  version INTEGER NOT NULL DEFAULT 0,
+  body TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+  collection TEXT NOT NULL,
+  id TEXT NOT NULL,
+  pos INTEGER NOT NULL,
+  body TEXT NOT NULL,
+  PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS records_pos ON records (collection, pos);
+"""
+
+KIND_RECORDS = "records"
+KIND_DOCUMENT = "document"
+
+
+def _dumps(value: Any) -> str:
+  return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqliteBackend(StorageBackend):
+  name = "sqlite"
+  record_level = True
+
+  def __init__(self, db_path: Path):
+    self.db_path = Path(db_path)
+    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+    self._local = threading.local()
+    self._conn().executescript(SCHEMA)
+
+  def _conn(self) -> sqlite3.Connection:
+    # sqlite3 bağlantıları thread'ler arasında paylaşılmaz; thread başına bir bağlantı
+    conn = getattr(self._local, "conn", None)
+    if conn is None:
+      conn = sqlite3.connect(str(self.db_path), isolation_level=None)
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute("PRAGMA synchronous=NORMAL")
+      conn.execute("PRAGMA busy_timeout=5000")
+      self._local.conn = conn
+    return conn
+
+  @contextmanager
+  def _tx(self):
+    conn = self._conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+      yield conn
+    except BaseException:
+      conn.execute("ROLLBACK")
+      raise
+    conn.execute("COMMIT")
+
+  def _meta(self, conn: sqlite3.Connection, collection: str):
+    return conn.execute(
+      "SELECT kind, version, body FROM collections WHERE name = ?", (collection,)
+    ).fetchone()
+
+  def _bump(self, conn: sqlite3.Connection, collection: str, kind: str, body: str | None = None) -> None:
+    conn.execute(
+      "INSERT INTO collections (name, kind, version, body) VALUES (?, ?, 1, ?) "
+      "ON CONFLICT(name) DO UPDATE SET kind = excluded.kind, body = excluded.body, "
+      "version = collections.version + 1",
+      (collection, kind, body),
+    )
+
+  def exists(self, collection: str) -> bool:
+    return self._meta(self._conn(), collection) is not None
+
+  def signature(self, collection: str) -> int:
+    row = self._conn().execute(
+      "SELECT version FROM collections WHERE name = ?", (collection,)
+    ).fetchone()
+    if row is None:
+      raise FileNotFoundError(f"Data collection not found: {collection} ({self.db_path})")
+    return row[0]
+
+  def read(self, collection: str) -> Any:
+    conn = self._conn()
+    meta = self._meta(conn, collection)
+    if meta is None:
+      raise FileNotFoundError(f"Data collection not found: {collection} ({self.db_path})")
+    kind, _, body = meta
+    if kind == KIND_DOCUMENT:
+      return json.loads(body)
+    rows = conn.execute(
+      "SELECT body FROM records WHERE collection = ? ORDER BY pos", (collection,)
+    )
+    return [json.loads(row[0]) for row in rows]
+
+  def _write(self, conn: sqlite3.Connection, collection: str, data: Any) -> None:
+    conn.execute("DELETE FROM records WHERE collection = ?", (collection,))
+    if is_record_list(data):
+      self._bump(conn, collection, KIND_RECORDS)
+      conn.executemany(
+        "INSERT INTO records (collection, id, pos, body) VALUES (?, ?, ?, ?)",
+        ((collection, r["id"], pos, _dumps(r)) for pos, r in enumerate(data)),
+      )
+    else:
+      self._bump(conn, collection, KIND_DOCUMENT, _dumps(data))
+
+  def write(self, collection: str, data: Any) -> None:
+    with self._tx() as conn:
+      self._write(conn, collection, data)
+
+  def _apply(self, conn: sqlite3.Connection, collection: str, ops: list[tuple]) -> None:
+    for op in ops:
+      if op[0] == "delete":
+        conn.execute("DELETE FROM records WHERE collection = ? AND id = ?", (collection, op[1]))
+        continue
+      record = op[1]
+      body = _dumps(record)
+      if op[0] == "update":
+        conn.execute(
+          "UPDATE records SET body = ? WHERE collection = ? AND id = ?",
+          (body, collection, record["id"]),
+        )
+        continue
+      edge = "MIN(pos) - 1" if op[2] else "MAX(pos) + 1"
+      (pos,) = conn.execute(
+        f"SELECT COALESCE({edge}, 0) FROM records WHERE collection = ?", (collection,)
+      ).fetchone()
+      conn.execute(
+        "INSERT INTO records (collection, id, pos, body) VALUES (?, ?, ?, ?)",
+        (collection, record["id"], pos, body),
+      )
+    self._bump(conn, collection, KIND_RECORDS)
+
+  def commit(self, changes: dict[str, Change], durable: bool = False) -> None:
+    # Tüm koleksiyonlar tek SQLite transaction'ında (tek WAL commit'i) yazılır
+    conn = self._conn()
+    if durable:
+      # synchronous=NORMAL'da WAL commit'leri fsync edilmez; bu commit için edilsin
+      conn.execute("PRAGMA synchronous=FULL")
+    try:
+      with self._tx() as conn:
+        for collection, change in changes.items():
+          meta = self._meta(conn, collection)
+          if change.ops is not None and meta is not None and meta[0] == KIND_RECORDS:
+            self._apply(conn, collection, change.ops)
+          else:
+            self._write(conn, collection, change.data)
+    finally:
+      if durable:
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+
+def import_json_dir(backend: SqliteBackend, data_dir: Path, force: bool = False) -> dict[str, int | None]:
+  """
+  data_dir altındaki tüm *.json dosyalarını SQLite'a aktar.
+  force=False ise veritabanında zaten bulunan koleksiyonlar atlanır.
+  Dönen sözlük: dosya adı -> aktarılan kayıt sayısı (atlananlar için None).
+  """
+  from .json_backend import JsonFileBackend
+
+  source = JsonFileBackend(data_dir)
+  result = {}
+  for path in sorted(Path(data_dir).glob("*.json")):
+    if not force and backend.exists(path.name):
+      result[path.name] = None
+      continue
+    data = source.read(path.name)
+    backend.write(path.name, data)
+    result[path.name] = len(data) if isinstance(data, list) else 1
+  return result
+
+
+def main() -> None:
+  import argparse
+
+  from ..data_loader import get_data_dir, get_sqlite_path
+
+  parser = argparse.ArgumentParser(description="md.data JSON dosyalarını SQLite'a aktar")
+  parser.add_argument("--force", action="store_true", help="Mevcut koleksiyonların üzerine yaz")
+  args = parser.parse_args()
+
+  db_path = get_sqlite_path()
+  result = import_json_dir(SqliteBackend(db_path), get_data_dir(), force=args.force)
+  for name, count in result.items():
+    print(f"{name}: {'atlandı (zaten var)' if count is None else count}")
+  print(f"-> {db_path}")
+
+
+if __name__ == "__main__":
+  main()
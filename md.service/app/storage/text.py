@@ -0,0 +1,165 @@
+"""
+Türkçe duyarlı metin araması için trigram (3-gram) ters indeksi.
+
+fold() metni arama biçimine getirir: Türkçe büyük/küçük harf kuralları
+(I/ı/İ/i hepsi "i") ve aksan sadeleştirme (ş->s, ğ->g, ç->c, ö->o, ü->u, ...).
+Böylece "ışık", "IŞIK" ve "isik" aynı şekilde aranır.
+
+TextIndex her kaydın katlanmış alan değerlerini ve trigram -> id kümesi
+eşlemesini tutar. Sorgu terimleri (boşlukla ayrılmış) kaydın herhangi bir
+alanında alt dize olarak geçmelidir; adaylar trigram kesişimiyle bulunur,
+sonra alt dize kontrolüyle doğrulanır ve puanlanır.
+"""
+import heapq
+import unicodedata
+from typing import Iterable
+
+# Kümeler değiştirilmez, yenisiyle değiştirilir: okuyucular kilitsiz dolaşabilir
+_EMPTY: frozenset = frozenset()
+# Sık geçen Türkçe harfler için hızlı yol; geri kalanı NFKD ile sadeleştirilir
+_TURKISH = str.maketrans({
+  "İ": "i", "I": "i", "ı": "i", "Ş": "s", "ş": "s", "Ğ": "g", "ğ": "g",
+  "Ç": "c", "ç": "c", "Ö": "o", "ö": "o", "Ü": "u", "ü": "u",
+})
+
+
+def fold(text: str) -> str:
+  """Türkçe duyarlı küçük harf + aksan sadeleştirme"""
+  if text.isascii():
+    return text.lower()
+  text = text.translate(_TURKISH).casefold()
+  if text.isascii():
+    return text
+  decomposed = unicodedata.normalize("NFKD", text)
+  return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(text: str) -> set[str]:
+  return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TextIndex:
+  """Kayıtların seçili alanları üzerinde trigram indeksi ve puanlı arama"""
+
+  def __init__(self, fields: tuple[str, ...], records: Iterable[tuple[str, dict]] = ()):
+    self.fields = fields
+    # id -> alanların katlanmış değerleri (alan sırasıyla)
+    self.docs: dict[str, tuple[str, ...]] = {}
+    # id -> alanların "\n" ile birleşimi; terimler boşluk içermediğinden eşleşme kontrolü tek `in`
+    self.joined: dict[str, str] = {}
+    self.grams: dict[str, frozenset] = {}
+    groups: dict[str, list] = {}
+    for record_id, record in records:
+      doc = self._doc(record)
+      self.docs[record_id] = doc
+      self.joined[record_id] = "\n".join(doc)
+      for gram in self._grams(doc):
+        ids = groups.get(gram)
+        if ids is None:
+          groups[gram] = [record_id]
+        else:
+          ids.append(record_id)
+    self.grams = {gram: frozenset(ids) for gram, ids in groups.items()}
+
+  def _doc(self, record: dict) -> tuple[str, ...]:
+    return tuple(fold(value) if isinstance(value := record.get(f), str) else "" for f in self.fields)
+
+  @staticmethod
+  def _grams(doc: tuple[str, ...]) -> set[str]:
+    return {value[i:i + 3] for value in doc for i in range(len(value) - 2)}
+
+  def update(self, record_id: str, record: dict | None) -> None:
+    """Kaydı yeniden indeksle; record=None kaydı indeksten çıkarır"""
+    old = self.docs.get(record_id)
+    new = self._doc(record) if record is not None else None
+    if old == new:
+      return
+    old_grams = self._grams(old) if old is not None else set()
+    new_grams = self._grams(new) if new is not None else set()
+    for gram in old_grams - new_grams:
+      remaining = self.grams.get(gram, _EMPTY) - {record_id}
+      if remaining:
+        self.grams[gram] = remaining
+      else:
+        self.grams.pop(gram, None)
+    for gram in new_grams - old_grams:
+      self.grams[gram] = self.grams.get(gram, _EMPTY) | {record_id}
+    if new is None:
+      self.docs.pop(record_id, None)
+      self.joined.pop(record_id, None)
+    else:
+      self.docs[record_id] = new
+      self.joined[record_id] = "\n".join(new)
+
+  def _candidates(self, terms: list[str]) -> Iterable[str]:
+    sets = []
+    for term in terms:
+      grams = trigrams(term)
+      if not grams:
+        continue  # 3 harften kısa terim: doğrulama aşamasında kontrol edilir
+      for gram in grams:
+        ids = self.grams.get(gram)
+        if not ids:
+          return ()
+        sets.append(ids)
+    if not sets:
+      # Tüm terimler kısa: katlanmış metinler üzerinde tarama
+      return list(self.docs)
+    sets.sort(key=len)
+    result = set(sets[0])
+    for ids in sets[1:]:
+      result &= ids
+      if not result:
+        break
+    return result
+
+  @staticmethod
+  def _score(doc: tuple[str, ...], terms: list[str], phrase: str) -> int:
+    score = 0
+    multi = len(terms) > 1
+    # Önce gelen alanlar (ör. ürün kodu) daha ağırlıklı
+    weight = len(doc)
+    for value in doc:
+      if phrase in value:
+        if value == phrase:
+          score += 100 * weight
+        elif value.startswith(phrase):
+          score += 20 * weight
+        elif f" {phrase}" in value:
+          score += 5 * weight
+        else:
+          score += weight
+      if multi:
+        for term in terms:
+          if value.startswith(term):
+            score += 4 * weight
+          elif f" {term}" in value:
+            score += 2 * weight
+          elif term in value:
+            score += weight
+      weight -= 1
+    return score
+
+  def search(self, query: str, limit: int | None = None) -> list[tuple[int, str]]:
+    """
+    (puan, id) listesi, puana göre azalan. Her terim kaydın en az bir alanında
+    geçmelidir; alan başı/kelime başı eşleşmeler ve tam eşleşme öne çıkar.
+    """
+    phrase = " ".join(fold(query).split())
+    terms = phrase.split()
+    if not terms:
+      return []
+    hits = []
+    docs, joined, score = self.docs, self.joined, self._score
+    for record_id in self._candidates(terms):
+      text = joined.get(record_id)
+      if text is None:
+        continue
+      for term in terms:
+        if term not in text:
+          break
+      else:
+        doc = docs[record_id]
+        hits.append((-score(doc, terms, phrase), doc, record_id))
+    hits = heapq.nsmallest(limit, hits) if limit else sorted(hits)
+    return [(-hit[0], hit[2]) for hit in hits]
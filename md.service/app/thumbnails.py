@@ -0,0 +1,116 @@
+"""
+Resim dökümanları için küçük önizlemeler (thumbnail).
+
+Yüklemeden sonra schedule() ile arka plandaki thread havuzunda sabit boyutlar
+(THUMBNAIL_SIZES) üretilir ve orijinalin yanına yazılır:
+  blobs/ab/<sha256>            -> blobs/ab/<sha256>.thumb-256.jpg
+  olcu/DOC-..._2026...png      -> olcu/DOC-..._2026...png.thumb-256.jpg
+Özellikten önce yüklenmiş resimlerin önizlemesi ilk istendiğinde üretilir.
+Pillow opsiyoneldir; kurulu değilse önizleme üretilmez (available() False).
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+try:
+  from PIL import Image, ImageOps  # opsiyonel
+except ImportError:  # pragma: no cover - kurulu değilse önizleme yok
+  Image = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = (128, 256, 512)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_QUALITY = 82
+IMAGE_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: dict[Path, Future] = {}
+_lock = threading.Lock()
+
+
+def available() -> bool:
+  return Image is not None
+
+
+def is_image(doc: dict) -> bool:
+  if doc.get("mimeType") in IMAGE_MIME_TYPES:
+    return True
+  name = doc.get("originalName") or doc.get("filename") or ""
+  return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_path(original: Path, size: int) -> Path:
+  return original.with_name(f"{original.name}.thumb-{size}.jpg")
+
+
+def thumbnail_paths(original: Path) -> list[Path]:
+  return [thumbnail_path(original, size) for size in THUMBNAIL_SIZES]
+
+
+def _generate(original: Path) -> None:
+  """Tüm boyutları üretir; büyükten küçüğe, her boyut bir öncekinden küçültülür"""
+  if all(p.exists() for p in thumbnail_paths(original)):
+    return
+  with Image.open(original) as img:
+    largest = max(THUMBNAIL_SIZES)
+    img.draft("RGB", (largest, largest))  # JPEG'de küçük ölçekte çözer
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+      img = img.convert("RGB")
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+      img.thumbnail((size, size), Image.LANCZOS)
+      target = thumbnail_path(original, size)
+      tmp = target.with_name(target.name + ".tmp")
+      img.save(tmp, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+      os.replace(tmp, target)
+
+
+def _run(original: Path) -> None:
+  try:
+    _generate(original)
+  except Exception as exc:
+    logger.warning("Önizleme üretilemedi: %s (%s)", original, exc)
+    raise
+  finally:
+    with _lock:
+      _pending.pop(original, None)
+
+
+def schedule(original: Path) -> Optional[Future]:
+  """Önizlemeleri arka planda üretir; aynı dosya için süren iş varsa onu döndürür"""
+  global _executor
+  if Image is None:
+    return None
+  with _lock:
+    future = _pending.get(original)
+    if future is None:
+      if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+      future = _pending[original] = _executor.submit(_run, original)
+    return future
+
+
+async def get_thumbnail(original: Path, size: int) -> Optional[Path]:
+  """Önizleme dosyası; yoksa üretilmesini bekler (tembel üretim). Üretilemezse None"""
+  target = thumbnail_path(original, size)
+  if target.exists():
+    return target
+  future = schedule(original)
+  if future is None:
+    return None
+  try:
+    await asyncio.wrap_future(future)
+  except Exception:
+    return None
+  return target if target.exists() else None
+
+
+def remove(original: Path) -> None:
+  for path in thumbnail_paths(original):
+    path.unlink(missing_ok=True)
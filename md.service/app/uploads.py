@@ -0,0 +1,445 @@
+"""
+Akışlı dosya yükleme yardımcıları.
+
+Multipart gövde event loop'ta parça parça ayrıştırılır; dosya baytları diske
+thread'de yazılır, boyut ve SHA-256 yazarken hesaplanır. Gövde hiçbir zaman
+tamamen belleğe alınmaz; üst sınır (UPLOAD_MAX_BYTES) aşılır aşılmaz
+yükleme 413 ile kesilir ve yarım dosya silinir.
+
+Büyük dosyalar için devam ettirilebilir yükleme: UploadSessionStore oturumları
+(dosya boyutu, parça boyutu, alınan parçalar) geçici klasörde JSON olarak tutar;
+parçalar önceden boyutlandırılmış .part dosyasına kendi ofsetlerine yazılır.
+Bağlantı koparsa istemci eksik parçaları sorup sadece onları gönderir.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import anyio
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+# Form alanları (jobId, açıklama...) küçük olmalı; bellekte tutulur
+MAX_FIELD_BYTES = 64 * 1024
+# Devam ettirilebilir yüklemede varsayılan parça boyutu ve sınırları
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MIN_CHUNK_BYTES = 256 * 1024
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+# Bu süre boyunca parça gelmeyen oturumlar silinir
+UPLOAD_SESSION_TTL_S = float(os.getenv("UPLOAD_SESSION_TTL_S", str(24 * 3600)))
+# Diske bundan küçük parçalar biriktirilip tek seferde yazılır (thread geçişi azalsın)
+WRITE_BUFFER_BYTES = 256 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+  return HTTPException(status_code=413, detail=f"Dosya çok büyük (en fazla {max_bytes // (1024 * 1024)} MB)")
+
+
+class FileSink:
+  """
+  Baytları bir dosyaya thread'de yazar; boyut ve sha256 akış sırasında tutulur.
+  max_bytes aşılırsa 413 fırlatır. Hata durumunda discard() ile dosya silinmelidir.
+  """
+
+  def __init__(self, path: Path, max_bytes: int = UPLOAD_MAX_BYTES, offset: Optional[int] = None):
+    # offset verilirse var olan dosyada o konumdan yazılır (dosya kesilmez)
+    self.path = path
+    self.max_bytes = max_bytes
+    self.offset = offset or 0
+    self.overwrite = offset is not None
+    self.size = 0
+    self.sha256 = hashlib.sha256()
+    self._file = None
+    self._pending: list[bytes] = []
+    self._pending_size = 0
+
+  async def open(self) -> None:
+    def _open():
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+      if self.overwrite:
+        f = open(self.path, "r+b")
+        f.seek(self.offset)
+        return f
+      return open(self.path, "wb")
+    self._file = await anyio.to_thread.run_sync(_open)
+
+  def feed(self, data: bytes) -> None:
+    """Senkron; event loop'ta çağrılır, sadece tamponlar"""
+    if not data:
+      return
+    self.size += len(data)
+    if self.offset + self.size > self.max_bytes:
+      raise _too_large(self.max_bytes)
+    self._pending.append(data)
+    self._pending_size += len(data)
+
+  async def flush(self, force: bool = False) -> None:
+    if not self._pending or (not force and self._pending_size < WRITE_BUFFER_BYTES):
+      return
+    block = b"".join(self._pending)
+    self._pending.clear()
+    self._pending_size = 0
+
+    def _write():
+      self._file.write(block)
+      self.sha256.update(block)  # büyük bloklarda GIL bırakılır
+    await anyio.to_thread.run_sync(_write)
+
+  async def write(self, data: bytes) -> None:
+    self.feed(data)
+    await self.flush()
+
+  async def close(self) -> None:
+    await self.flush(force=True)
+    if self._file is not None:
+      f, self._file = self._file, None
+      await anyio.to_thread.run_sync(f.close)
+
+  async def discard(self) -> None:
+    if self._file is not None:
+      f, self._file = self._file, None
+      await anyio.to_thread.run_sync(f.close)
+    self._pending.clear()
+    if not self.overwrite:
+      await anyio.to_thread.run_sync(lambda: self.path.unlink(missing_ok=True))
+
+  @property
+  def hexdigest(self) -> str:
+    return self.sha256.hexdigest()
+
+
+def hash_file(path: Path, block_size: int = 1024 * 1024) -> str:
+  """Dosyanın sha256'sı; senkron, thread'de çağrılmalıdır"""
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    while block := f.read(block_size):
+      digest.update(block)
+  return digest.hexdigest()
+
+
+class StreamedUpload:
+  """parse_upload sonucu: form alanları + geçici dosyaya yazılmış tek dosya"""
+
+  def __init__(self):
+    self.fields: dict[str, str] = {}
+    self.filename: Optional[str] = None
+    self.content_type: str = ""
+    self.sink: Optional[FileSink] = None
+
+  @property
+  def size(self) -> int:
+    return self.sink.size if self.sink else 0
+
+  async def discard(self) -> None:
+    if self.sink:
+      await self.sink.discard()
+
+
+async def parse_upload(
+  request: Request,
+  temp_dir: Path,
+  file_field: str = "file",
+  max_bytes: int = UPLOAD_MAX_BYTES,
+) -> StreamedUpload:
+  """
+  multipart/form-data gövdesini akış hâlinde ayrıştırır. file_field alanındaki
+  dosya temp_dir altında geçici bir dosyaya yazılır; çağıran işi bitince dosyayı
+  taşımalı ya da upload.discard() ile silmelidir.
+  """
+  content_type, params = parse_options_header(request.headers.get("content-type", ""))
+  boundary = params.get(b"boundary")
+  if content_type != b"multipart/form-data" or not boundary:
+    raise HTTPException(status_code=400, detail="multipart/form-data bekleniyor")
+  declared = request.headers.get("content-length")
+  if declared and declared.isdigit() and int(declared) > max_bytes + MAX_FIELD_BYTES:
+    raise _too_large(max_bytes)
+
+  upload = StreamedUpload()
+  # Parser callback'leri senkron; dosya verisi sink'te tamponlanır, diske await ile yazılır
+  state = {"name": None, "is_file": False, "data": bytearray(), "header": b"", "value": b"", "headers": {}}
+
+  def on_part_begin():
+    state.update(name=None, is_file=False, data=bytearray(), headers={})
+
+  def on_header_field(data, start, end):
+    state["header"] += data[start:end]
+
+  def on_header_value(data, start, end):
+    state["value"] += data[start:end]
+
+  def on_header_end():
+    state["headers"][state["header"].lower()] = state["value"]
+    state["header"] = state["value"] = b""
+
+  def on_headers_finished():
+    _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+    name = options.get(b"name", b"").decode("utf-8", "replace")
+    state["name"] = name
+    if b"filename" in options:
+      if name != file_field or upload.sink is not None:
+        raise HTTPException(status_code=400, detail="Beklenmeyen dosya alanı")
+      state["is_file"] = True
+      upload.filename = options[b"filename"].decode("utf-8", "replace")
+      upload.content_type = state["headers"].get(b"content-type", b"").decode("latin-1").strip()
+      upload.sink = FileSink(temp_dir / f".upload-{uuid.uuid4().hex}.part", max_bytes)
+
+  def on_part_data(data, start, end):
+    if state["is_file"]:
+      upload.sink.feed(data[start:end])
+      return
+    if len(state["data"]) + (end - start) > MAX_FIELD_BYTES:
+      raise HTTPException(status_code=413, detail="Form alanı çok büyük")
+    state["data"] += data[start:end]
+
+  def on_part_end():
+    if not state["is_file"] and state["name"]:
+      upload.fields[state["name"]] = state["data"].decode("utf-8", "replace")
+
+  parser = MultipartParser(boundary, {
+    "on_part_begin": on_part_begin,
+    "on_part_data": on_part_data,
+    "on_part_end": on_part_end,
+    "on_header_field": on_header_field,
+    "on_header_value": on_header_value,
+    "on_header_end": on_header_end,
+    "on_headers_finished": on_headers_finished,
+  })
+  opened = False
+  try:
+    async for chunk in request.stream():
+      parser.write(chunk)
+      if upload.sink is not None:
+        if not opened:
+          await upload.sink.open()
+          opened = True
+        await upload.sink.flush()
+    parser.finalize()
+    if upload.sink is None:
+      raise HTTPException(status_code=400, detail="Dosya gönderilmedi")
+    if not opened:
+      await upload.sink.open()
+    await upload.sink.close()
+  except BaseException as exc:
+    with anyio.CancelScope(shield=True):
+      await upload.discard()
+    if isinstance(exc, MultipartParseError):
+      raise HTTPException(status_code=400, detail="Geçersiz multipart gövde")
+    raise
+  return upload
+
+
+class UploadSession:
+  """Devam ettirilebilir tek yükleme; meta çağıranın (ör. jobId, docType) verisidir"""
+
+  def __init__(self, id: str, size: int, chunk_size: int, meta: dict,
+               received: Optional[set[int]] = None, created_at: Optional[float] = None,
+               updated_at: Optional[float] = None):
+    self.id = id
+    self.size = size
+    self.chunk_size = chunk_size
+    self.meta = meta
+    self.received = received or set()
+    self.created_at = created_at or time.time()
+    self.updated_at = updated_at or self.created_at
+
+  @property
+  def total_chunks(self) -> int:
+    return max(1, -(-self.size // self.chunk_size))
+
+  def chunk_range(self, index: int) -> tuple[int, int]:
+    """Parçanın [başlangıç, bitiş) bayt aralığı"""
+    start = index * self.chunk_size
+    return start, min(start + self.chunk_size, self.size)
+
+  @property
+  def missing(self) -> list[int]:
+    return [i for i in range(self.total_chunks) if i not in self.received]
+
+  @property
+  def complete(self) -> bool:
+    return len(self.received) == self.total_chunks
+
+  def ranges(self) -> list[list[int]]:
+    """Alınan baytlar, birleştirilmiş [başlangıç, bitiş) aralıkları olarak"""
+    ranges: list[list[int]] = []
+    for index in sorted(self.received):
+      start, end = self.chunk_range(index)
+      if ranges and ranges[-1][1] == start:
+        ranges[-1][1] = end
+      else:
+        ranges.append([start, end])
+    return ranges
+
+  def to_dict(self) -> dict:
+    return {
+      "id": self.id, "size": self.size, "chunkSize": self.chunk_size, "meta": self.meta,
+      "received": sorted(self.received), "createdAt": self.created_at, "updatedAt": self.updated_at,
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "UploadSession":
+    return cls(data["id"], data["size"], data["chunkSize"], data.get("meta") or {},
+               set(data.get("received") or ()), data.get("createdAt"), data.get("updatedAt"))
+
+  def status(self) -> dict:
+    return {
+      "uploadId": self.id,
+      "size": self.size,
+      "chunkSize": self.chunk_size,
+      "totalChunks": self.total_chunks,
+      "receivedBytes": sum(end - start for start, end in self.ranges()),
+      "ranges": self.ranges(),
+      "missingChunks": self.missing,
+      "complete": self.complete,
+    }
+
+
+class UploadSessionStore:
+  """
+  Oturumlar directory altında {id}.json (durum) + {id}.part (veri) olarak durur;
+  servis yeniden başlasa da yükleme kaldığı yerden sürer. Metotlar senkron,
+  route'lardan thread'de çağrılır.
+  """
+
+  def __init__(self, directory: Path, ttl_s: float = UPLOAD_SESSION_TTL_S):
+    self.directory = directory
+    self.ttl_s = ttl_s
+    self._sessions: dict[str, UploadSession] = {}
+    self._claimed: set[str] = set()
+    # id -> yazılmakta olan parça sayısı; tamamlama bunları bekler (claim)
+    self._writers: dict[str, int] = {}
+    self._lock = threading.Lock()
+
+  def part_path(self, upload_id: str) -> Path:
+    return self.directory / f"{upload_id}.part"
+
+  def _state_path(self, upload_id: str) -> Path:
+    return self.directory / f"{upload_id}.json"
+
+  def _save(self, session: UploadSession) -> None:
+    path = self._state_path(session.id)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(session.to_dict()), encoding="utf-8")
+    os.replace(tmp, path)
+
+  def create(self, size: int, chunk_size: int, meta: dict) -> UploadSession:
+    self.expire()
+    session = UploadSession(uuid.uuid4().hex, size, chunk_size, meta)
+    self.directory.mkdir(parents=True, exist_ok=True)
+    with open(self.part_path(session.id), "wb") as f:
+      f.truncate(size)  # seyrek dosya; parçalar yerlerine yazılır
+    with self._lock:
+      self._save(session)
+      self._sessions[session.id] = session
+    return session
+
+  def get(self, upload_id: str) -> Optional[UploadSession]:
+    if not upload_id.isalnum():
+      return None
+    with self._lock:
+      session = self._sessions.get(upload_id)
+      if session is None:
+        try:
+          data = json.loads(self._state_path(upload_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+          return None
+        session = self._sessions[upload_id] = UploadSession.from_dict(data)
+      return session
+
+  def mark_received(self, session: UploadSession, index: int) -> None:
+    with self._lock:
+      session.received.add(index)
+      session.updated_at = time.time()
+      self._save(session)
+
+  def claim(self, session: UploadSession) -> bool:
+    """
+    Tamamlama/iptal için oturumu tek isteğe ayırır. Zaten ayrılmışsa veya bir
+    parça hâlâ yazılıyorsa False: ayrıldıktan sonra .part dosyası değişmez.
+    """
+    with self._lock:
+      if session.id in self._claimed or self._writers.get(session.id):
+        return False
+      self._claimed.add(session.id)
+      return True
+
+  def release(self, session: UploadSession) -> None:
+    with self._lock:
+      self._claimed.discard(session.id)
+
+  @contextmanager
+  def writing(self, session: UploadSession) -> Iterator[None]:
+    """Parça yazımı süresince oturumu ayrılmaya kapatır; ayrılmış oturuma yazılmaz (409)"""
+    with self._lock:
+      if session.id in self._claimed:
+        raise HTTPException(status_code=409, detail="Yükleme tamamlanıyor")
+      self._writers[session.id] = self._writers.get(session.id, 0) + 1
+    try:
+      yield
+    finally:
+      with self._lock:
+        remaining = self._writers[session.id] - 1
+        if remaining:
+          self._writers[session.id] = remaining
+        else:
+          del self._writers[session.id]
+
+  def remove(self, upload_id: str, keep_part: bool = False) -> None:
+    with self._lock:
+      self._sessions.pop(upload_id, None)
+      self._claimed.discard(upload_id)
+      self._state_path(upload_id).unlink(missing_ok=True)
+      if not keep_part:
+        self.part_path(upload_id).unlink(missing_ok=True)
+
+  def expire(self) -> int:
+    """TTL'i geçmiş oturumları siler; silinen sayısını döndürür"""
+    if not self.directory.exists():
+      return 0
+    cutoff = time.time() - self.ttl_s
+    removed = 0
+    for state in self.directory.glob("*.json"):
+      try:
+        if state.stat().st_mtime < cutoff:
+          self.remove(state.stem)
+          removed += 1
+      except OSError:
+        continue
+    return removed
+
+
+async def write_chunk(store: UploadSessionStore, session: UploadSession, index: int,
+                      request: Request, sha256: Optional[str] = None) -> None:
+  """
+  İstek gövdesini parçanın ofsetine akış hâlinde yazar. Gövde boyu parça boyuna
+  eşit olmalı; sha256 verilirse doğrulanır. Başarılıysa parça alındı işaretlenir.
+  Oturum tamamlanıyorsa (claim) 409; yazım sürerken oturum ayrılamaz.
+  """
+  if index < 0 or index >= session.total_chunks:
+    raise HTTPException(status_code=416, detail="Geçersiz parça numarası")
+  start, end = session.chunk_range(index)
+  with store.writing(session):
+    sink = FileSink(store.part_path(session.id), max_bytes=end, offset=start)
+    await sink.open()
+    try:
+      async for chunk in request.stream():
+        await sink.write(chunk)
+    except HTTPException as exc:
+      if exc.status_code == 413:
+        raise HTTPException(status_code=413, detail=f"Parça boyutu {end - start} baytı aşıyor")
+      raise
+    finally:
+      await sink.close()
+    if sink.size != end - start:
+      raise HTTPException(status_code=400, detail=f"Parça boyutu {end - start} olmalı, {sink.size} alındı")
+    if sha256 and sha256.lower() != sink.hexdigest:
+      raise HTTPException(status_code=400, detail="Parça sha256 doğrulaması başarısız")
+    await anyio.to_thread.run_sync(store.mark_received, session, index)
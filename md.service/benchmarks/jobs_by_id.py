@@ -0,0 +1,83 @@
+"""
+GET /jobs/{id} gecikmesi: iş sayısı 100'den 100k'ya çıkarken sabit kalmalı.
+
+Geçici bir DATA_DIR'de N işlik jobs.json üretir, TestClient ile rastgele id'leri
+sorgular ve istek başına medyan/p95 süreyi yazar. Karşılaştırma için aynı
+listede doğrusal arama süresi de gösterilir.
+
+  cd md.service
+  python -m benchmarks.jobs_by_id [--sizes 100,1000,10000,100000] [--requests 2000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _make_jobs(n: int) -> list[dict]:
+  return [
+    {
+      "id": f"JOB-{i:08d}",
+      "title": f"İş {i}",
+      "customerName": f"Müşteri {i % 500}",
+      "status": "OLCU_RANDEVU_BEKLIYOR",
+      "logs": [{"at": "2026-01-01T00:00:00", "action": "created", "note": None}],
+    }
+    for i in range(n)
+  ]
+
+
+def _percentile(samples: list[float], q: float) -> float:
+  samples = sorted(samples)
+  return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="GET /jobs/{id} gecikme benchmark'ı")
+  parser.add_argument("--sizes", default="100,1000,10000,100000")
+  parser.add_argument("--requests", type=int, default=2000)
+  args = parser.parse_args()
+
+  data_dir = Path(tempfile.mkdtemp(prefix="md-bench-"))
+  os.environ["DATA_DIR"] = str(data_dir)
+  os.environ.setdefault("AUTH_MODE", "dev")
+  sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+  from fastapi.testclient import TestClient
+
+  from app import data_loader
+  from app.main import app
+
+  client = TestClient(app)
+  print(f"{'jobs':>8} {'median ms':>10} {'p95 ms':>8} {'scan ms':>8}")
+  for n in (int(s) for s in args.sizes.split(",")):
+    jobs = _make_jobs(n)
+    (data_dir / "jobs.json").write_text(json.dumps(jobs, ensure_ascii=False), encoding="utf-8")
+    data_loader.clear_cache()
+    ids = [random.choice(jobs)["id"] for _ in range(args.requests)]
+    client.get(f"/jobs/{ids[0]}")  # Cache + indeks ısınması
+
+    samples = []
+    for job_id in ids:
+      t = time.perf_counter()
+      response = client.get(f"/jobs/{job_id}")
+      samples.append((time.perf_counter() - t) * 1000)
+      assert response.status_code == 200
+
+    # Aynı aramanın doğrusal tarama ile maliyeti (eski get_job)
+    loaded = data_loader.load_json("jobs.json", readonly=True)
+    t = time.perf_counter()
+    for job_id in ids[:200]:
+      next(j for j in loaded if j.get("id") == job_id)
+    scan = (time.perf_counter() - t) * 1000 / 200
+
+    print(f"{n:>8} {statistics.median(samples):>10.3f} {_percentile(samples, 0.95):>8.3f} {scan:>8.3f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,55 @@
+"""
+Testler md.data'nın geçici bir kopyası üzerinde çalışır; her test temiz bir
+data_loader cache'i ve backend ile başlar.
+"""
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("AUTH_MODE", "dev")
+
+from app import data_loader  # noqa: E402
+from app.ledger import ledger  # noqa: E402
+
+DATA_SOURCE = Path(__file__).resolve().parent.parent.parent / "md.data"
+
+
+def _reset() -> None:
+  data_loader.get_data_dir.cache_clear()
+  data_loader.get_backend.cache_clear()
+  data_loader.clear_cache()
+  ledger.invalidate()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+  target = tmp_path / "md.data"
+  shutil.copytree(DATA_SOURCE, target)
+  monkeypatch.setenv("DATA_DIR", str(target))
+  monkeypatch.setenv("DATA_BACKEND", "json")
+  _reset()
+  yield target
+  _reset()
+
+
+@pytest.fixture
+def journal_dir(tmp_path, monkeypatch):
+  """Journal backend'i; arka plan compactor'ı kapalı, compaction testte elle yapılır"""
+  target = tmp_path / "md.data"
+  shutil.copytree(DATA_SOURCE, target)
+  monkeypatch.setenv("DATA_DIR", str(target))
+  monkeypatch.setenv("DATA_BACKEND", "journal")
+  monkeypatch.setenv("DATA_COMPACT_INTERVAL_S", "0")
+  _reset()
+  yield target
+  _reset()
+
+
+@pytest.fixture
+def client(data_dir):
+  from fastapi.testclient import TestClient
+  from app.main import app
+
+  return TestClient(app)
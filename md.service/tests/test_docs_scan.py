@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from app import blobs, docs_scan
+from app.data_loader import delete_record, save_json, upsert_record
+
+
+def _write(root, relpath, data=b"x"):
+  path = root / relpath
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_bytes(data)
+  return path
+
+
+@pytest.fixture
+def root(data_dir, tmp_path):
+  root = tmp_path / "md.docs"
+  _write(root, "documents/blobs/aa/aa11", b"kayitli")
+  _write(root, "documents/blobs/aa/aa11.thumb-256.jpg")
+  _write(root, "documents/blobs/bb/bb22", b"yetim")
+  _write(root, "documents/blobs/cc/cc33.thumb-128.jpg")
+  _write(root, "documents/olcu/DOC-OLD.pdf")
+  _write(root, "documents/.tmp/.upload-1.part")
+  save_json("documents.json", [])
+  upsert_record("documents.json", {"id": "DOC-A", "jobId": "J1", "path": "documents/blobs/aa/aa11"})
+  upsert_record("documents.json", {"id": "DOC-OLD", "jobId": "J1", "path": "documents/olcu/DOC-OLD.pdf"})
+  upsert_record("documents.json", {"id": "DOC-GONE", "jobId": "J1", "path": "documents/olcu/DOC-GONE.pdf"})
+  return root
+
+
+def test_report(root):
+  report = docs_scan.scan(root, workers=2)
+  assert report.referenced["count"] == 2
+  assert report.derived["count"] == 1
+  assert sorted((o["path"], o["reason"]) for o in report.orphans) == [
+    ("documents/.tmp/.upload-1.part", "yarım kalmış yükleme"),
+    ("documents/blobs/bb/bb22", "kayıt yok"),
+    ("documents/blobs/cc/cc33.thumb-128.jpg", "sahibi olmayan önizleme"),
+  ]
+  assert [m["id"] for m in report.missing] == ["DOC-GONE"]
+
+
+def test_reclaim_and_prune(root):
+  report = docs_scan.scan(root, reclaim=True, prune_missing=True, min_age_s=0, workers=2)
+  assert report.reclaimed["count"] == 3 and report.pruned == 1
+  assert not (root / "documents/blobs/bb/bb22").exists()
+  assert (root / "documents/blobs/aa/aa11").exists()
+  assert docs_scan.scan(root, min_age_s=0).orphans == []
+
+  # Yeni dosyalara dokunulmaz
+  _write(root, "documents/blobs/dd/dd44")
+  assert docs_scan.scan(root, reclaim=True).reclaimed["count"] == 0
+  assert (root / "documents/blobs/dd/dd44").exists()
+
+
+def test_reclaim_keeps_blob_deduped_after_report(root, monkeypatch):
+  original = docs_scan.load_json
+
+  def load_json(filename, readonly=False):
+    # Rapor çıktıktan sonra aynı içerik yüklendi ve yetim blob'a bağlandı
+    upsert_record("documents.json", {"id": "DOC-NEW", "jobId": "J2", "path": "documents/blobs/bb/bb22"})
+    return original(filename, readonly)
+
+  monkeypatch.setattr(docs_scan, "load_json", load_json)
+  report = docs_scan.scan(root, reclaim=True, min_age_s=0, workers=2)
+  assert "documents/blobs/bb/bb22" in [o["path"] for o in report.orphans]
+  assert (root / "documents/blobs/bb/bb22").exists()
+  assert report.reclaimed["count"] == 2
+
+
+def test_reclaim_keeps_blob_with_pending_record(root):
+  blob = root / "documents/blobs/bb/bb22"
+  with blobs.referencing(None, blob, "documents/blobs/bb/bb22", blob.stat().st_size):
+    assert docs_scan.scan(root, reclaim=True, min_age_s=0).reclaimed["count"] == 2
+    assert blob.exists()
+  # Referans kalkınca blob ve önizlemesi de silinebilir
+  delete_record("documents.json", "DOC-A")
+  assert docs_scan.scan(root, reclaim=True, min_age_s=0).reclaimed["count"] == 3
+  assert not blob.exists()
+
+
+def test_vanishing_directories_do_not_abort(root, monkeypatch):
+  _write(root, "documents/teknik/a.dwg")
+  real = os.scandir
+
+  def scandir(path="."):
+    if str(path).endswith(("teknik", os.path.join("blobs", "bb"), "blobs")):
+      raise FileNotFoundError(path)
+    return real(path)
+
+  monkeypatch.setattr(os, "scandir", scandir)
+  report = docs_scan.scan(root, workers=2)
+  paths = {o["path"] for o in report.orphans}
+  assert "documents/.tmp/.upload-1.part" in paths
+  assert "documents/teknik/a.dwg" not in paths
@@ -0,0 +1,157 @@
+import pytest
+from fastapi import HTTPException
+
+from app.data_loader import get_record
+from app.routers import documents
+from app.uploads import UploadSessionStore
+
+
+@pytest.fixture
+def docs(client, tmp_path, monkeypatch):
+  """md.docs'u geçici klasöre yönlendir"""
+  docs_dir = tmp_path / "md.docs" / "documents"
+  temp_dir = docs_dir / ".tmp"
+  temp_dir.mkdir(parents=True)
+  monkeypatch.setattr(documents, "BASE_DIR", tmp_path)
+  monkeypatch.setattr(documents, "DOCS_DIR", docs_dir)
+  monkeypatch.setattr(documents, "BLOBS_DIR", docs_dir / "blobs")
+  monkeypatch.setattr(documents, "TEMP_DIR", temp_dir)
+  monkeypatch.setattr(documents, "upload_sessions", UploadSessionStore(temp_dir / "sessions"))
+  return tmp_path / "md.docs"
+
+
+def _multipart(filename: str, data: bytes, **fields) -> tuple[bytes, str]:
+  boundary = "testboundary"
+  parts = [
+    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for name, value in fields.items()
+  ]
+  parts.append(
+    f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+    f"Content-Type: application/pdf\r\n\r\n".encode() + data + b"\r\n"
+  )
+  return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def test_upload_without_filename_is_named(client, docs):
+  body, content_type = _multipart("", b"%PDF-1.4 isimsiz", jobId="J-NONAME", docType="diger")
+  r = client.post("/documents/upload", content=body, headers={"Content-Type": content_type})
+  assert r.status_code == 200, r.text
+  doc = r.json()
+  assert doc["originalName"] == "unnamed"
+  assert get_record("documents.json", doc["id"])["originalName"] == "unnamed"
+  assert documents._bundle_entries([doc])[0][1] == "diger/unnamed"
+
+
+def _upload(client, job_id: str, data: bytes, name: str = "s.pdf") -> dict:
+  r = client.post(
+    "/documents/upload",
+    files={"file": (name, data, "application/pdf")},
+    data={"jobId": job_id, "docType": "sozlesme"},
+  )
+  assert r.status_code == 200, r.text
+  return r.json()
+
+
+def test_dedupe_refcount_on_delete(client, docs):
+  data = b"%PDF-1.4 " + bytes(range(256)) * 64
+  a = _upload(client, "J1", data)
+  b = _upload(client, "J2", data, "kopya.pdf")
+  assert (a["deduplicated"], b["deduplicated"]) == (False, True)
+  assert a["path"] == b["path"] == documents.blob_relpath(a["sha256"])
+  blob = docs / a["path"]
+
+  # Hash'i bilinen içerik yüklenmeden tamamlanır
+  r = client.post("/documents/uploads", json={
+    "jobId": "J3", "docType": "sozlesme", "filename": "s.pdf", "size": len(data), "sha256": a["sha256"],
+  }).json()
+  assert r["complete"] and r["document"]["path"] == a["path"]
+  c = r["document"]
+
+  assert client.delete(f"/documents/{a['id']}").status_code == 200
+  assert blob.exists()
+  assert client.delete(f"/documents/{b['id']}").status_code == 200
+  assert blob.exists()
+  assert client.delete(f"/documents/{c['id']}").status_code == 200
+  assert not blob.exists()
+  assert client.get(f"/documents/{a['id']}").status_code == 404
+
+  # Son referansla silinen içerik artık anında tamamlanamaz; yeniden yükleme yeni blob yazar
+  r = client.post("/documents/uploads", json={
+    "jobId": "J3", "docType": "sozlesme", "filename": "s.pdf", "size": len(data), "sha256": a["sha256"],
+  }).json()
+  assert r["uploadId"]
+  d = _upload(client, "J4", data)
+  assert d["deduplicated"] is False and blob.read_bytes() == data
+
+
+def test_record_write_happens_outside_blob_lock(client, docs, monkeypatch):
+  from app import blobs
+
+  seen = []
+  original = documents.upsert_record
+
+  def upsert(filename, record, prepend=False):
+    # Kayıt yazılırken kilit serbest, ama blob bekleyen referans olarak korunuyor
+    free = blobs._lock.acquire(blocking=False)
+    if free:
+      seen.append(blobs.is_referenced(record["path"]))
+      blobs._lock.release()
+    seen.append(free)
+    return original(filename, record, prepend)
+
+  monkeypatch.setattr(documents, "upsert_record", upsert)
+  doc = _upload(client, "J1", b"%PDF kilit")
+  assert seen == [True, True]
+  assert not blobs._pending
+  assert (docs / doc["path"]).exists()
+
+
+def test_pending_reference_blocks_removal(docs, tmp_path):
+  from app import blobs
+
+  temp = tmp_path / "upload.part"
+  temp.write_bytes(b"veri")
+  target = docs / "documents" / "blobs" / "ab" / "abc"
+  with blobs.referencing(temp, target, "documents/blobs/ab/abc", 4) as created:
+    assert created and target.exists() and not temp.exists()
+    assert not blobs.remove_if_unreferenced(target, "documents/blobs/ab/abc")
+  assert blobs.remove_if_unreferenced(target, "documents/blobs/ab/abc")
+  assert not target.exists()
+
+
+def test_chunk_writers_and_claim_exclude_each_other(client, docs):
+  store = documents.upload_sessions
+  session = store.create(8, 4, {"filename": "a.bin"})
+
+  with store.writing(session):
+    # Yazılmakta olan parça varken tamamlama/iptal oturumu ayıramaz
+    assert not store.claim(session)
+    assert client.delete(f"/documents/uploads/{session.id}").status_code == 409
+  assert store.claim(session)
+
+  # Ayrılmış oturuma parça yazılamaz; .part dosyası hash/taşıma sırasında değişmez
+  with pytest.raises(HTTPException) as exc:
+    with store.writing(session):
+      pass
+  assert exc.value.status_code == 409
+  r = client.put(f"/documents/uploads/{session.id}/chunks/0", content=b"abcd")
+  assert r.status_code == 409
+  assert store.part_path(session.id).read_bytes() == bytes(8)
+
+
+def test_doc_type_cannot_escape_bundle_folder():
+  documents.validate_doc_type("measure_pvc-1")
+  for bad in ("measure_../../x", "technical_a/b", "measure_", "technical_x\\y"):
+    with pytest.raises(HTTPException):
+      documents.validate_doc_type(bad)
+
+  # Doğrulamadan önce kaydedilmiş tipler ve adlar da ZIP'te tek klasör/ad olur
+  docs = [
+    {"id": "D1", "path": "documents/x", "type": "measure_../../x", "originalName": "a.pdf"},
+    {"id": "D2", "path": "documents/y", "type": "..", "originalName": ".."},
+    {"id": "D3", "path": "documents/z", "type": "technical_a\\b", "originalName": "../c.pdf"},
+  ]
+  names = [arcname for _, arcname, _ in documents._bundle_entries(docs)]
+  assert names == ["measure_.._.._x/a.pdf", "diger/D2", "technical_a_b/_c.pdf"]
+  assert not any(part in ("..", ".") for name in names for part in name.split("/"))
@@ -0,0 +1,125 @@
+import threading
+
+from app import data_loader
+from app.data_loader import delete_record, find_records, get_record, load_json, update_record, upsert_record
+from app.storage.records import RecordIndex, field_key
+
+
+def _records(n):
+  return [{"id": f"R{i}", "jobId": f"J{i % 3}", "code": f"C{i:03d}"} for i in range(n)]
+
+
+def _assert_matches(index: RecordIndex, data: list) -> None:
+  """İlerletilmiş indeks, aynı liste üzerine sıfırdan kurulanla aynı cevapları vermeli"""
+  fresh = RecordIndex(data, {"jobId": field_key("jobId")}, ("code",))
+  for pos, record in enumerate(data):
+    assert index.position(record["id"]) == pos
+    assert index.get(record["id"]) is record
+  for job_id in ("J0", "J1", "J2", "J9"):
+    assert index.find("jobId", job_id) == fresh.find("jobId", job_id)
+  assert index.prefix("code", "C") == fresh.prefix("code", "C")
+
+
+def test_advance_after_prepend_delete_update():
+  data = _records(6)
+  index = RecordIndex(data, {"jobId": field_key("jobId")}, ("code",))
+
+  new = {"id": "N1", "jobId": "J1", "code": "C100"}
+  data = [new, *data]
+  assert index.advance(data, [("insert", new, True)])
+  _assert_matches(index, data)
+
+  data = [r for r in data if r["id"] != "R2"]
+  assert index.advance(data, [("delete", "R2")])
+  _assert_matches(index, data)
+  assert index.position("R2") is None
+
+  moved = {**data[3], "jobId": "J2", "code": "A000"}
+  data = [*data[:3], moved, *data[4:]]
+  assert index.advance(data, [("update", moved)])
+  _assert_matches(index, data)
+  assert moved in index.find("jobId", "J2")
+  assert index.prefix("code", "A") == [moved]
+
+  tail = {"id": "T1", "jobId": "J0", "code": "C200"}
+  head = {"id": "N2", "jobId": "J0", "code": "C300"}
+  data = [head, *data[:-1], tail]
+  assert index.advance(data, [("delete", "R5"), ("insert", head, True), ("insert", tail, False)])
+  _assert_matches(index, data)
+
+
+def test_advance_unknown_delete_requires_rebuild():
+  data = _records(3)
+  index = RecordIndex(data)
+  assert not index.advance(data, [("delete", "missing")])
+
+
+def test_readers_during_advance_see_consistent_view():
+  data = _records(200)
+  index = RecordIndex(data, {"jobId": field_key("jobId")}, ("code",))
+  errors = []
+  done = threading.Event()
+
+  def read():
+    try:
+      while not done.is_set():
+        for record in index.find("jobId", "J1") + index.prefix("code", "C"):
+          index.get(record["id"])
+          index.position(record["id"])
+    except Exception as exc:  # noqa: BLE001
+      errors.append(exc)
+
+  readers = [threading.Thread(target=read) for _ in range(3)]
+  for reader in readers:
+    reader.start()
+  try:
+    for record in list(data)[:150]:
+      data = [r for r in data if r["id"] != record["id"]]
+      assert index.advance(data, [("delete", record["id"])])
+  finally:
+    done.set()
+    for reader in readers:
+      reader.join()
+  assert errors == []
+  _assert_matches(index, data)
+
+
+def test_record_writes_advance_loader_index(data_dir):
+  first = load_json("tasks.json")[0]["id"]
+  assert get_record("tasks.json", first)["id"] == first
+  index = data_loader._indexes["tasks.json"]
+
+  upsert_record("tasks.json", {"id": "TSK-NEW", "baslik": "yeni"}, prepend=True)
+  update_record("tasks.json", first, lambda task: task.update(baslik="güncel"))
+  assert delete_record("tasks.json", "TSK-NEW")
+  assert not delete_record("tasks.json", "TSK-NEW")
+
+  assert get_record("tasks.json", first)["baslik"] == "güncel"
+  assert get_record("tasks.json", "TSK-NEW") is None
+  # İndeks yazımlarla ilerletildi, yeniden kurulmadı
+  assert data_loader._indexes["tasks.json"] is index
+  tasks = load_json("tasks.json")
+  assert [index.position(t["id"]) for t in tasks] == list(range(len(tasks)))
+
+
+def test_by_id_routes(client):
+  task_id = load_json("tasks.json")[1]["id"]
+  r = client.patch(f"/tasks/{task_id}/durum", params={"durum": "done"})
+  assert r.status_code == 200 and r.json()["durum"] == "done"
+  assert client.patch("/tasks/TSK-YOK/durum", params={"durum": "done"}).status_code == 404
+  assert client.delete(f"/tasks/{task_id}").json() == {"id": task_id, "deleted": True}
+  assert get_record("tasks.json", task_id)["deleted"] is True
+
+  r = client.put("/purchase/suppliers/SUP-01", json={"category": "profil"})
+  assert r.status_code == 200 and r.json()["category"] == "profil"
+  assert client.put("/purchase/suppliers/SUP-YOK", json={"category": "x"}).status_code == 404
+
+  item = {"productCode": "P1", "colorCode": "C1", "productName": "Profil", "quantity": 2, "unit": "boy", "unitCost": 5}
+  order = client.post("/purchase/orders", json={"supplierId": "SUP-01", "supplierName": "S", "items": [item]}).json()
+  r = client.post(f"/purchase/orders/{order['id']}/items", json={"items": [item], "relatedJobs": ["J1"]})
+  assert r.json()["items"][0]["quantity"] == 4 and r.json()["totalAmount"] == 20
+  assert client.put(f"/purchase/orders/{order['id']}/send").json()["status"] == "sent"
+  assert client.put(f"/purchase/orders/{order['id']}/send").status_code == 400
+  assert client.post(f"/purchase/orders/{order['id']}/items", json={"items": [item]}).status_code == 400
+  assert client.delete(f"/purchase/orders/{order['id']}").status_code == 400
+  assert find_records("stockItems.json", ("productCode", "colorCode"), ("P1", "C1")) == []
@@ -0,0 +1,93 @@
+import json
+
+from app import data_loader
+from app.data_loader import changes_since, collection_version, get_backend, load_json, on_write, update_record
+from app.storage import Change
+from app.storage.journal_backend import JournalBackend
+
+
+def _backend(path):
+  return JournalBackend(path, compact_interval=0)
+
+
+def test_replay_after_crash(journal_dir):
+  backend = _backend(journal_dir)
+  jobs = backend.read("jobs.json")
+  colors = backend.read("colors.json")
+  job = {**jobs[0], "note": "çökme öncesi"}
+  color = {"id": "C-NEW", "name": "Yeni"}
+  backend.commit({
+    "jobs.json": Change(None, [("update", job)]),
+    "colors.json": Change(None, [("insert", color, True)]),
+  })
+  # Çökme: txn kaydı fsync'lendi ama jobs journal'ına satır inmedi; colors'ta yarım satır kaldı
+  backend.journal_path("jobs.json").write_bytes(b"")
+  with backend.journal_path("colors.json").open("ab") as f:
+    f.write(b'{"op": "delete", "id": "C-N')
+
+  recovered = _backend(journal_dir)
+  assert recovered.read("jobs.json")[0] == job
+  assert recovered.read("colors.json") == [color, *colors]
+
+
+def test_replay_after_compaction(journal_dir):
+  backend = _backend(journal_dir)
+  colors = backend.read("colors.json")
+  for i in range(3):
+    backend.commit({"colors.json": Change(None, [("insert", {"id": f"C-{i}", "name": str(i)}, True)])})
+  backend.commit({"colors.json": Change(None, [("delete", "C-1")])})
+  expected = backend.read("colors.json")
+  assert [r["id"] for r in expected[:2]] == ["C-2", "C-0"]
+  old_journal = backend.journal_path("colors.json").read_bytes()
+
+  assert backend.compact("colors.json")
+  assert backend.journal_path("colors.json").read_bytes() == b""
+  assert json.loads((journal_dir / "colors.json").read_text(encoding="utf-8")) == expected
+  assert _backend(journal_dir).read("colors.json") == expected
+
+  # Yeni snapshot yazıldıktan sonra journal sıfırlanmadan çökülürse eski satırlar tekrar oynatılır
+  backend.journal_path("colors.json").write_bytes(old_journal)
+  assert _backend(journal_dir).read("colors.json") == expected
+  assert len(expected) == len(colors) + 2
+
+
+def test_compaction_keeps_version_and_change_log(journal_dir):
+  backend = get_backend()
+  assert backend.name == "journal"
+  job_id = load_json("jobs.json")[0]["id"]
+  resets = []
+
+  @on_write
+  def listener(filename, version, ops):
+    if ops is None:
+      resets.append(filename)
+
+  try:
+    update_record("jobs.json", job_id, lambda job: job.update(note="katlanacak"))
+    version = collection_version("jobs.json")
+    assert backend.compact("jobs.json")
+
+    assert load_json("jobs.json")[0]["note"] == "katlanacak"
+    assert collection_version("jobs.json") == version
+    _, entries = changes_since("jobs.json", version - 1)
+    assert entries == [(version, "upsert", job_id)]
+    assert resets == []
+
+    # Katlamadan sonraki yazımlar da kayıt seviyesinde kalır
+    update_record("jobs.json", job_id, lambda job: job.update(note="sonra"))
+    _, entries = changes_since("jobs.json", version - 1)
+    assert [e[2] for e in entries] == [job_id, job_id]
+    assert resets == []
+  finally:
+    data_loader._write_listeners.remove(listener)
+
+
+def test_external_edit_is_still_detected(journal_dir):
+  backend = get_backend()
+  version = collection_version("colors.json")
+  backend.commit({"colors.json": Change(None, [("insert", {"id": "C-X", "name": "x"}, True)])})
+  backend.compact("colors.json")
+  (journal_dir / "colors.json").write_text("[]", encoding="utf-8")
+  assert load_json("colors.json") == []
+  assert collection_version("colors.json") > version
+  assert changes_since("colors.json", version)[1] is None
@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+from app import ledger as ledger_module
+from app.data_loader import find_records, get_record, load_json, update_record
+from app.ledger import _ItemLedger, apply_movement, drift, ledger
+
+
+@pytest.fixture
+def small_snapshots(monkeypatch):
+  monkeypatch.setattr(ledger_module, "SNAPSHOT_EVERY", 3)
+
+
+def _moves(n, seed=7):
+  """Karışık tarihli (geriye tarihli dahil) hareketler, geliş sırasıyla"""
+  rnd = random.Random(seed)
+  kinds = ["stockIn", "stockIn", "stockOut", "reserve", "release", "consume", "adjust"]
+  moves = []
+  for i in range(n):
+    kind = rnd.choice(kinds)
+    qty = rnd.randint(1, 9)
+    moves.append({
+      "id": f"M{i}",
+      "date": f"2025-01-{rnd.randint(1, 12):02d}",
+      "type": kind,
+      "change": qty if kind in ("stockIn", "reserve", "adjust") else -qty,
+      "reservedChange": rnd.randint(-2, 2) if kind == "adjust" else None,
+    })
+  return moves
+
+
+def _replay(moves, day=None):
+  """Kaba kuvvet: tarih sırasında (aynı gün geliş sırası) baştan oynat"""
+  on_hand, reserved = 0.0, 0.0
+  for movement in sorted(moves, key=lambda m: m["date"]):
+    if day is None or movement["date"] <= day:
+      on_hand, reserved = apply_movement(on_hand, reserved, movement)
+  return on_hand, reserved
+
+
+def _days():
+  return ["2024-12-31"] + [f"2025-01-{d:02d}" for d in range(1, 14)]
+
+
+def test_as_of_from_snapshots_matches_replay(small_snapshots):
+  moves = _moves(40)
+  item = _ItemLedger(moves)
+  assert len(item.snapshots) == 40 // 3
+  assert (item.on_hand, item.reserved) == _replay(moves)
+  for day in _days():
+    on_hand, reserved, count, replayed = item.as_of(day)
+    assert (on_hand, reserved) == _replay(moves, day)
+    assert count == sum(1 for m in moves if m["date"] <= day)
+    assert replayed < 3
+
+
+def test_back_dated_add_keeps_as_of_and_balance(small_snapshots):
+  moves = _moves(40, seed=11)
+  item = _ItemLedger()
+  for i, movement in enumerate(moves):
+    item.add(movement)
+    seen = moves[:i + 1]
+    assert (item.on_hand, item.reserved) == _replay(seen)
+  # Artımlı ekleme baştan kurulumla aynı görüntüleri üretmeli
+  assert item.snapshots == _ItemLedger(moves).snapshots
+  for day in _days():
+    assert item.as_of(day)[:2] == _replay(moves, day)
+
+
+def test_projected_does_not_change_ledger(small_snapshots):
+  moves = _moves(10)
+  item = _ItemLedger(moves)
+  pending = [
+    {"id": "P1", "date": "2025-02-01", "type": "stockIn", "change": 5},
+    {"id": "P2", "date": "2025-01-02", "type": "reserve", "change": 3},
+  ]
+  assert item.projected(pending) == _replay(moves + pending)
+  assert item.projected(pending[:1]) == _replay(moves + pending[:1])
+  assert len(item.moves) == 10 and (item.on_hand, item.reserved) == _replay(moves)
+
+
+def _assert_counters(*item_ids):
+  for item_id in item_ids:
+    item = get_record("stockItems.json", item_id, readonly=True)
+    balance = ledger.balance(item_id)
+    assert (item["onHand"], item["reserved"]) == (balance["onHand"], balance["reserved"])
+  assert drift(load_json("stockItems.json", readonly=True)) == []
+
+
+def _create_item(client, **fields):
+  payload = {"productCode": "LDG-1", "colorCode": "RAL", "name": "Defter profil", "unit": "boy", "supplierId": "SUP-01"}
+  r = client.post("/stock/items", json={**payload, **fields})
+  assert r.status_code == 201
+  return r.json()["id"]
+
+
+def test_routes_write_counters_from_ledger(client):
+  item_id = _create_item(client, onHand=10, reserved=0)
+  _assert_counters(item_id)
+
+  r = client.post("/stock/movements", json={"itemId": item_id, "qty": 3, "type": "reserve"})
+  assert r.json()["item"]["reserved"] == 3
+  assert client.post("/stock/movements", json={"itemId": item_id, "qty": 8, "type": "stockOut"}).status_code == 400
+  client.post("/stock/movements", json={"itemId": item_id, "qty": 5, "type": "consume"})
+  item = get_record("stockItems.json", item_id)
+  assert (item["onHand"], item["reserved"]) == (5, 0)
+  _assert_counters(item_id)
+
+  r = client.post("/stock/bulk-reserve", json={"jobId": "JOB-A", "items": [{"itemId": item_id, "qty": 2}, {"itemId": item_id, "qty": 2}]})
+  assert [x["newReserved"] for x in r.json()["results"]] == [2, 4]
+  assert client.post("/stock/bulk-reserve", json={"jobId": "JOB-A", "items": [{"itemId": item_id, "qty": 2}]}).json()["errors"]
+  _assert_counters(item_id)
+
+  # Başka işin stoğu kullanılınca rezervasyonlar ve reserved birlikte düşer
+  r = client.post("/stock/bulk-reserve", json={"jobId": "JOB-B", "reserveType": "consume", "items": [{"itemId": item_id, "qty": 3}]})
+  result = r.json()["results"][0]
+  assert (result["newOnHand"], result["newReserved"]) == (2, 2)
+  assert sum(x["reducedBy"] for x in result["affectedReservations"]) == 2
+  _assert_counters(item_id)
+
+  reservation = next(x for x in find_records("reservations.json", "itemId", item_id) if x["status"] == "Beklemede")
+  assert client.put(f"/stock/reservations/{reservation['id']}/release").status_code == 200
+  _assert_counters(item_id)
+
+  r = client.put(f"/stock/items/{item_id}", json={"onHand": 20, "name": "Sayılan profil"})
+  assert r.json()["onHand"] == 20 and r.json()["name"] == "Sayılan profil"
+  _assert_counters(item_id)
+
+
+def test_receive_delivery_writes_counters_from_ledger(client):
+  item_id = _create_item(client, onHand=1)
+  line = {"productCode": "LDG-1", "colorCode": "RAL", "productName": "Defter profil", "quantity": 6, "unit": "boy"}
+  order = client.post("/purchase/orders", json={"supplierId": "SUP-01", "supplierName": "S", "items": [line]}).json()
+  client.put(f"/purchase/orders/{order['id']}/send")
+  items = [{"productCode": "LDG-1", "colorCode": "RAL", "quantity": 2}, {"productCode": "LDG-1", "colorCode": "RAL", "quantity": 4}]
+  r = client.post(f"/purchase/orders/{order['id']}/receive", json={"items": items})
+  assert r.status_code == 200
+  assert get_record("stockItems.json", item_id)["onHand"] == 7
+  _assert_counters(item_id)
+
+
+def test_counters_off_ledger_are_carried_as_adjustment(client):
+  item_id = _create_item(client)
+  # Defter dışı sayaç (ör. hareketsiz açılış bakiyesi) sonraki hareketle kaybolmamalı
+  update_record("stockItems.json", item_id, lambda item: item.update(onHand=50))
+  client.post("/stock/movements", json={"itemId": item_id, "qty": 1, "type": "stockIn"})
+  assert get_record("stockItems.json", item_id)["onHand"] == 51
+  reasons = [m["reason"] for m in find_records("stockMovements.json", "itemId", item_id)]
+  assert reasons == ["stockIn", "Defter mutabakatı"]
+  _assert_counters(item_id)
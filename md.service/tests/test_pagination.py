@@ -0,0 +1,72 @@
+import pytest
+
+from app.data_loader import load_json, upsert_record
+from app.pagination import NEXT_CURSOR_HEADER, paginate
+
+SORTS = ["createdAt", "-createdAt", "status", "-status", "customerName", "-customerName"]
+
+
+def _pages(client, params, on_page=None):
+  ids, cursor, pages = [], None, 0
+  while True:
+    r = client.get("/jobs/", params={**params, **({"cursor": cursor} if cursor else {})})
+    assert r.status_code == 200
+    ids += [job["id"] for job in r.json()]
+    pages += 1
+    if on_page:
+      on_page(pages)
+    cursor = r.headers.get(NEXT_CURSOR_HEADER)
+    if not cursor:
+      return ids, pages
+
+
+def _add_ties():
+  # Aynı sıralama anahtarına sahip işler: id ile ayrışmalı
+  for i in range(5):
+    upsert_record("jobs.json", {
+      "id": f"JOB-TIE{i}", "createdAt": "2026-01-10T00:00:00", "status": "AYNI", "customerName": "Çağlar",
+    }, prepend=True)
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_each_record_exactly_once(client, sort):
+  _add_ties()
+  total = len(load_json("jobs.json"))
+  ids, pages = _pages(client, {"sort": sort, "limit": 3})
+  assert len(ids) == total == len(set(ids))
+  assert pages == -(-total // 3)
+  # Sayfaların birleşimi tek seferde sıralanmış listeyle aynı
+  assert ids == [job["id"] for job in client.get("/jobs/", params={"sort": sort}).json()]
+
+
+def test_inserts_between_pages_do_not_repeat_or_skip(client):
+  before = {job["id"] for job in load_json("jobs.json")}
+
+  def insert(page):
+    upsert_record("jobs.json", {"id": f"JOB-NEW{page}", "createdAt": f"2025-06-0{page}T00:00:00"}, prepend=True)
+
+  ids, _ = _pages(client, {"sort": "-createdAt", "limit": 4}, on_page=insert)
+  assert len(ids) == len(set(ids))
+  assert before <= set(ids)
+
+
+def test_filters_and_projection(client):
+  status = load_json("jobs.json")[0]["status"]
+  expected = [job["id"] for job in load_json("jobs.json") if job.get("status") == status]
+  ids, _ = _pages(client, {"status": status, "limit": 1, "fields": "id,status"})
+  assert sorted(ids) == sorted(expected)
+  page = client.get("/jobs/", params={"status": status, "limit": 1, "fields": "status"}).json()
+  assert set(page[0]) == {"id", "status"}
+
+
+def test_bad_cursor(client):
+  r = client.get("/jobs/", params={"sort": "createdAt", "limit": 2})
+  cursor = r.headers[NEXT_CURSOR_HEADER]
+  assert client.get("/jobs/", params={"sort": "status", "cursor": cursor}).status_code == 400
+  assert client.get("/jobs/", params={"cursor": "bozuk!"}).status_code == 400
+
+
+def test_paginate_without_response_has_no_cursor():
+  items = [{"id": str(i), "n": i % 2} for i in range(5)]
+  page = paginate(items, lambda r: (r["n"], r["id"]), limit=2, sort="n")
+  assert [r["id"] for r in page] == ["0", "2"]
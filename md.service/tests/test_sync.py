@@ -0,0 +1,133 @@
+import threading
+
+from app import data_loader
+from app.data_loader import (
+  changes_since,
+  collection_version,
+  delete_record,
+  get_record,
+  load_json,
+  transaction,
+  update_record,
+  upsert_record,
+)
+
+
+def test_changes_since_lists_record_ops(data_dir):
+  version = collection_version("colors.json")
+  upsert_record("colors.json", {"id": "C-1", "name": "bir"})
+  upsert_record("colors.json", {"id": "C-2", "name": "iki"}, prepend=True)
+  update_record("colors.json", "C-1", lambda c: c.update(name="bir!"))
+  delete_record("colors.json", "C-2")
+
+  current, entries = changes_since("colors.json", version)
+  assert current == collection_version("colors.json") == version + 4
+  assert [(op, rid) for _, op, rid in entries] == [
+    ("upsert", "C-1"), ("upsert", "C-2"), ("upsert", "C-1"), ("delete", "C-2"),
+  ]
+  assert [v for v, _, _ in entries] == [version + 1, version + 2, version + 3, version + 4]
+  # Sadece verilen sürümden sonrakiler
+  assert [rid for _, _, rid in changes_since("colors.json", version + 2)[1]] == ["C-1", "C-2"]
+  assert changes_since("colors.json", current) == (current, [])
+
+
+def test_transaction_ops_are_logged(data_dir):
+  version = collection_version("stockMovements.json")
+  with transaction("stockMovements.json") as tx:
+    tx["stockMovements.json"][:0] = [{"id": "M-2"}, {"id": "M-1"}]
+  _, entries = changes_since("stockMovements.json", version)
+  assert {rid for _, _, rid in entries} == {"M-1", "M-2"}
+
+
+def test_read_during_commit_is_not_an_outside_edit(data_dir, monkeypatch):
+  upsert_record("colors.json", {"id": "C-1", "name": "bir"})
+  version = collection_version("colors.json")
+  get_record("colors.json", "C-1")
+  index = data_loader._indexes["colors.json"]
+  backend = data_loader.get_backend()
+  commit = backend.commit
+  seen = []
+
+  def commit_then_read(changes, durable=False):
+    commit(changes, durable=durable)
+    # Dosya yazıldı, cache henüz güncellenmedi: bu arada gelen okuyucu commit edileni görür
+    seen.append(get_record("colors.json", "C-1", readonly=True)["name"])
+
+  monkeypatch.setattr(backend, "commit", commit_then_read)
+  for i in range(3):
+    update_record("colors.json", "C-1", lambda c, i=i: c.update(name=f"v{i}"))
+
+  # Dışarıdan değişiklik sayılmaz: günlük ve indeks sıfırlanmaz
+  assert seen == ["v0", "v1", "v2"]
+  current, entries = changes_since("colors.json", version)
+  assert current == version + 3 and len(entries) == 3
+  assert data_loader._indexes["colors.json"] is index
+  assert get_record("colors.json", "C-1")["name"] == "v2"
+
+
+def test_concurrent_readers_do_not_reset_log(data_dir, monkeypatch):
+  upsert_record("colors.json", {"id": "C-1", "name": "bir"})
+  version = collection_version("colors.json")
+  resets = []
+  monkeypatch.setattr(data_loader, "_write_listeners", [
+    *data_loader._write_listeners, lambda f, v, ops: ops is None and resets.append(f),
+  ])
+  done = threading.Event()
+
+  def read():
+    while not done.is_set():
+      get_record("colors.json", "C-1")
+
+  readers = [threading.Thread(target=read) for _ in range(4)]
+  for reader in readers:
+    reader.start()
+  try:
+    for i in range(50):
+      update_record("colors.json", "C-1", lambda c, i=i: c.update(name=str(i)))
+  finally:
+    done.set()
+    for reader in readers:
+      reader.join()
+  assert resets == []
+  assert len(changes_since("colors.json", version)[1]) == 50
+
+
+def test_full_resync_when_log_does_not_cover(data_dir, monkeypatch):
+  version = collection_version("colors.json")
+  # İstemci gelecekten bir sürüm biliyor: baştan almalı
+  assert changes_since("colors.json", version + 100)[1] is None
+
+  # Dışarıdan değişiklik kayıt seviyesinde değil: günlük sıfırlanır
+  (data_dir / "colors.json").write_text("[]", encoding="utf-8")
+  assert changes_since("colors.json", version)[1] is None
+
+  # Günlükten taşan sürümler de kapsanmaz
+  monkeypatch.setattr(data_loader, "CHANGELOG_SIZE", 2)
+  data_loader._change_log.pop("teams.json", None)
+  start = collection_version("teams.json")
+  for i in range(3):
+    upsert_record("teams.json", {"id": f"T-{i}"})
+  assert changes_since("teams.json", start)[1] is None
+  assert len(changes_since("teams.json", start + 1)[1]) == 2
+
+
+def test_sync_endpoint_returns_records_and_tombstones(client):
+  full = client.get("/sync/colors").json()
+  assert full["reset"] is True and full["records"] == load_json("colors.json")
+  version = full["version"]
+
+  upsert_record("colors.json", {"id": "C-KEEP", "name": "kalır"})
+  upsert_record("colors.json", {"id": "C-GONE", "name": "silinir"})
+  update_record("colors.json", "C-KEEP", lambda c: c.update(name="kalır!"))
+  delete_record("colors.json", "C-GONE")
+
+  delta = client.get("/sync/colors", params={"since": version}).json()
+  assert delta["reset"] is False
+  assert delta["records"] == [{"id": "C-KEEP", "name": "kalır!"}]
+  assert [(t["id"], t["deleted"]) for t in delta["tombstones"]] == [("C-GONE", True)]
+  assert delta["version"] == version + 4
+
+  empty = client.get("/sync/colors", params={"since": delta["version"]}).json()
+  assert (empty["records"], empty["tombstones"], empty["reset"]) == ([], [], False)
+  assert client.get("/sync/colors", params={"since": version + 1000}).json()["reset"] is True
+  assert client.get("/sync/unknown").status_code == 404
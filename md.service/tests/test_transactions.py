@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.data_loader import clear_cache, get_record, load_json, transaction, upsert_record
+
+
+def test_commit_writes_all_collections(data_dir):
+  with transaction("stockItems.json", "stockMovements.json") as tx:
+    item = tx["stockItems.json"][0]
+    item["notes"] = "tx"
+    tx["stockMovements.json"].insert(0, {"id": "MOV-TX", "itemId": item["id"], "change": 1, "type": "stockIn"})
+
+  clear_cache()
+  assert get_record("stockItems.json", item["id"])["notes"] == "tx"
+  assert load_json("stockMovements.json")[0]["id"] == "MOV-TX"
+
+
+def test_rollback_on_http_exception(data_dir):
+  items_before = (data_dir / "stockItems.json").read_bytes()
+  movements_before = (data_dir / "stockMovements.json").read_bytes()
+
+  with pytest.raises(HTTPException):
+    with transaction("stockItems.json", "stockMovements.json") as tx:
+      tx["stockItems.json"][0]["onHand"] = -1
+      tx["stockMovements.json"].insert(0, {"id": "MOV-X", "itemId": "x", "change": 1, "type": "stockIn"})
+      raise HTTPException(status_code=400, detail="Yetersiz stok")
+
+  # Ne dosyalar ne de cache değişmiş olmalı
+  assert (data_dir / "stockItems.json").read_bytes() == items_before
+  assert (data_dir / "stockMovements.json").read_bytes() == movements_before
+  assert load_json("stockMovements.json") == json.loads(movements_before)
+  assert get_record("stockMovements.json", "MOV-X") is None
+
+
+def test_get_sees_working_copy_after_prepend(data_dir):
+  first = load_json("stockItems.json")[0]
+  with transaction("stockItems.json") as tx:
+    tx["stockItems.json"].insert(0, {"id": "STK-NEW", "name": "yeni"})
+    record = tx.get("stockItems.json", first["id"])
+    assert record is tx["stockItems.json"][1]
+    record["notes"] = "kaydırılmış"
+    # Blok içinde eklenen kayıt get ile görünmez
+    assert tx.get("stockItems.json", "STK-NEW") is None
+
+  assert get_record("stockItems.json", first["id"])["notes"] == "kaydırılmış"
+  assert load_json("stockItems.json")[0]["id"] == "STK-NEW"
+
+
+def test_single_collection_commit_is_durable(data_dir, monkeypatch):
+  from app.storage.json_backend import JsonFileBackend
+
+  calls = []
+  original = JsonFileBackend.write
+
+  def write(self, collection, data, fsync=False):
+    calls.append((collection, fsync))
+    return original(self, collection, data, fsync=fsync)
+
+  monkeypatch.setattr(JsonFileBackend, "write", write)
+  upsert_record("colors.json", {"id": "C-PRE", "name": "x"})
+  calls.clear()
+  with transaction("colors.json") as tx:
+    tx["colors.json"].append({"id": "C-TX", "name": "y"})
+  assert calls == [("colors.json", True)]